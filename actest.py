@@ -1,141 +1,331 @@
-import numpy as np
-from scipy.special import erfinv
-from tabulate import tabulate
-import os
-
-print("Name: Rojesh Humagain")
-print("Roll No: 16")
-
-def generate_random_numbers(quantity, min_val=0.0, max_val=1.0, precision=5, filename="acrandom.txt"):
-    """Generates random numbers and saves them to a file."""
-    numbers = np.round(np.random.uniform(min_val, max_val, quantity), precision)
-
-    try:
-        with open(filename, 'w') as file:
-            for num in numbers:
-                file.write(f"{num:.{precision}f}\n")
-
-        print("\nGenerated Random Numbers:")
-        for i in range(0, len(numbers), 10):
-            print(" | ".join(map(str, numbers[i:i+10])))
-
-        print(f"\nAll numbers are saved in '{filename}'.")
-
-    except IOError:
-        print(f"Error: Unable to write to file '{filename}'.")
-
-    return numbers
-
-def load_random_numbers(filename, quantity):
-    """Loads random numbers from a file, handling various formats and errors."""
-    numbers = []
-    if not os.path.exists(filename):
-        print(f"Error: File '{filename}' not found.")
-        return numbers  
-
-    try:
-        with open(filename, 'r') as file:
-            for line in file:
-                try:
-                    numbers.append(float(line.strip()))
-                    if len(numbers) >= quantity:
-                        break
-                except ValueError:
-                    print(f"Warning: Skipping invalid data in file '{filename}'.")
-    except IOError:
-        print(f"Error: Unable to read file '{filename}'.")
-
-    return numbers
-
-def autocorrelation_test(numbers, lag, alpha):
-    """Performs the autocorrelation test and returns results."""
-    n = len(numbers)
-    if lag >= n:
-        return "Invalid Lag", 0, 0, 0  
-
-    mean = np.mean(numbers)
-    numerator = sum((numbers[i] - mean) * (numbers[i + lag] - mean) for i in range(n - lag))
-    denominator = sum((numbers[i] - mean) ** 2 for i in range(n))
-
-    rho = numerator / denominator if denominator != 0 else 0  
-    Z0 = rho * np.sqrt(n - lag)  
-
-    try:
-        Z_alpha = np.sqrt(2) * erfinv(1 - alpha)
-    except ValueError:
-        Z_alpha = float("inf")  
-
-    result = "Accepted" if abs(Z0) < Z_alpha else "Rejected"
-    return result, rho, Z0, Z_alpha
-
-def get_user_input():
-    """Gets user input with error handling and default values."""
-    while True:
-        try:
-            quantity = int(input("Enter the number of random numbers to generate: "))
-            if quantity > 0:
-                break
-            print("Quantity must be a positive integer.")
-        except ValueError:
-            print("Invalid input. Please enter an integer.")
-
-    while True:
-        try:
-            min_val = float(input("Enter the minimum value [0.0]: ") or 0.0)
-            max_val = float(input("Enter the maximum value [1.0]: ") or 1.0)
-            if min_val < max_val:
-                break
-            print("Minimum value must be less than maximum value.")
-        except ValueError:
-            print("Invalid input. Please enter a float.")
-
-    while True:
-        try:
-            precision = int(input("Enter decimal precision [5]: ") or 5)
-            if 1 <= precision <= 10:
-                break
-            print("Precision must be between 1 and 10.")
-        except ValueError:
-            print("Invalid input. Please enter an integer.")
-
-    while True:
-        try:
-            lag = int(input("Enter the lag (k): "))
-            if 0 < lag < quantity:
-                break
-            print(f"Lag must be a positive integer less than {quantity}.")
-        except ValueError:
-            print("Invalid input. Please enter an integer.")
-
-    while True:
-        try:
-            alpha = float(input("Enter the significance level (alpha): "))
-            if 0 < alpha < 1:
-                break
-            print("Alpha must be between 0 and 1.")
-        except ValueError:
-            print("Invalid input. Please enter a float.")
-
-    return quantity, min_val, max_val, precision, lag, alpha
-
-if __name__ == "__main__":
-    quantity, min_val, max_val, precision, lag, alpha = get_user_input()
-    filename = "acrandom.txt"
-
-    numbers = generate_random_numbers(quantity, min_val, max_val, precision, filename)
-    numbers = load_random_numbers(filename, quantity)
-
-    if len(numbers) < quantity:
-        print("Autocorrelation test cannot be performed due to insufficient data.")
-    else:
-        result, rho, Z0, Z_alpha = autocorrelation_test(numbers, lag, alpha)
-
-        table = [
-            ["Parameter", "Value"],
-            ["Mean", np.mean(numbers)],
-            ["Rho (Autocorrelation Coefficient)", rho],
-            ["Z0 (Test Statistic)", Z0],
-            ["Z_alpha (Critical Value)", Z_alpha],
-            ["Result", result]
-        ]
-        print(tabulate(table, headers="firstrow", tablefmt="grid"))
+import numpy as np
+from tabulate import tabulate
+import os
+import sys
+from itertools import islice
+from contextlib import nullcontext
+from chi_ks import second_level_test
+from instrument import stage
+from pvalues import chi2_sf_array, normal_isf
+from samplestore import SampleWriter, is_sample_file, iter_samples
+from stream import DEFAULT_CHUNK_SIZE, generate_chunks, iter_chunks, print_rows
+
+def generate_random_numbers(quantity, min_val=0.0, max_val=1.0, precision=5, filename="acrandom.bin", seed=None, chunk_size=DEFAULT_CHUNK_SIZE, text_filename=None, echo=True, generator="pcg64"):
+    """Generates random numbers chunk by chunk and saves them to a binary sample file.
+
+    If text_filename is given the numbers are also exported there, one per line.
+    With echo=False nothing is printed. `generator` names the prng backend.
+    """
+    count = 0
+    try:
+        with SampleWriter(filename, generator=generator, seed=seed, precision=precision) as writer, \
+                (open(text_filename, 'w') if text_filename else nullcontext()) as text_file:
+            if echo:
+                print("\nGenerated Random Numbers:")
+            for chunk in generate_chunks(quantity, min_val, max_val, precision, seed, chunk_size, generator=generator):
+                writer.write(chunk)
+                if text_file:
+                    with stage("write", len(chunk), file=text_file):
+                        np.savetxt(text_file, chunk, fmt=f"%.{precision}f")
+                if echo:
+                    print_rows(chunk)
+                count += len(chunk)
+
+        if echo:
+            print(f"\nAll numbers are saved in '{filename}'.")
+
+    except IOError:
+        print(f"Error: Unable to write to file '{filename}'.")
+
+    return count
+
+def load_random_numbers(filename, quantity, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yields chunks of random numbers from a file, handling various formats and errors."""
+    if not os.path.exists(filename):
+        print(f"Error: File '{filename}' not found.")
+        return
+
+    if is_sample_file(filename):
+        yield from iter_samples(filename, quantity, chunk_size)
+        return
+
+    remaining = quantity
+    try:
+        with open(filename, 'r') as file:
+            while remaining > 0:
+                lines = list(islice(file, min(chunk_size, remaining)))
+                if not lines:
+                    break
+                chunk = []
+                for line in lines:
+                    try:
+                        chunk.append(float(line.strip()))
+                    except ValueError:
+                        print(f"Warning: Skipping invalid data in file '{filename}'.")
+                remaining -= len(chunk)
+                yield np.array(chunk)
+    except IOError:
+        print(f"Error: Unable to read file '{filename}'.")
+
+def lag_products(values, max_lag):
+    """Returns sum(values[i] * values[i + k]) for every k in 0..max_lag using one FFT."""
+    values = np.asarray(values, dtype=float)
+    products = np.zeros(max_lag + 1)
+    if len(values) == 0:
+        return products
+    size = 1 << int(len(values) + max_lag).bit_length()
+    spectrum = np.fft.rfft(values, size)
+    correlation = np.fft.irfft(spectrum * spectrum.conj(), size)
+    count = min(max_lag, len(values) - 1) + 1
+    products[:count] = correlation[:count]
+    return products
+
+def critical_value(alpha):
+    """Returns the two-sided normal critical value Z_alpha."""
+    try:
+        return normal_isf(alpha / 2)
+    except ValueError:
+        return float("inf")
+
+def _decide(rho, n, lag, Z_alpha):
+    Z0 = rho * np.sqrt(n - lag)
+    result = "Accepted" if abs(Z0) < Z_alpha else "Rejected"
+    return result, rho, Z0, Z_alpha
+
+class AutocorrelationAccumulator:
+    """Accumulates the sums needed by the autocorrelation test one chunk at a time.
+
+    With all_lags=False only lag `max_lag` is tracked, with one dot product per
+    chunk. With all_lags=True the cross products of every lag 1..max_lag are
+    updated together through an FFT of each chunk. Only the first and last
+    `max_lag` values are kept between chunks, so memory does not grow with the
+    length of the stream. Values are shifted by `center` before summing to keep
+    the expanded sums well conditioned. max_lag must be at least 1.
+    """
+
+    def __init__(self, max_lag, all_lags=False, center=0.5):
+        if max_lag < 1:
+            raise ValueError("the lag must be at least 1")
+        self.max_lag = max_lag
+        self.all_lags = all_lags
+        self.center = center
+        self.n = 0
+        self.total = 0.0
+        self.squares = 0.0
+        self.cross = np.zeros(max_lag + 1)
+        self.head = np.empty(0)
+        self.tail = np.empty(0)
+
+    def update(self, chunk):
+        chunk = np.asarray(chunk, dtype=float) - self.center
+        lag = self.max_lag
+        if len(self.head) < lag:
+            self.head = np.concatenate((self.head, chunk[:lag - len(self.head)]))
+        buffer = np.concatenate((self.tail, chunk))
+        if self.all_lags:
+            # Pairs lying entirely in the carried tail were counted with the previous chunk
+            self.cross += lag_products(buffer, lag) - lag_products(self.tail, lag)
+        elif len(buffer) > lag:
+            # The carried tail is at most `lag` long, so it holds no pairs of its own
+            self.cross[lag] += np.dot(buffer[:-lag], buffer[lag:])
+        self.tail = buffer[-lag:]
+        self.n += len(chunk)
+        self.total += chunk.sum()
+        self.squares += np.dot(chunk, chunk)
+
+    def merge(self, other):
+        """Adds the sums of an accumulator fed with the part of the stream right after this one.
+
+        Lag pairs spanning the boundary are formed from this part's tail and the
+        other part's head.
+        """
+        if other.max_lag != self.max_lag or other.all_lags != self.all_lags or other.center != self.center:
+            raise ValueError("Cannot merge autocorrelation accumulators with different settings")
+        lag = self.max_lag
+        # Pair tail[-a] with head[k - a]: a convolution of the reversed tail with the head
+        spanning = np.zeros(lag + 1)
+        if len(self.tail) and len(other.head):
+            products = np.convolve(self.tail[::-1], other.head)[:lag]
+            spanning[1:len(products) + 1] = products
+        if self.all_lags:
+            self.cross += spanning + other.cross
+        else:
+            self.cross[lag] += spanning[lag] + other.cross[lag]
+        if len(self.head) < lag:
+            self.head = np.concatenate((self.head, other.head))[:lag]
+        self.tail = np.concatenate((self.tail, other.tail))[-lag:]
+        self.n += other.n
+        self.total += other.total
+        self.squares += other.squares
+
+    def mean(self):
+        return self.total / self.n + self.center if self.n else 0.0
+
+    def rho(self, lag):
+        """Returns the autocorrelation coefficient at `lag` for the values seen so far."""
+        n = self.n
+        mean = self.total / n
+        # sum((x[i] - mean) * (x[i + lag] - mean)) expanded into the running sums
+        numerator = (self.cross[lag]
+                     - mean * (self.total - self.tail[-lag:].sum())
+                     - mean * (self.total - self.head[:lag].sum())
+                     + (n - lag) * mean ** 2)
+        denominator = self.squares - n * mean ** 2
+        return numerator / denominator if denominator != 0 else 0
+
+    def result(self, alpha, lag=None):
+        """Returns (result, rho, Z0, Z_alpha) for one lag (default max_lag)."""
+        lag = self.max_lag if lag is None else lag
+        if lag >= self.n:
+            return "Invalid Lag", 0, 0, 0
+        return _decide(self.rho(lag), self.n, lag, critical_value(alpha))
+
+    def results(self, alpha):
+        """Returns [(lag, result, rho, Z0, Z_alpha), ...] for lags 1..max_lag."""
+        lags = range(1, min(self.max_lag, self.n - 1) + 1)
+        return [(lag,) + self.result(alpha, lag) for lag in lags]
+
+def autocorrelation_block_p_values(blocks, lag):
+    """Returns the two-sided p-value of Z0 at `lag` for every row of a 2-D array of blocks.
+
+    Every row is centered on its own mean, as in autocorrelation_test(). Z0 is
+    standard normal under H0, so P(|Z| > |Z0|) is the chi-square(1) tail at Z0**2.
+    """
+    rows, size = blocks.shape
+    if not 0 < lag < size:
+        raise ValueError("lag must be positive and shorter than a block")
+    centered = blocks - blocks.mean(axis=1, keepdims=True)
+    numerator = (centered[:, :-lag] * centered[:, lag:]).sum(axis=1)
+    denominator = (centered * centered).sum(axis=1)
+    rho = np.divide(numerator, denominator, out=np.zeros(rows), where=denominator != 0)
+    Z0 = rho * np.sqrt(size - lag)
+    return chi2_sf_array(Z0 ** 2, 1)
+
+def autocorrelation_test(numbers, lag, alpha, block_size=None):
+    """Performs the autocorrelation test on a list/array or a stream of chunks and returns results.
+
+    With block_size the test runs on every block of that many numbers instead
+    and the result is chi_ks.second_level_test()'s.
+    """
+    if block_size:
+        return second_level_test(numbers, block_size, lambda blocks: autocorrelation_block_p_values(blocks, lag), alpha)
+    if not isinstance(numbers, (list, tuple, np.ndarray)):
+        accumulator = AutocorrelationAccumulator(lag)
+        for chunk in iter_chunks(numbers):
+            accumulator.update(chunk)
+        return accumulator.result(alpha)
+
+    numbers = np.asarray(numbers, dtype=float)
+    n = len(numbers)
+    if lag >= n:
+        return "Invalid Lag", 0, 0, 0
+
+    centered = numbers - numbers.mean()
+    denominator = np.dot(centered, centered)
+    rho = np.dot(centered[:-lag], centered[lag:]) / denominator if denominator != 0 else 0
+    return _decide(rho, n, lag, critical_value(alpha))
+
+def autocorrelation_sweep(numbers, max_lag, alpha):
+    """Performs the autocorrelation test for every lag 1..max_lag in one FFT pass.
+
+    Returns a table of rows (lag, result, rho, Z0, Z_alpha).
+    """
+    if not isinstance(numbers, (list, tuple, np.ndarray)):
+        accumulator = AutocorrelationAccumulator(max_lag, all_lags=True)
+        for chunk in iter_chunks(numbers):
+            accumulator.update(chunk)
+        return accumulator.results(alpha)
+
+    numbers = np.asarray(numbers, dtype=float)
+    n = len(numbers)
+    max_lag = min(max_lag, n - 1)
+    products = lag_products(numbers - numbers.mean(), max_lag)
+    Z_alpha = critical_value(alpha)
+    table = []
+    for lag in range(1, max_lag + 1):
+        rho = products[lag] / products[0] if products[0] != 0 else 0
+        table.append((lag,) + _decide(rho, n, lag, Z_alpha))
+    return table
+
+def get_user_input():
+    """Gets user input with error handling and default values."""
+    while True:
+        try:
+            quantity = int(input("Enter the number of random numbers to generate: "))
+            if quantity > 0:
+                break
+            print("Quantity must be a positive integer.")
+        except ValueError:
+            print("Invalid input. Please enter an integer.")
+
+    while True:
+        try:
+            min_val = float(input("Enter the minimum value [0.0]: ") or 0.0)
+            max_val = float(input("Enter the maximum value [1.0]: ") or 1.0)
+            if min_val < max_val:
+                break
+            print("Minimum value must be less than maximum value.")
+        except ValueError:
+            print("Invalid input. Please enter a float.")
+
+    while True:
+        try:
+            precision = int(input("Enter decimal precision [5]: ") or 5)
+            if 1 <= precision <= 10:
+                break
+            print("Precision must be between 1 and 10.")
+        except ValueError:
+            print("Invalid input. Please enter an integer.")
+
+    while True:
+        try:
+            lag = int(input("Enter the lag (k): "))
+            if 0 < lag < quantity:
+                break
+            print(f"Lag must be a positive integer less than {quantity}.")
+        except ValueError:
+            print("Invalid input. Please enter an integer.")
+
+    while True:
+        try:
+            alpha = float(input("Enter the significance level (alpha): "))
+            if 0 < alpha < 1:
+                break
+            print("Alpha must be between 0 and 1.")
+        except ValueError:
+            print("Invalid input. Please enter a float.")
+
+    return quantity, min_val, max_val, precision, lag, alpha
+
+def interactive_main():
+    """Prompts for the parameters, then generates, reloads and tests the numbers."""
+    print("Name: Rojesh Humagain")
+    print("Roll No: 16")
+
+    quantity, min_val, max_val, precision, lag, alpha = get_user_input()
+    filename = "acrandom.bin"
+
+    generate_random_numbers(quantity, min_val, max_val, precision, filename)
+
+    accumulator = AutocorrelationAccumulator(lag, center=(min_val + max_val) / 2)
+    for chunk in load_random_numbers(filename, quantity):
+        accumulator.update(chunk)
+
+    if accumulator.n < quantity:
+        print("Autocorrelation test cannot be performed due to insufficient data.")
+    else:
+        result, rho, Z0, Z_alpha = accumulator.result(alpha)
+
+        table = [
+            ["Parameter", "Value"],
+            ["Mean", accumulator.mean()],
+            ["Rho (Autocorrelation Coefficient)", rho],
+            ["Z0 (Test Statistic)", Z0],
+            ["Z_alpha (Critical Value)", Z_alpha],
+            ["Result", result]
+        ]
+        print(tabulate(table, headers="firstrow", tablefmt="grid"))
+
+if __name__ == "__main__":
+    from cli import main
+    main(["ac"] + sys.argv[1:])
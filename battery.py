@@ -0,0 +1,192 @@
+import math
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from actest import AutocorrelationAccumulator
+from chi_ks import ChiSquareAccumulator, KSAccumulator
+from empirical import MAX_BIRTHDAY_GRID, BirthdaySpacingsAccumulator, RunsAccumulator, SerialAccumulator
+from gaptest import GapAccumulator
+from instrument import stage, timed_chunks
+from pokertest import PokerAccumulator
+from samplestore import is_sample_file, iter_samples, read_header
+from stream import DEFAULT_CHUNK_SIZE, generate_chunks, iter_chunks
+
+TESTS = ("Chi-square", "K-S", "Poker", "Autocorrelation", "Gap", "Runs", "Serial 2-D", "Serial 3-D", "Birthday spacings")
+
+def open_source(quantity=None, min_val=0.0, max_val=1.0, precision=5, seed=None, filename=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                generator="pcg64"):
+    """Returns an iterator of chunks from a sample/text file, or from the uniform generator."""
+    if filename is None:
+        return generate_chunks(quantity, min_val, max_val, precision, seed, chunk_size, generator=generator)
+    if is_sample_file(filename):
+        return timed_chunks("load", iter_samples(filename, quantity, chunk_size))
+    # Text files hold one number per line, as written by the test scripts
+    from gaptest import load_random_numbers
+    return timed_chunks("load", load_random_numbers(filename, float("inf") if quantity is None else quantity, chunk_size))
+
+def build_accumulators(min_val=0.0, max_val=1.0, precision=5, num_intervals=10, lag=1, gap_range=None, start=0):
+    """Returns one fresh accumulator per test in the battery, keyed by test name.
+
+    start is the position in the stream of the first number the accumulators
+    will see, so that block-based tests line up their blocks across shards.
+    The birthday spacings grid is 10 ** precision, capped at MAX_BIRTHDAY_GRID.
+    """
+    if gap_range is None:
+        gap_range = (min_val, min_val + (max_val - min_val) / 10)
+    return {
+        "Chi-square": ChiSquareAccumulator(num_intervals, min_val, max_val),
+        "K-S": KSAccumulator(min_val, max_val),
+        "Poker": PokerAccumulator(precision),
+        "Autocorrelation": AutocorrelationAccumulator(lag, center=(min_val + max_val) / 2),
+        "Gap": GapAccumulator(gap_range[0], gap_range[1], min_val, max_val),
+        "Runs": RunsAccumulator(),
+        "Serial 2-D": SerialAccumulator(2, min_val=min_val, max_val=max_val, start=start),
+        "Serial 3-D": SerialAccumulator(3, min_val=min_val, max_val=max_val, start=start),
+        "Birthday spacings": BirthdaySpacingsAccumulator(min(10 ** precision, MAX_BIRTHDAY_GRID), min_val=min_val,
+                                                         max_val=max_val, start=start),
+    }
+
+def battery_report(accumulators, alpha):
+    """Returns rows of [test, statistic, p-value, result] for a set of accumulators."""
+    rows = []
+    statistic, _, p_value, result = accumulators["Chi-square"].result(alpha)
+    rows.append(["Chi-square", statistic, p_value, result])
+    statistic, p_value, result = accumulators["K-S"].result(alpha)
+    rows.append(["K-S", statistic, p_value, result])
+    result, statistic, p_value = accumulators["Poker"].result(alpha)
+    rows.append(["Poker", statistic, p_value, result])
+    accumulator = accumulators["Autocorrelation"]
+    result, _, statistic, _ = accumulator.result(alpha)
+    p_value = math.erfc(abs(statistic) / math.sqrt(2))
+    rows.append([f"Autocorrelation (lag {accumulator.max_lag})", statistic, p_value, result])
+    result, _, _, statistic, p_value = accumulators["Gap"].result(alpha)
+    rows.append(["Gap", statistic, p_value, result])
+    for name in ("Runs", "Serial 2-D", "Serial 3-D", "Birthday spacings"):
+        result, statistic, p_value = accumulators[name].result(alpha)
+        rows.append([name, statistic, p_value, result])
+    return rows
+
+def run_battery(chunks, alpha=0.05, **params):
+    """Runs every test in the battery over one pass of `chunks` and returns (rows, count)."""
+    accumulators = build_accumulators(**params)
+    count = 0
+    for chunk in iter_chunks(chunks):
+        with stage("test", len(chunk)):
+            for accumulator in accumulators.values():
+                accumulator.update(chunk)
+        count += len(chunk)
+    return battery_report(accumulators, alpha), count
+
+def _run_shard(filename, seed, start, stop, chunk_size, generator, params):
+    """Runs fresh accumulators over samples [start, stop) of a sample file or generator stream."""
+    if filename is None:
+        chunks = generate_chunks(stop - start, params.get("min_val", 0.0), params.get("max_val", 1.0),
+                                 params.get("precision", 5), seed, chunk_size, start=start, generator=generator)
+    else:
+        chunks = timed_chunks("load", iter_samples(filename, stop - start, chunk_size, start=start))
+    accumulators = build_accumulators(start=start, **params)
+    for chunk in chunks:
+        with stage("test", len(chunk)):
+            for accumulator in accumulators.values():
+                accumulator.update(chunk)
+    return accumulators
+
+def _run_shards(filename, seed, start, stop, chunk_size, generator, params, workers=None, shards=None):
+    """Runs samples [start, stop) as contiguous shards in a process pool and merges them in stream order.
+
+    At most 2 * workers shards are submitted ahead of the one being merged,
+    and each result is merged into the running total as soon as it is next in
+    order, so the number of accumulator sets held at once does not grow with
+    the number of shards.
+    """
+    workers = workers or os.cpu_count()
+    shards = shards or workers
+    bounds = np.linspace(start, stop, shards + 1).astype(np.int64)
+    pending = zip(bounds[:-1].tolist(), bounds[1:].tolist())
+    accumulators = None
+    with ProcessPoolExecutor(workers) as executor:
+        futures = deque()
+        for first, last in pending:
+            futures.append(executor.submit(_run_shard, filename, seed, first, last, chunk_size, generator, params))
+            if len(futures) == 2 * workers:
+                break
+        while futures:
+            part = futures.popleft().result()
+            if accumulators is None:
+                accumulators = part
+            else:
+                for name, accumulator in accumulators.items():
+                    accumulator.merge(part[name])
+            del part
+            for first, last in pending:
+                futures.append(executor.submit(_run_shard, filename, seed, first, last, chunk_size, generator, params))
+                break
+    return accumulators
+
+def run_battery_parallel(alpha=0.05, workers=None, quantity=None, filename=None, seed=None,
+                         chunk_size=DEFAULT_CHUNK_SIZE, shards=None, generator="pcg64", **params):
+    """Runs the battery over a sample file or generator stream split across worker processes.
+
+    The stream is cut into contiguous shards, each shard is run through its own
+    accumulators in a ProcessPoolExecutor, and the partial results are merged in
+    stream order. Merging handles gaps and lag pairs that span two shards, so
+    the report matches a sequential run. Generator shards jump ahead to their
+    start, so the same seed and generator give the same numbers as
+    run_battery. Returns (rows, count).
+    """
+    if filename is None:
+        if quantity is None:
+            raise ValueError("quantity is required when no sample file is given")
+        total = quantity
+        if seed is None:
+            # Every shard must draw from the same stream
+            seed = np.random.SeedSequence().entropy
+    else:
+        total = read_header(filename)["count"]
+        if quantity is not None:
+            total = min(total, quantity)
+
+    accumulators = _run_shards(filename, seed, 0, total, chunk_size, generator, params, workers, shards)
+    return battery_report(accumulators, alpha), total
+
+def cache_params(seed, generator="pcg64", min_val=0.0, max_val=1.0, precision=5, num_intervals=10, lag=1,
+                 gap_range=None):
+    """Returns the parameters that identify a battery run over a generator stream, without its length."""
+    if gap_range is None:
+        gap_range = (min_val, min_val + (max_val - min_val) / 10)
+    return {"source": "battery", "generator": generator, "seed": int(seed), "min_val": float(min_val),
+            "max_val": float(max_val), "precision": precision, "num_intervals": num_intervals, "lag": lag,
+            "gap_range": [float(gap_range[0]), float(gap_range[1])]}
+
+def run_battery_cached(cache, alpha=0.05, quantity=None, seed=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                       generator="pcg64", workers=1, **params):
+    """Runs the battery over a seeded generator stream, reusing accumulators from a cache.ResultCache.
+
+    The accumulators of the longest cached run of the same stream that is not
+    longer than quantity are loaded, only the remaining samples are generated
+    (jumping ahead to where the cached run stopped) and merged after them, and
+    the result is cached for the next run. Returns (rows, count, reused),
+    where reused is the number of samples taken from the cache.
+    """
+    if quantity is None or seed is None:
+        raise ValueError("quantity and seed are required to cache a battery run")
+    key = cache_params(seed, generator, **params)
+    reused, accumulators = cache.best_prefix(key, quantity)
+    if reused < quantity:
+        if workers == 1:
+            tail = _run_shard(None, seed, reused, quantity, chunk_size, generator, params)
+        else:
+            tail = _run_shards(None, seed, reused, quantity, chunk_size, generator, params, workers)
+        if accumulators is None:
+            accumulators = tail
+        else:
+            for name, accumulator in accumulators.items():
+                accumulator.merge(tail[name])
+        cache.store(key, quantity, accumulators)
+    return battery_report(accumulators, alpha), quantity, reused
+
+if __name__ == "__main__":
+    from cli import main
+    main(["battery"] + sys.argv[1:])
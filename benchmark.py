@@ -0,0 +1,144 @@
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import nullcontext
+from datetime import datetime
+import numpy as np
+import actest
+import chi_ks
+import gaptest
+import midsquare
+import pokertest
+import randomnumber
+from battery import run_battery
+from prng import available_generators
+from samplestore import iter_samples, write_samples
+from stream import generate_chunks
+
+SEED = 12345
+PRECISION = 5
+DEFAULT_EXPONENTS = (3, 4, 5, 6)
+
+def _generator_case(name):
+    def run(n, chunks, workdir):
+        for _ in generate_chunks(n, precision=PRECISION, seed=SEED, generator=name):
+            pass
+    return run
+
+def _write_table(n, chunks, workdir):
+    randomnumber.write_random_numbers(n, precision=PRECISION, filename=os.path.join(workdir, "table.txt"), seed=SEED)
+
+# Each case is run(n, chunks, workdir); `chunks()` streams n stored samples
+CASES = {f"generate:{name}": _generator_case(name) for name in available_generators()}
+CASES.update({
+    "midsquare": lambda n, chunks, workdir: midsquare.generate_random_numbers(12345678, 8, n),
+    "write-table": _write_table,
+    "chi-square": lambda n, chunks, workdir: chi_ks.chi_square_test(chunks(), 10, 0.05, 0.0, 1.0),
+    "k-s": lambda n, chunks, workdir: chi_ks.ks_test(chunks(), 0.05, 0.0, 1.0),
+    "poker": lambda n, chunks, workdir: pokertest.poker_test(chunks(), 0.05, PRECISION),
+    "autocorrelation": lambda n, chunks, workdir: actest.autocorrelation_test(chunks(), 1, 0.05),
+    "gap": lambda n, chunks, workdir: gaptest.gap_test(chunks(), 0.05, 0.0, 0.1),
+    "battery": lambda n, chunks, workdir: run_battery(chunks(), 0.05),
+})
+
+def sample_file(n, workdir):
+    """Returns a sample file of n fixed-seed numbers in workdir, writing it on first use."""
+    filename = os.path.join(workdir, f"bench-{n}.bin")
+    if not os.path.exists(filename):
+        write_samples(filename, generate_chunks(n, precision=PRECISION, seed=SEED), generator="pcg64",
+                      seed=SEED, precision=PRECISION)
+    return filename
+
+def measure(case, n, workdir, repeat=3):
+    """Times one case at size n and returns a result dict.
+
+    The best of `repeat` runs gives the time; one more run under tracemalloc
+    gives the peak of memory allocated by Python and NumPy. Stored samples are
+    memory-mapped, so the input itself does not count towards the peak.
+    """
+    run = CASES[case]
+    filename = sample_file(n, workdir)
+
+    def chunks():
+        return iter_samples(filename)
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run(n, chunks, workdir)
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        run(n, chunks, workdir)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    best = min(times)
+    return {"case": case, "size": n, "seconds": best, "mean_seconds": sum(times) / len(times),
+            "samples_per_s": n / best if best > 0 else float("inf"), "peak_bytes": peak, "repeat": repeat}
+
+def environment():
+    """Returns the machine and code version the benchmark ran on."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {"commit": commit, "created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(), "numpy": np.__version__, "platform": platform.platform(),
+            "processor": platform.processor(), "cpu_count": os.cpu_count()}
+
+def run_benchmarks(cases=None, exponents=DEFAULT_EXPONENTS, repeat=3, workdir=None, progress=None):
+    """Runs every case at 10**exponent samples for each exponent and returns the report dict."""
+    cases = list(CASES) if not cases else cases
+    unknown = [case for case in cases if case not in CASES]
+    if unknown:
+        raise ValueError(f"Unknown benchmark case(s): {', '.join(unknown)}")
+    if workdir is not None:
+        os.makedirs(workdir, exist_ok=True)
+    results = []
+    with (tempfile.TemporaryDirectory(prefix="simu-bench-") if workdir is None else nullcontext(workdir)) as workdir:
+        for exponent in exponents:
+            for case in cases:
+                result = measure(case, 10 ** exponent, workdir, repeat)
+                results.append(result)
+                if progress:
+                    progress(result)
+    return {"environment": environment(), "results": results}
+
+def save_report(report, filename):
+    with open(filename, 'w') as file:
+        json.dump(report, file, indent=2)
+
+def compare(old, new, threshold=0.1):
+    """Returns rows of [case, size, old s, new s, ratio, flag] for results present in both reports.
+
+    ratio is new time / old time; the flag marks slowdowns beyond threshold.
+    """
+    previous = {(result["case"], result["size"]): result for result in old["results"]}
+    rows = []
+    for result in new["results"]:
+        before = previous.get((result["case"], result["size"]))
+        if before is None:
+            continue
+        ratio = result["seconds"] / before["seconds"] if before["seconds"] > 0 else float("inf")
+        flag = "slower" if ratio > 1 + threshold else "faster" if ratio < 1 - threshold else ""
+        rows.append([result["case"], result["size"], before["seconds"], result["seconds"], ratio, flag])
+    return rows
+
+def format_bytes(size):
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if size < 1024 or unit == "GiB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+if __name__ == "__main__":
+    from cli import main
+    main(["bench"] + sys.argv[1:])
@@ -0,0 +1,115 @@
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+
+# Bump when the pickled accumulators change, so old entries are not reused
+CACHE_VERSION = 2
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "simu")
+DEFAULT_MAX_BYTES = 1 << 30
+
+def cache_key(params):
+    """Returns the sha256 of the canonical JSON form of params (sorted keys, no whitespace)."""
+    canonical = json.dumps({"version": CACHE_VERSION, **params}, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+class ResultCache:
+    """On-disk cache of pickled results keyed by stream parameters and sample count.
+
+    Every stream (generator, seed, test parameters, ...) gets a directory named
+    by the hash of its parameters, holding one entry per sample count. Reading
+    an entry marks it as recently used; when the cache grows beyond
+    max_bytes the least recently used entries are deleted.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _stream_dir(self, params):
+        return os.path.join(self.directory, cache_key(params))
+
+    def _path(self, params, count):
+        return os.path.join(self._stream_dir(params), f"{count}.pkl")
+
+    def counts(self, params):
+        """Returns the sorted sample counts cached for a stream."""
+        try:
+            names = os.listdir(self._stream_dir(params))
+        except FileNotFoundError:
+            return []
+        return sorted(int(name[:-4]) for name in names if name.endswith(".pkl") and name[:-4].isdigit())
+
+    def load(self, params, count):
+        """Returns the cached result for count samples of a stream, or None."""
+        path = self._path(params, count)
+        try:
+            with open(path, 'rb') as file:
+                result = pickle.load(file)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            return None
+        os.utime(path)
+        return result
+
+    def best_prefix(self, params, count):
+        """Returns (n, result) for the longest cached prefix n <= count of a stream, or (0, None)."""
+        for cached in reversed(self.counts(params)):
+            if cached <= count:
+                result = self.load(params, cached)
+                if result is not None:
+                    return cached, result
+        return 0, None
+
+    def store(self, params, count, result):
+        """Saves a result for count samples of a stream, then evicts entries beyond max_bytes."""
+        directory = self._stream_dir(params)
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, "params.json"), 'w') as file:
+            json.dump(params, file, sort_keys=True, default=str)
+        # Written under a temporary name so readers never see half a file
+        handle, temporary = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(handle, 'wb') as file:
+            pickle.dump(result, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary, self._path(params, count))
+        self.evict()
+
+    def _entries(self):
+        entries = []
+        for stream in os.listdir(self.directory):
+            directory = os.path.join(self.directory, stream)
+            if not os.path.isdir(directory):
+                continue
+            for name in os.listdir(directory):
+                if name.endswith(".pkl"):
+                    stat = os.stat(os.path.join(directory, name))
+                    entries.append((stat.st_mtime, stat.st_size, os.path.join(directory, name)))
+        return entries
+
+    def size(self):
+        """Returns the total size of the cached entries in bytes."""
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self):
+        """Deletes least recently used entries until the cache fits in max_bytes."""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+            directory = os.path.dirname(path)
+            if not any(name.endswith(".pkl") for name in os.listdir(directory)):
+                for name in os.listdir(directory):
+                    os.remove(os.path.join(directory, name))
+                os.rmdir(directory)
+
+    def clear(self):
+        """Deletes every entry."""
+        max_bytes, self.max_bytes = self.max_bytes, -1
+        try:
+            self.evict()
+        finally:
+            self.max_bytes = max_bytes
@@ -1,113 +1,244 @@
-import numpy as np
-import scipy.stats as stats
-import matplotlib.pyplot as plt
-from scipy.stats import chi2
-import random
-
-# Kolmogorov-Smirnov Test for Uniform Distribution
-def ks_test(data, level_of_significance):
-    d, p_value = stats.kstest(data, 'uniform', args=(min(data), max(data) - min(data))) # Adjusted for range
-    if p_value <= level_of_significance:
-        ks_result = 'Reject H0 (Dependent)'
-    else:
-        ks_result = 'Accept H0 (Independent)'
-    return d, p_value, ks_result
-
-# Chi-Square Test for Uniform Distribution
-def chi_square_test(numbers, num_intervals, level_of_significance):
-    """Performs a Chi-square test for uniformity on a list of numbers."""
-    min_val = min(numbers)
-    max_val = max(numbers)
-    interval_size = (max_val - min_val) / num_intervals
-
-    observed_frequencies = [0] * num_intervals
-    for num in numbers:
-        interval_index = min(num_intervals - 1, int((num - min_val) / interval_size))
-        observed_frequencies[interval_index] += 1
-
-    expected_frequency = len(numbers) / num_intervals
-    chi_square_statistic = 0
-    for observed in observed_frequencies:
-        chi_square_statistic += (observed - expected_frequency) ** 2 / expected_frequency
-
-    degrees_of_freedom = num_intervals - 1
-    p_value = 1 - chi2.cdf(chi_square_statistic, degrees_of_freedom)
-
-    if p_value <= level_of_significance:
-        chi_result = 'Reject H0 (Dependent)'
-    else:
-        chi_result = 'Accept H0 (Independent)'
-
-    return chi_square_statistic, degrees_of_freedom, p_value, chi_result
-
-# Plotting the Histogram
-def plot_histogram(data, bins=10):
-    plt.hist(data, bins=bins, edgecolor='black')
-    plt.title('Histogram of Input Random Numbers')
-    plt.xlabel('Value')
-    plt.ylabel('Frequency')
-    plt.show()
-
-# Function to Generate Random Numbers
-def generate_random_numbers(quantity, min_value, max_value, precision, level_of_significance):
-    """Generates random numbers and performs the Chi-square and K-S tests."""
-    random_numbers = []
-    for _ in range(quantity):
-        random_number = round(random.uniform(min_value, max_value), precision)
-        random_numbers.append(random_number)
-
-    print("\nGenerated Random Numbers:")
-    for i, num in enumerate(random_numbers):
-        print(f"{num:.{precision}f}", end=" ")
-        if (i + 1) % 10 == 0:
-            print()  # new line after 10 numbers
-
-    # Perform Chi-square test
-    chi_square, degrees_freedom, p_value, chi_result = chi_square_test(random_numbers, 10, level_of_significance)  # 10 intervals
-
-    # Perform K-S test
-    d, ks_p_value, ks_result = ks_test(random_numbers, level_of_significance)
-
-    # Display results in the requested format
-    print("\n" + "-"*85)
-    print(f"{'Chi-square Test:':<40}| {'K-S Test:'}")
-    print("-"*85)
-    print(f"statistic: {chi_square:.4f},{' ' * 25}| D-statistic = {d:.4f}")
-    print(f"Degrees of freedom: {degrees_freedom},{' ' * 7}| P-value = {ks_p_value:.4f}")
-    print(f"P-value: {p_value:.4f},{' ' * 13}|")
-    print(f"{chi_result:<40}| {ks_result}")
-    print("-"*85)
-
-    print("\nExplanation:")
-    print(f"- Chi-Square Test: {chi_result}. The p-value of {p_value:.4f} is {'less than' if p_value <= level_of_significance else 'greater than'} the level of significance of {level_of_significance}.")
-    print(f"- K-S Test: {ks_result}. The p-value of {ks_p_value:.4f} is {'less than' if ks_p_value <= level_of_significance else 'greater than'} the level of significance of {level_of_significance}.")
-
-    return random_numbers
-
-# Main function
-def main():
-    # User details
-    name = "Rojesh Humagain"
-    roll_number = "16"
-
-    print(f"Name: {name}")
-    print(f"Roll Number: {roll_number}")
-
-    # Get user inputs
-    quantity = int(input("Enter the number of random numbers to generate: "))
-    min_value = float(input("Enter the minimum value [0.0]: ") or "0.0")
-    max_value = float(input("Enter the maximum value [1.0]: ") or "1.0")
-    precision = int(input("Enter decimal precision [5]: ") or "0")
-    level_of_significance = float(input("Enter level of significance: "))
-
-    if min_value >= max_value:
-        print("Error: Invalid input - Minimum value must be less than maximum value.")
-    else:
-        # Generate random numbers and perform tests
-        generated_numbers = generate_random_numbers(quantity, min_value, max_value, precision, level_of_significance)
-
-        # Plot histogram
-        plot_histogram(generated_numbers)
-
-if __name__ == "__main__":
-    main()
\ No newline at end of file
+import sys
+import numpy as np
+from instrument import stage
+from pvalues import chi2_sf, chi2_sf_array, kolmogorov_sf
+from stream import generate_chunks, iter_blocks, iter_chunks
+
+def interval_index(chunk, num_intervals, min_val, max_val):
+    """Returns the interval of every number when [min_val, max_val] is cut into num_intervals."""
+    scaled = (np.asarray(chunk, dtype=float) - min_val) * (num_intervals / (max_val - min_val))
+    return np.clip(scaled.astype(np.int64), 0, num_intervals - 1)
+
+def _decision(p_value, level_of_significance):
+    if p_value <= level_of_significance:
+        return 'Reject H0 (Dependent)'
+    return 'Accept H0 (Independent)'
+
+class ChiSquareAccumulator:
+    """Counts numbers per interval chunk by chunk for the Chi-square test over known bounds."""
+
+    def __init__(self, num_intervals, min_val=0.0, max_val=1.0):
+        self.num_intervals = num_intervals
+        self.min_val = min_val
+        self.max_val = max_val
+        self.n = 0
+        self.counts = np.zeros(num_intervals, dtype=np.int64)
+
+    def update(self, chunk):
+        index = interval_index(chunk, self.num_intervals, self.min_val, self.max_val)
+        self.counts += np.bincount(index, minlength=self.num_intervals)
+        self.n += len(chunk)
+
+    def merge(self, other):
+        """Adds the counts of an accumulator fed with another part of the stream."""
+        self.counts += other.counts
+        self.n += other.n
+
+    def result(self, level_of_significance):
+        """Returns (chi_square_statistic, degrees_of_freedom, p_value, chi_result)."""
+        expected_frequency = self.n / self.num_intervals
+        chi_square_statistic = np.sum((self.counts - expected_frequency) ** 2) / expected_frequency
+        degrees_of_freedom = self.num_intervals - 1
+        p_value = chi2_sf(chi_square_statistic, degrees_of_freedom)
+        return chi_square_statistic, degrees_of_freedom, p_value, _decision(p_value, level_of_significance)
+
+class KSAccumulator:
+    """Keeps a fixed-resolution CDF sketch of the numbers for the K-S test over known bounds.
+
+    The numbers are counted in `resolution` equal cells of [min_val, max_val],
+    which fixes memory at `resolution` counters whatever the stream length. The
+    empirical CDF is exact at the cell edges, and inside a cell both it and the
+    uniform CDF are non-decreasing while the uniform CDF rises by 1/resolution.
+    The reported D (measured at the edges) therefore never overstates the true
+    statistic and falls short of it by at most error_bound() = 1/resolution.
+    The cell index is the floored scaled value, so a number on a cell edge,
+    such as a rounded 0.57 at a resolution of 100, may land in the cell below;
+    that moves it by less than a cell and stays within the same bound.
+    """
+
+    def __init__(self, min_val=0.0, max_val=1.0, resolution=1 << 20):
+        self.min_val = min_val
+        self.max_val = max_val
+        self.resolution = resolution
+        self.n = 0
+        self.counts = np.zeros(resolution, dtype=np.int64)
+
+    def update(self, chunk):
+        index = interval_index(chunk, self.resolution, self.min_val, self.max_val)
+        self.counts += np.bincount(index, minlength=self.resolution)
+        self.n += len(chunk)
+
+    def merge(self, other):
+        """Adds the histogram of an accumulator fed with another part of the stream."""
+        self.counts += other.counts
+        self.n += other.n
+
+    def error_bound(self):
+        return 1 / self.resolution
+
+    def result(self, level_of_significance):
+        """Returns (d, p_value, ks_result)."""
+        empirical = np.cumsum(self.counts) / self.n
+        theoretical = np.arange(1, self.resolution + 1) / self.resolution
+        d = np.max(np.abs(empirical - theoretical))
+        p_value = kolmogorov_sf(d, self.n)
+        return d, p_value, _decision(p_value, level_of_significance)
+
+def chi_square_block_p_values(blocks, num_intervals, min_val=0.0, max_val=1.0):
+    """Returns the Chi-square p-value of every row of a 2-D array of blocks.
+
+    The intervals of all blocks are counted with one np.bincount by offsetting
+    the interval index of row r by r * num_intervals.
+    """
+    rows, size = blocks.shape
+    index = interval_index(blocks, num_intervals, min_val, max_val)
+    index += np.arange(rows)[:, None] * num_intervals
+    counts = np.bincount(index.ravel(), minlength=rows * num_intervals).reshape(rows, num_intervals)
+    expected = size / num_intervals
+    statistics = ((counts - expected) ** 2).sum(axis=1) / expected
+    return chi2_sf_array(statistics, num_intervals - 1)
+
+def second_level_test(numbers, block_size, block_p_values, level_of_significance):
+    """Runs a test on consecutive blocks of block_size numbers and K-S tests the p-values.
+
+    block_p_values maps a 2-D array of blocks to one p-value per row. Under H0
+    the p-values are uniform on [0, 1], so a good generator should pass the
+    K-S test on them as well as most single blocks. Returns (d, p_value,
+    ks_result, p_values).
+    """
+    p_values = [block_p_values(blocks) for blocks in iter_blocks(numbers, block_size)]
+    if not p_values:
+        raise ValueError("the stream is shorter than one block")
+    p_values = np.concatenate(p_values)
+    return ks_test(p_values, level_of_significance, 0.0, 1.0) + (p_values,)
+
+def _is_materialized(numbers):
+    return isinstance(numbers, (list, tuple, np.ndarray))
+
+# Kolmogorov-Smirnov Test for Uniform Distribution
+def ks_test(data, level_of_significance, min_val=None, max_val=None):
+    """Performs the K-S test for uniformity on [min_val, max_val].
+
+    A list or array is tested exactly; without bounds the range of the data is
+    used, as before. A stream of chunks goes through KSAccumulator and needs the
+    bounds.
+    """
+    if not _is_materialized(data):
+        if min_val is None or max_val is None:
+            raise ValueError("min_val and max_val are required to test a stream")
+        accumulator = KSAccumulator(min_val, max_val)
+        for chunk in iter_chunks(data):
+            accumulator.update(chunk)
+        return accumulator.result(level_of_significance)
+
+    data = np.asarray(data, dtype=float)
+    if min_val is None or max_val is None:
+        min_val, max_val = data.min(), data.max()
+    # Largest distance between the empirical CDF, just before and at each number, and the uniform CDF
+    cdf = np.sort((data - min_val) / (max_val - min_val))
+    steps = np.arange(1, len(cdf) + 1) / len(cdf)
+    d = max(np.max(steps - cdf), np.max(cdf - (steps - 1 / len(cdf))))
+    p_value = kolmogorov_sf(d, len(cdf))
+    return d, p_value, _decision(p_value, level_of_significance)
+
+# Chi-Square Test for Uniform Distribution
+def chi_square_test(numbers, num_intervals, level_of_significance, min_val=None, max_val=None, block_size=None):
+    """Performs a Chi-square test for uniformity on a list of numbers or a stream of chunks.
+
+    Without bounds the range of a list or array is used, as before; a stream
+    needs the bounds. With block_size the test runs on every block of that many
+    numbers instead and the result is second_level_test()'s.
+    """
+    if min_val is None or max_val is None:
+        if not _is_materialized(numbers):
+            raise ValueError("min_val and max_val are required to test a stream")
+        numbers = np.asarray(numbers, dtype=float)
+        min_val, max_val = numbers.min(), numbers.max()
+
+    if block_size:
+        return second_level_test(numbers, block_size, lambda blocks: chi_square_block_p_values(
+            blocks, num_intervals, min_val, max_val), level_of_significance)
+    accumulator = ChiSquareAccumulator(num_intervals, min_val, max_val)
+    for chunk in iter_chunks(numbers):
+        accumulator.update(chunk)
+    return accumulator.result(level_of_significance)
+
+# Plotting the Histogram
+def plot_histogram(counts, min_value=0.0, max_value=1.0):
+    # Imported here: matplotlib takes longer to load than the tests take to run
+    import matplotlib.pyplot as plt
+    edges = np.linspace(min_value, max_value, len(counts) + 1)
+    plt.stairs(counts, edges, fill=True, edgecolor='black')
+    plt.title('Histogram of Input Random Numbers')
+    plt.xlabel('Value')
+    plt.ylabel('Frequency')
+    plt.show()
+
+# Function to Generate Random Numbers
+def generate_random_numbers(quantity, min_value, max_value, precision, level_of_significance, seed=None, generator="pcg64"):
+    """Generates random numbers chunk by chunk and performs the Chi-square and K-S tests.
+
+    Returns the chi-square interval counts, which is all the histogram needs.
+    """
+    chi_accumulator = ChiSquareAccumulator(10, min_value, max_value)  # 10 intervals
+    ks_accumulator = KSAccumulator(min_value, max_value)
+
+    print("\nGenerated Random Numbers:")
+    for chunk in generate_chunks(quantity, min_value, max_value, precision, seed, generator=generator):
+        with stage("format", len(chunk)):
+            for i in range(0, len(chunk), 10):  # new line after 10 numbers
+                print(" ".join(f"{num:.{precision}f}" for num in chunk[i:i + 10]))
+        chi_accumulator.update(chunk)
+        ks_accumulator.update(chunk)
+
+    # Perform Chi-square test
+    chi_square, degrees_freedom, p_value, chi_result = chi_accumulator.result(level_of_significance)
+
+    # Perform K-S test
+    d, ks_p_value, ks_result = ks_accumulator.result(level_of_significance)
+
+    # Display results in the requested format
+    print("\n" + "-"*85)
+    print(f"{'Chi-square Test:':<40}| {'K-S Test:'}")
+    print("-"*85)
+    print(f"statistic: {chi_square:.4f},{' ' * 25}| D-statistic = {d:.4f}")
+    print(f"Degrees of freedom: {degrees_freedom},{' ' * 7}| P-value = {ks_p_value:.4f}")
+    print(f"P-value: {p_value:.4f},{' ' * 13}|")
+    print(f"{chi_result:<40}| {ks_result}")
+    print("-"*85)
+
+    print("\nExplanation:")
+    print(f"- Chi-Square Test: {chi_result}. The p-value of {p_value:.4f} is {'less than' if p_value <= level_of_significance else 'greater than'} the level of significance of {level_of_significance}.")
+    print(f"- K-S Test: {ks_result}. The p-value of {ks_p_value:.4f} is {'less than' if ks_p_value <= level_of_significance else 'greater than'} the level of significance of {level_of_significance}.")
+
+    return chi_accumulator.counts
+
+# Main function
+def main():
+    """Prompts for the parameters, then generates and tests the numbers."""
+    # User details
+    name = "Rojesh Humagain"
+    roll_number = "16"
+
+    print(f"Name: {name}")
+    print(f"Roll Number: {roll_number}")
+
+    # Get user inputs
+    quantity = int(input("Enter the number of random numbers to generate: "))
+    min_value = float(input("Enter the minimum value [0.0]: ") or "0.0")
+    max_value = float(input("Enter the maximum value [1.0]: ") or "1.0")
+    precision = int(input("Enter decimal precision [5]: ") or "0")
+    level_of_significance = float(input("Enter level of significance: "))
+
+    if min_value >= max_value:
+        print("Error: Invalid input - Minimum value must be less than maximum value.")
+    else:
+        # Generate random numbers and perform tests
+        interval_counts = generate_random_numbers(quantity, min_value, max_value, precision, level_of_significance)
+
+        # Plot histogram
+        plot_histogram(interval_counts, min_value, max_value)
+
+if __name__ == "__main__":
+    from cli import main as cli_main
+    cli_main(["chi-ks"] + sys.argv[1:])
\ No newline at end of file
@@ -0,0 +1,575 @@
+import argparse
+import json
+import sys
+import instrument
+from instrument import stage
+
+# Same as stream.DEFAULT_CHUNK_SIZE and prng.available_generators(); repeated so
+# that --help does not import NumPy
+DEFAULT_CHUNK_SIZE = 1_000_000
+GENERATOR_NAMES = ("lcg", "minstd", "mrg32k3a", "mt19937", "pcg64")
+# Same as cache.DEFAULT_CACHE_DIR
+DEFAULT_CACHE_DIR = "~/.cache/simu"
+# Same as samplestore.MAX_SEED
+MAX_SEED = 2 ** 64 - 1
+# Same as pokertest.MIN_HAND_SIZE and pokertest.MAX_HAND_SIZE
+MIN_HAND_SIZE, MAX_HAND_SIZE = 3, 10
+BLOCKS_HELP = "second-level test: run the test on M blocks and K-S test their p-values"
+
+def _to_builtin(value):
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+def emit(args, title, rows, data):
+    """Prints a result as JSON with --json, otherwise as a table."""
+    with stage("report"):
+        if args.json:
+            print(json.dumps(data, default=_to_builtin))
+            return
+        from tabulate import tabulate
+        print(f"\n{title}:")
+        print(tabulate([["Parameter", "Value"]] + rows, headers="firstrow", tablefmt="grid"))
+
+def _seed(text):
+    """argparse type for generator seeds, which sample files store in 64 bits."""
+    seed = int(text)
+    if not 0 <= seed <= MAX_SEED:
+        raise argparse.ArgumentTypeError(f"seed must be between 0 and {MAX_SEED}")
+    return seed
+
+def _echo(args):
+    return not (args.quiet or args.json)
+
+def _sampling_parser():
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("-n", "--quantity", type=int, help="number of random numbers to generate")
+    parser.add_argument("--seed", type=_seed, help="seed for the generator (default: random)")
+    parser.add_argument("--generator", default="pcg64", choices=GENERATOR_NAMES,
+                        help="random number generator backend [pcg64]")
+    parser.add_argument("--min", dest="min_val", type=float, default=0.0, help="minimum value [0.0]")
+    parser.add_argument("--max", dest="max_val", type=float, default=1.0, help="maximum value [1.0]")
+    parser.add_argument("--precision", type=int, default=5, help="decimal precision [5]")
+    parser.add_argument("--alpha", type=float, default=0.05, help="significance level [0.05]")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="numbers generated per chunk")
+    return parser
+
+def _output_parser():
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("-q", "--quiet", action="store_true", help="do not print the generated numbers")
+    parser.add_argument("--json", action="store_true", help="print the result as one JSON object")
+    parser.add_argument("-i", "--interactive", action="store_true", help="prompt for the parameters instead")
+    return parser
+
+def _check(parser, args):
+    if args.interactive:
+        return
+    if getattr(args, "quantity", 0) is None and getattr(args, "file", None) is None:
+        parser.error("-n/--quantity is required")
+    if getattr(args, "quantity", None) is not None and args.quantity <= 0:
+        parser.error("quantity must be a positive integer")
+    if hasattr(args, "min_val") and args.min_val >= args.max_val:
+        parser.error("--min must be less than --max")
+    if hasattr(args, "alpha") and not 0 < args.alpha < 1:
+        parser.error("--alpha must be between 0 and 1")
+    if getattr(args, "blocks", None) is not None and not 0 < args.blocks <= args.quantity:
+        parser.error("--blocks must be between 1 and the quantity")
+    if getattr(args, "intervals", None) is not None and args.intervals < 2:
+        parser.error("--intervals must be at least 2")
+    for option in ("lag", "max_lag"):
+        if getattr(args, option, None) is not None and getattr(args, option) < 1:
+            parser.error(f"--{option.replace('_', '-')} must be at least 1")
+    if args.command == "poker" and not MIN_HAND_SIZE <= args.precision <= MAX_HAND_SIZE:
+        parser.error(f"--precision must be between {MIN_HAND_SIZE} and {MAX_HAND_SIZE} for the poker test")
+
+def emit_second_level(args, title, test):
+    """Runs test(block_size) over --blocks blocks and prints the K-S test of their p-values."""
+    block_size = args.quantity // args.blocks
+    try:
+        d, p_value, result, p_values = test(block_size)
+    except ValueError as error:
+        sys.exit(f"Error: {error}")
+    rejected = sum(1 for value in p_values if value <= args.alpha)
+    emit(args, f"{title} (second level, {len(p_values)} blocks of {block_size})",
+         [["Blocks", len(p_values)], ["Block size", block_size], ["Blocks rejected", rejected],
+          ["K-S D of the p-values", d], ["K-S P-value", p_value], ["Result", result]],
+         {"blocks": len(p_values), "block_size": block_size, "rejected_blocks": rejected,
+          "d": d, "p_value": p_value, "result": result})
+
+def cmd_random(args):
+    import randomnumber
+    if args.interactive:
+        return randomnumber.generate_random_numbers()
+    stats = randomnumber.write_random_numbers(args.quantity, args.min_val, args.max_val, args.precision,
+                                              args.output, args.seed, args.generator)
+    stats["filename"] = args.output
+    emit(args, "Statistics", [["Count", stats["count"]], ["Minimum value", stats["min"]],
+                              ["Maximum value", stats["max"]], ["Average value", stats["mean"]]], stats)
+
+def cmd_midsquare(args):
+    import midsquare
+    if args.interactive:
+        return midsquare.interactive_main()
+    numbers, tail, period = midsquare.generate_with_cycle(args.seed, args.digits, args.quantity)
+    midsquare.save_numbers_to_file(numbers, args.output, echo=_echo(args))
+    if _echo(args):
+        print("\nGenerated Random Numbers:")
+        midsquare.display_numbers_in_rows(numbers)
+    result, chi2_stat, p_value = midsquare.chi_square_test(numbers, alpha=args.alpha, num_digits=args.digits)
+    degenerate = midsquare.is_degenerate(args.seed, args.digits, tail, period)
+    emit(args, "Chi-Square Test Results",
+         [["Chi-square Statistic", chi2_stat], ["P-value", p_value], ["Result", result],
+          ["Tail length", tail], ["Period", period], ["Degenerate", degenerate]],
+         {"chi_square": chi2_stat, "p_value": p_value, "result": result,
+          "tail": tail, "period": period, "degenerate": degenerate})
+
+def cmd_seedscan(args):
+    import os
+    import seedscan
+    filename = seedscan.index_path(args.width, args.draws, args.index_dir)
+    if _echo(args) and (args.rebuild or not os.path.exists(filename)):
+        print(f"Scanning all {10 ** args.width} seeds of width {args.width} into {filename} ...")
+    index = seedscan.open_index(args.width, args.draws, args.index_dir, args.rebuild)
+    if args.seed:
+        rows = [seedscan.seed_info(index, seed, args.alpha, args.min_period) for seed in args.seed]
+        title = f"Mid-square seeds of width {args.width}"
+    else:
+        min_seed = 0 if args.all_seeds else 10 ** (args.width - 1)
+        rows = seedscan.best_seeds(index, seedscan.load_ranking(args.width, args.draws, args.index_dir), args.top,
+                                   args.alpha, args.min_period, min_seed)
+        title = f"Best mid-square seeds of width {args.width} (chi-square over {args.draws} numbers, alpha = {args.alpha})"
+    if args.json:
+        print(json.dumps(rows))
+        return
+    from tabulate import tabulate
+    print(f"\n{title}:")
+    if not rows:
+        print("No seed qualifies; try a smaller --min-period or --alpha.")
+        return
+    print(tabulate([[str(r["seed"]).zfill(args.width), r["tail"], r["period"], r["distinct"], r["cycle"],
+                     r["chi_square"], r["p_value"], r["result"]] for r in rows],
+                   headers=["Seed", "Tail", "Period", "Distinct", "Cycle min", "Chi-square", "P-value", "Result"],
+                   tablefmt="grid"))
+
+def cmd_chi_ks(args):
+    import chi_ks
+    if args.interactive:
+        return chi_ks.main()
+    from stream import generate_chunks, print_rows
+    if args.blocks:
+        chunks = generate_chunks(args.quantity, args.min_val, args.max_val, args.precision, args.seed, args.chunk_size,
+                                 generator=args.generator)
+        return emit_second_level(args, "Chi-square Test Results", lambda block_size: chi_ks.chi_square_test(
+            chunks, args.intervals, args.alpha, args.min_val, args.max_val, block_size))
+    chi_accumulator = chi_ks.ChiSquareAccumulator(args.intervals, args.min_val, args.max_val)
+    ks_accumulator = chi_ks.KSAccumulator(args.min_val, args.max_val)
+    for chunk in generate_chunks(args.quantity, args.min_val, args.max_val, args.precision, args.seed, args.chunk_size,
+                                 generator=args.generator):
+        if _echo(args):
+            print_rows(chunk)
+        with stage("test", len(chunk)):
+            chi_accumulator.update(chunk)
+            ks_accumulator.update(chunk)
+    chi_square, degrees_freedom, p_value, chi_result = chi_accumulator.result(args.alpha)
+    d, ks_p_value, ks_result = ks_accumulator.result(args.alpha)
+    emit(args, "Chi-square and K-S Test Results",
+         [["Chi-square Statistic", chi_square], ["Degrees of freedom", degrees_freedom],
+          ["Chi-square P-value", p_value], ["Chi-square Result", chi_result],
+          ["D-statistic", d], ["K-S P-value", ks_p_value], ["K-S Result", ks_result]],
+         {"chi_square": chi_square, "degrees_of_freedom": degrees_freedom, "chi_square_p_value": p_value,
+          "chi_square_result": chi_result, "d": d, "ks_p_value": ks_p_value, "ks_result": ks_result})
+    if args.plot:
+        chi_ks.plot_histogram(chi_accumulator.counts, args.min_val, args.max_val)
+
+def _generate_and_reload(module, args):
+    module.generate_random_numbers(args.quantity, args.min_val, args.max_val, args.precision, args.output,
+                                   args.seed, args.chunk_size, args.text, echo=_echo(args),
+                                   generator=args.generator)
+    return instrument.timed_chunks("load", module.load_random_numbers(args.output, args.quantity, args.chunk_size))
+
+def _feed(accumulator, chunks):
+    for chunk in chunks:
+        with stage("test", len(chunk)):
+            accumulator.update(chunk)
+
+def cmd_poker(args):
+    import pokertest
+    if args.interactive:
+        return pokertest.interactive_main()
+    if args.blocks:
+        return emit_second_level(args, "Poker Test Results", lambda block_size: pokertest.poker_test(
+            _generate_and_reload(pokertest, args), args.alpha, args.precision, block_size))
+    accumulator = pokertest.PokerAccumulator(args.precision)
+    _feed(accumulator, _generate_and_reload(pokertest, args))
+    result, chi_square_stat, p_value = accumulator.result(args.alpha)
+    emit(args, "Poker Test Results",
+         [["Chi-square Statistic", chi_square_stat], ["P-value", p_value], ["Result", result]],
+         {"chi_square": chi_square_stat, "p_value": p_value, "result": result,
+          "hands": {name: observed for name, observed, _ in accumulator.table()}})
+
+def cmd_ac(args):
+    import actest
+    if args.interactive:
+        return actest.interactive_main()
+    if args.blocks:
+        return emit_second_level(args, "Autocorrelation Test Results", lambda block_size: actest.autocorrelation_test(
+            _generate_and_reload(actest, args), args.lag, args.alpha, block_size))
+    max_lag = args.max_lag or args.lag
+    accumulator = actest.AutocorrelationAccumulator(max_lag, all_lags=bool(args.max_lag),
+                                                    center=(args.min_val + args.max_val) / 2)
+    _feed(accumulator, _generate_and_reload(actest, args))
+    if args.max_lag:
+        table = accumulator.results(args.alpha)
+        if args.json:
+            print(json.dumps([dict(zip(("lag", "result", "rho", "z0", "z_alpha"), row)) for row in table],
+                             default=_to_builtin))
+        else:
+            from tabulate import tabulate
+            print(tabulate(table, headers=["Lag", "Result", "Rho", "Z0", "Z_alpha"], tablefmt="grid"))
+        return
+    result, rho, Z0, Z_alpha = accumulator.result(args.alpha)
+    emit(args, "Autocorrelation Test Results",
+         [["Mean", accumulator.mean()], ["Rho (Autocorrelation Coefficient)", rho],
+          ["Z0 (Test Statistic)", Z0], ["Z_alpha (Critical Value)", Z_alpha], ["Result", result]],
+         {"mean": accumulator.mean(), "rho": rho, "z0": Z0, "z_alpha": Z_alpha, "result": result})
+
+def cmd_gap(args):
+    import gaptest
+    if args.interactive:
+        return gaptest.interactive_main()
+    if args.intervals or args.interval:
+        intervals = list(args.interval or [])
+        if args.intervals:
+            intervals += gaptest.split_intervals(args.min_val, args.max_val, args.intervals)
+        accumulator = gaptest.MultiGapAccumulator(intervals, args.min_val, args.max_val)
+        _feed(accumulator, _generate_and_reload(gaptest, args))
+        results = accumulator.result(args.alpha)
+        if args.json:
+            print(json.dumps([dict(zip(("low", "high", "result", "gaps", "mean_gap", "chi_square", "p_value"), row))
+                              for row in results], default=_to_builtin))
+            return
+        from tabulate import tabulate
+        print(f"\nGap Test Results ({len(results)} intervals, one pass):")
+        print(tabulate([[low, high, k, mean_gap, statistic, p_value, result]
+                        for low, high, result, k, mean_gap, statistic, p_value in results],
+                       headers=["Low", "High", "Gaps", "Mean Gap", "Chi-square", "P-value", "Result"], tablefmt="grid"))
+        return
+    low = args.min_val if args.low is None else args.low
+    high = low + (args.max_val - args.min_val) / 10 if args.high is None else args.high
+    if args.blocks:
+        return emit_second_level(args, "Gap Test Results", lambda block_size: gaptest.gap_test(
+            _generate_and_reload(gaptest, args), args.alpha, low, high, args.min_val, args.max_val, block_size))
+    accumulator = gaptest.GapAccumulator(low, high, args.min_val, args.max_val)
+    _feed(accumulator, _generate_and_reload(gaptest, args))
+    result, k, mean_gap, chi_square_stat, p_value = accumulator.result(args.alpha)
+    emit(args, "Gap Test Results",
+         [["Number of Gaps", k], ["Mean Gap", mean_gap], ["Chi-square Statistic", chi_square_stat],
+          ["P-value", p_value], ["Result", result]],
+         {"gaps": k, "mean_gap": mean_gap, "chi_square": chi_square_stat, "p_value": p_value, "result": result})
+
+def cmd_battery(args):
+    import os
+    import battery
+    if args.file is not None and not os.path.exists(args.file):
+        sys.exit(f"Error: File '{args.file}' not found.")
+    params = dict(min_val=args.min_val, max_val=args.max_val, precision=args.precision,
+                  num_intervals=args.intervals, lag=args.lag, gap_range=args.gap)
+    reused = None
+    if args.cache is not None:
+        if args.file is not None or args.seed is None or args.quantity is None:
+            sys.exit("Error: --cache needs a generated stream with --seed and -n")
+        from cache import ResultCache
+        results = ResultCache(os.path.expanduser(args.cache), int(args.cache_size * 2 ** 20))
+        rows, count, reused = battery.run_battery_cached(results, args.alpha, args.quantity, args.seed,
+                                                         args.chunk_size, args.generator, args.workers or None,
+                                                         **params)
+    elif args.workers != 1 and (args.file is None or battery.is_sample_file(args.file)):
+        rows, count = battery.run_battery_parallel(args.alpha, args.workers or None, args.quantity, args.file,
+                                                   args.seed, args.chunk_size, generator=args.generator,
+                                                   **params)
+    else:
+        chunks = battery.open_source(args.quantity, args.min_val, args.max_val, args.precision, args.seed,
+                                     args.file, args.chunk_size, args.generator)
+        rows, count = battery.run_battery(chunks, args.alpha, **params)
+
+    with stage("report"):
+        if args.json:
+            print(json.dumps({"count": count, "alpha": args.alpha, "cached": reused,
+                              "tests": [dict(zip(("test", "statistic", "p_value", "result"), row)) for row in rows]},
+                             default=_to_builtin))
+            return
+        from tabulate import tabulate
+        print(f"\nRandomness test battery over {count} numbers (alpha = {args.alpha}):")
+        if reused:
+            print(f"({reused} numbers taken from the cache)")
+        print(tabulate(rows, headers=["Test", "Statistic", "P-value", "Result"], tablefmt="grid"))
+
+def cmd_stream(args):
+    import asyncio
+    import pipeline
+
+    def progress(rows, count):
+        rejected = [row[0] for row in rows if row[3].startswith("Reject")]
+        print(f"{count} numbers: {len(rows) - len(rejected)} accepted, {len(rejected)} rejected"
+              + (f" ({', '.join(rejected)})" if rejected else ""), file=sys.stderr)
+
+    battery_run = pipeline.BatteryPipeline(args.quantity, args.seed, args.generator, args.chunk_size, args.save,
+                                           args.queue_size, min_val=args.min_val, max_val=args.max_val,
+                                           precision=args.precision, num_intervals=args.intervals, lag=args.lag,
+                                           gap_range=args.gap)
+    rows, count = asyncio.run(pipeline.run_pipeline(battery_run, args.alpha, args.every, progress))
+    with stage("report"):
+        if args.json:
+            print(json.dumps({"count": count, "alpha": args.alpha, "saved": args.save,
+                              "tests": [dict(zip(("test", "statistic", "p_value", "result"), row)) for row in rows]},
+                             default=_to_builtin))
+            return
+        from tabulate import tabulate
+        print(f"\nRandomness test battery over {count} streamed numbers (alpha = {args.alpha}):")
+        if args.save:
+            print(f"(numbers saved to '{args.save}')")
+        print(tabulate(rows, headers=["Test", "Statistic", "P-value", "Result"], tablefmt="grid"))
+
+def cmd_bench(args):
+    import benchmark
+
+    def progress(result):
+        if _echo(args):
+            print(f"{result['case']:>18} n={result['size']:<10} {result['seconds']:9.4f} s "
+                  f"{result['samples_per_s']:14.0f} samples/s  peak {benchmark.format_bytes(result['peak_bytes'])}")
+
+    report = benchmark.run_benchmarks(args.cases, args.sizes, args.repeat, args.data_dir, progress)
+    benchmark.save_report(report, args.output)
+    if args.compare:
+        with open(args.compare) as file:
+            rows = benchmark.compare(json.load(file), report)
+        if args.json:
+            print(json.dumps([dict(zip(("case", "size", "old_seconds", "new_seconds", "ratio", "flag"), row))
+                              for row in rows]))
+        else:
+            from tabulate import tabulate
+            print(tabulate(rows, headers=["Case", "Size", "Old (s)", "New (s)", "Ratio", ""], tablefmt="grid"))
+    elif args.json:
+        print(json.dumps(report))
+    if _echo(args):
+        print(f"\nResults saved in '{args.output}'.")
+
+def _time_spec(values):
+    """A single value is an exponential mean, two values are GPSS-style A +- B."""
+    if values is None:
+        return None
+    return values[0] if len(values) == 1 else tuple(values[:2])
+
+def cmd_sim(args):
+    import models
+    report = models.run_model(args.model, customers=args.customers, duration=args.duration,
+                              interarrival=_time_spec(args.interarrival), service=_time_spec(args.service),
+                              seed=args.seed, generator=args.generator)
+    if args.json:
+        print(json.dumps(report, default=_to_builtin))
+    else:
+        models.print_report(f"Simulation report - {args.model}", report)
+
+def cmd_gpss(args):
+    import gpss
+    try:
+        if args.source:
+            print(gpss.load_source(args.file))
+            return
+        program = gpss.load_model(args.file)
+        if args.start is None and program.start is None and args.until is None:
+            sys.exit("Error: the model has no START statement; give --start or --until")
+        report = program.run(args.start, args.seed, args.generator, args.until)
+    except (OSError, gpss.GPSSError) as error:
+        sys.exit(f"Error: {error}")
+    if args.json:
+        print(json.dumps(report, default=_to_builtin))
+    else:
+        gpss.print_report(f"GPSS simulation report - {args.file}", report)
+
+def cmd_replicate(args):
+    import replication
+    params = {key: value for key, value in (("customers", args.customers), ("duration", args.duration),
+                                            ("start", args.start), ("until", args.until)) if value is not None}
+    try:
+        summary = replication.replicate(args.model, args.metric, args.target, args.relative, args.confidence,
+                                        args.min_reps, args.reps, args.batch, args.workers or None, args.seed,
+                                        args.generator, **params)
+    except (OSError, ValueError) as error:
+        sys.exit(f"Error: {error}")
+    if args.json:
+        print(json.dumps(summary, default=_to_builtin))
+        return
+    from tabulate import tabulate
+    watched = args.metric or replication.DEFAULT_METRICS.get(args.model, ())
+    rows = [[name, m["count"], m["mean"], m["half_width"], m["mean"] - m["half_width"], m["mean"] + m["half_width"]]
+            for name, m in summary["metrics"].items() if args.all or name in watched or not watched]
+    print(f"\n{summary['replications']} replications of {args.model} (seed {summary['seed']}), "
+          f"{args.confidence:.0%} confidence intervals"
+          + (", target reached" if summary["target_reached"] else ""))
+    print(tabulate(rows, headers=["Metric", "N", "Mean", "Half-width", "Low", "High"], tablefmt="grid"))
+
+def build_parser():
+    sampling = _sampling_parser()
+    output = _output_parser()
+    parser = argparse.ArgumentParser(prog="simu", description="Random number generation and randomness tests.")
+    parser.add_argument("--profile", action="store_true",
+                        help="time the generate, format, write, load, test and report stages and print them to stderr")
+    parser.add_argument("--profile-json", metavar="FILE", help="write the stage timings to FILE as JSON")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    sub = commands.add_parser("random", parents=[sampling, output], help="generate numbers into a table file")
+    sub.add_argument("-o", "--output", default="randomnumber.txt", help="table file [randomnumber.txt]")
+    sub.set_defaults(func=cmd_random)
+
+    sub = commands.add_parser("midsquare", parents=[output], help="mid-square generator with chi-square test")
+    sub.add_argument("--seed", type=int, help="starting seed")
+    sub.add_argument("--digits", type=int, help="number of digits to keep")
+    sub.add_argument("-n", "--quantity", type=int, help="number of random numbers to generate")
+    sub.add_argument("--alpha", type=float, default=0.05, help="significance level [0.05]")
+    sub.add_argument("-o", "--output", default="midsquare.txt", help="output file [midsquare.txt]")
+    sub.set_defaults(func=cmd_midsquare)
+
+    sub = commands.add_parser("seedscan", help="period and chi-square index of all mid-square seeds")
+    sub.add_argument("width", type=int, choices=range(2, 9), metavar="WIDTH", help="number of digits, 2 to 8")
+    sub.add_argument("--seed", type=int, nargs="+", help="show these seeds instead of the best ones")
+    sub.add_argument("--top", type=int, default=10, help="number of best seeds to show [10]")
+    sub.add_argument("--min-period", type=int, default=10, help="skip seeds ending in shorter cycles [10]")
+    sub.add_argument("--alpha", type=float, default=0.05, help="significance level [0.05]")
+    sub.add_argument("--draws", type=int, default=100, help="numbers per seed in the chi-square test [100]")
+    sub.add_argument("--all-seeds", action="store_true", help="also consider seeds with leading zeros")
+    sub.add_argument("--index-dir", default=".", help="directory of the index files [.]")
+    sub.add_argument("--rebuild", action="store_true", help="scan again even if the index exists")
+    sub.add_argument("-q", "--quiet", action="store_true", help="do not announce the scan")
+    sub.add_argument("--json", action="store_true", help="print the result as one JSON object")
+    sub.set_defaults(func=cmd_seedscan, interactive=False)
+
+    sub = commands.add_parser("chi-ks", parents=[sampling, output], help="chi-square and K-S uniformity tests")
+    sub.add_argument("--intervals", type=int, default=10, help="chi-square intervals [10]")
+    sub.add_argument("--plot", action="store_true", help="show the histogram")
+    sub.add_argument("--blocks", type=int, metavar="M", help=BLOCKS_HELP)
+    sub.set_defaults(func=cmd_chi_ks)
+
+    for name, help_text, default_output, func in (
+            ("poker", "poker test", "pokerrandom.bin", cmd_poker),
+            ("ac", "autocorrelation test", "acrandom.bin", cmd_ac),
+            ("gap", "gap test", "gaprandom.bin", cmd_gap)):
+        sub = commands.add_parser(name, parents=[sampling, output], help=help_text)
+        sub.add_argument("-o", "--output", default=default_output, help=f"sample file [{default_output}]")
+        sub.add_argument("--text", help="also export the numbers to this text file")
+        sub.add_argument("--blocks", type=int, metavar="M", help=BLOCKS_HELP)
+        sub.set_defaults(func=func)
+        if name == "ac":
+            sub.add_argument("--lag", type=int, default=1, help="lag k [1]")
+            sub.add_argument("--max-lag", type=int, help="test every lag 1..MAX_LAG in one pass")
+        elif name == "gap":
+            sub.add_argument("--low", type=float, help="lower bound of the gap interval [--min]")
+            sub.add_argument("--high", type=float, help="upper bound of the gap interval [low + range/10]")
+            sub.add_argument("--interval", nargs=2, type=float, action="append", metavar=("LOW", "HIGH"),
+                             help="test this interval too; repeat for more, all in one pass")
+            sub.add_argument("--intervals", type=int, metavar="N", help="test N equal intervals covering the range")
+
+    sub = commands.add_parser("battery", parents=[sampling], help="all tests in one pass over the data")
+    sub.add_argument("--file", help="sample file (.bin) or text file to test instead of generating")
+    sub.add_argument("--intervals", type=int, default=10, help="chi-square intervals [10]")
+    sub.add_argument("--lag", type=int, default=1, help="autocorrelation lag [1]")
+    sub.add_argument("--gap", nargs=2, type=float, metavar=("LOW", "HIGH"), help="gap test interval")
+    sub.add_argument("--workers", type=int, default=1, help="worker processes, 0 = one per core [1]")
+    sub.add_argument("--cache", nargs="?", const=DEFAULT_CACHE_DIR, metavar="DIR",
+                     help=f"reuse and store results of seeded runs in DIR [{DEFAULT_CACHE_DIR}]")
+    sub.add_argument("--cache-size", type=float, default=1024, metavar="MB", help="cache size limit in MB [1024]")
+    sub.add_argument("--json", action="store_true", help="print the result as one JSON object")
+    sub.set_defaults(func=cmd_battery, interactive=False)
+
+    sub = commands.add_parser("stream", parents=[sampling], help="run the battery while the numbers are generated")
+    sub.add_argument("--save", metavar="FILE", help="also write the numbers to this sample file")
+    sub.add_argument("--every", type=float, metavar="SECONDS", help="print the results so far at this interval")
+    sub.add_argument("--queue-size", type=int, default=4, help="chunks buffered per stage [4]")
+    sub.add_argument("--intervals", type=int, default=10, help="chi-square intervals [10]")
+    sub.add_argument("--lag", type=int, default=1, help="autocorrelation lag [1]")
+    sub.add_argument("--gap", nargs=2, type=float, metavar=("LOW", "HIGH"), help="gap test interval")
+    sub.add_argument("--json", action="store_true", help="print the result as one JSON object")
+    sub.set_defaults(func=cmd_stream, interactive=False)
+
+    sub = commands.add_parser("sim", help="run one of the queueing models")
+    sub.add_argument("model", choices=("grocery", "barber-1q2", "barber-1q3", "barber-2q2"), help="model to run")
+    sub.add_argument("--customers", type=int, help="stop after this many customers have left")
+    sub.add_argument("--duration", type=float, help="stop at this simulation time")
+    sub.add_argument("--interarrival", nargs="+", type=float, metavar="T",
+                     help="mean time between arrivals (exponential), or A B for uniform A +- B")
+    sub.add_argument("--service", nargs="+", type=float, metavar="T",
+                     help="mean service time (exponential), or A B for uniform A +- B")
+    sub.add_argument("--seed", type=_seed, help="seed for the generator (default: random)")
+    sub.add_argument("--generator", default="pcg64", choices=GENERATOR_NAMES, help="random number generator [pcg64]")
+    sub.add_argument("--json", action="store_true", help="print the report as one JSON object")
+    sub.set_defaults(func=cmd_sim, interactive=False)
+
+    sub = commands.add_parser("gpss", help="run a GPSS World model (.gps or text) on the Python engine")
+    sub.add_argument("file", help="model file, e.g. lab2.gps")
+    sub.add_argument("--start", type=int, help="termination count (overrides the model's START)")
+    sub.add_argument("--until", type=float, help="stop at this simulation time")
+    sub.add_argument("--seed", type=_seed, help="seed for the generator (default: random)")
+    sub.add_argument("--generator", default="pcg64", choices=GENERATOR_NAMES, help="random number generator [pcg64]")
+    sub.add_argument("--source", action="store_true", help="print the extracted model text and exit")
+    sub.add_argument("--json", action="store_true", help="print the report as one JSON object")
+    sub.set_defaults(func=cmd_gpss, interactive=False)
+
+    sub = commands.add_parser("replicate", help="independent replications of a model with confidence intervals")
+    sub.add_argument("model", help="grocery, barber-1q2, barber-1q3, barber-2q2 or a GPSS model file")
+    sub.add_argument("--reps", type=int, default=1000, help="maximum number of replications [1000]")
+    sub.add_argument("--min-reps", type=int, default=10, help="replications before the target is checked [10]")
+    sub.add_argument("--target", type=float, help="stop when every watched half-width is at most this")
+    sub.add_argument("--relative", action="store_true", help="the target is a fraction of the mean")
+    sub.add_argument("--metric", action="append", help="metric to watch, e.g. tables.WAITING.mean (repeatable)")
+    sub.add_argument("--all", action="store_true", help="show every metric, not only the watched ones")
+    sub.add_argument("--confidence", type=float, default=0.95, help="confidence level [0.95]")
+    sub.add_argument("--customers", type=int, help="customers per replication (queueing models)")
+    sub.add_argument("--duration", type=float, help="simulated time per replication (queueing models)")
+    sub.add_argument("--start", type=int, help="termination count per replication (GPSS models)")
+    sub.add_argument("--until", type=float, help="end time per replication (GPSS models)")
+    sub.add_argument("--batch", type=int, default=20, help="replications per task [20]")
+    sub.add_argument("--workers", type=int, default=0, help="worker processes, 0 = one per core [0]")
+    sub.add_argument("--seed", type=_seed, help="seed for the substreams (default: random)")
+    sub.add_argument("--generator", default="pcg64", choices=GENERATOR_NAMES, help="random number generator [pcg64]")
+    sub.add_argument("--json", action="store_true", help="print the summary as one JSON object")
+    sub.set_defaults(func=cmd_replicate, interactive=False)
+
+    sub = commands.add_parser("bench", help="time the generators and tests at several data sizes")
+    sub.add_argument("--sizes", nargs="+", type=int, default=[3, 4, 5, 6], metavar="EXP",
+                     help="benchmark 10**EXP samples for each EXP [3 4 5 6]")
+    sub.add_argument("--cases", nargs="+", help="cases to run (default: all)")
+    sub.add_argument("--repeat", type=int, default=3, help="timed runs per case, best is kept [3]")
+    sub.add_argument("--data-dir", help="keep the generated sample files here (default: temporary)")
+    sub.add_argument("-o", "--output", default="benchmark.json", help="JSON report [benchmark.json]")
+    sub.add_argument("--compare", metavar="REPORT", help="compare the times with an earlier JSON report")
+    sub.add_argument("-q", "--quiet", action="store_true", help="do not print progress")
+    sub.add_argument("--json", action="store_true", help="print the report (or comparison) as JSON")
+    sub.set_defaults(func=cmd_bench, interactive=False)
+    return parser
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    _check(parser, args)
+    if args.command == "midsquare" and not args.interactive and (args.seed is None or args.digits is None):
+        parser.error("midsquare needs --seed and --digits")
+    if not (args.profile or args.profile_json):
+        args.func(args)
+        return
+    instrument.enable()
+    try:
+        # Time not spent in a named stage is reported as "other"
+        with stage("other"):
+            args.func(args)
+    finally:
+        instrument.disable()
+        rows = instrument.report()
+        if args.profile:
+            print("\nProfile:", file=sys.stderr)
+            print(instrument.format_report(rows), file=sys.stderr)
+        if args.profile_json:
+            with open(args.profile_json, "w") as file:
+                json.dump(rows, file, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+import math
+import sys
+import numpy as np
+from pokertest import merge_small_classes
+from pvalues import chi2_sf, poisson_pmf, poisson_sf
+
+SERIAL_CELLS = 8
+# Birthdays are built from two consecutive numbers, so that the year is long enough for the Poisson law
+VALUES_PER_DAY = 2
+# Largest birthday grid: the spacing that wraps around the year reaches 2 * grid ** 2, which must fit in int64
+MAX_BIRTHDAY_GRID = 10 ** 9
+
+def cell_codes(chunk, cells, min_val=0.0, max_val=1.0):
+    """Returns which of `cells` equal cells of [min_val, max_val] every number falls in."""
+    scaled = (np.asarray(chunk, dtype=float) - min_val) * (cells / (max_val - min_val))
+    # Rounded numbers such as 0.12345 scale to just below their cell edge, so nudge them up
+    codes = (scaled + 1e-6).astype(np.int64)
+    return np.clip(codes, 0, cells - 1)
+
+class RunsAccumulator:
+    """Counts runs up and down chunk by chunk.
+
+    The direction of every step comes from the sign of np.diff (equal
+    neighbours count as a step down) and a new run starts wherever the
+    direction changes. Only the last number and the first and last directions
+    are kept between chunks.
+    """
+
+    def __init__(self):
+        self.n = 0
+        self.changes = 0
+        self.first = None
+        self.last = None
+        self.first_up = None
+        self.last_up = None
+
+    def update(self, chunk):
+        chunk = np.asarray(chunk, dtype=float)
+        if not len(chunk):
+            return
+        if self.last is None:
+            self.first = chunk[0]
+            values = chunk
+        else:
+            values = np.concatenate(([self.last], chunk))
+        up = np.diff(values) > 0
+        if len(up):
+            if self.last_up is None:
+                self.first_up = up[0]
+            elif self.last_up != up[0]:
+                self.changes += 1
+            self.changes += int(np.count_nonzero(up[1:] != up[:-1]))
+            self.last_up = up[-1]
+        self.last = chunk[-1]
+        self.n += len(chunk)
+
+    def merge(self, other):
+        """Adds the runs of an accumulator fed with the part of the stream right after this one."""
+        if other.n == 0:
+            return
+        if self.n == 0:
+            self.__dict__.update(other.__dict__)
+            return
+        step = other.first > self.last
+        if self.last_up is None:
+            self.first_up = step
+        elif self.last_up != step:
+            self.changes += 1
+        if other.first_up is not None and other.first_up != step:
+            self.changes += 1
+        self.changes += other.changes
+        self.last_up = step if other.last_up is None else other.last_up
+        self.last = other.last
+        self.n += other.n
+
+    def runs(self):
+        return self.changes + 1 if self.n > 1 else 0
+
+    def result(self, alpha):
+        """Returns (result, z, p_value): the number of runs against its normal approximation."""
+        n = self.n
+        if n < 3:
+            return "Not enough data", 0, 1
+        mean = (2 * n - 1) / 3
+        variance = (16 * n - 29) / 90
+        z = (self.runs() - mean) / math.sqrt(variance)
+        p_value = math.erfc(abs(z) / math.sqrt(2))
+        return ("Accepted" if p_value > alpha else "Rejected"), z, p_value
+
+class BlockAccumulator:
+    """Base for tests on consecutive, non-overlapping blocks of `block` numbers.
+
+    Blocks sit at multiples of `block` in the whole stream. An accumulator fed
+    from position `start` keeps the numbers before its first block boundary as
+    `head` and those after its last full block as `tail`, so accumulators of
+    consecutive parts merge into exactly the blocks of a sequential run.
+    Subclasses give codes() to map numbers to integers, add_blocks() to count
+    a 2-D array of blocks and merge_counts() to add another accumulator's
+    counts.
+    """
+
+    def __init__(self, block, start=0):
+        self.block = block
+        self.start = start
+        self.n = 0
+        self.head = np.empty(0, dtype=np.int64)
+        self.tail = np.empty(0, dtype=np.int64)
+
+    def first_boundary(self):
+        return -(-self.start // self.block) * self.block
+
+    def codes(self, chunk):
+        raise NotImplementedError
+
+    def add_blocks(self, blocks):
+        raise NotImplementedError
+
+    def merge_counts(self, other):
+        raise NotImplementedError
+
+    def update(self, chunk):
+        self.feed(self.codes(chunk))
+
+    def feed(self, codes):
+        lead = min(max(self.first_boundary() - self.start - self.n, 0), len(codes))
+        if lead:
+            self.head = np.concatenate((self.head, codes[:lead]))
+        buffer = np.concatenate((self.tail, codes[lead:]))
+        full = len(buffer) - len(buffer) % self.block
+        if full:
+            self.add_blocks(buffer[:full].reshape(-1, self.block))
+        self.tail = buffer[full:]
+        self.n += len(codes)
+
+    def merge(self, other):
+        """Adds the blocks of an accumulator fed with the part of the stream right after this one.
+
+        This part's tail and the other part's head make up the block spanning
+        the boundary.
+        """
+        if other.start != self.start + self.n or other.block != self.block:
+            raise ValueError("Can only merge the accumulator of the part of the stream right after this one")
+        self.feed(other.head)
+        if other.start + other.n >= other.first_boundary():
+            # The other part reached a block boundary, so its head completed this part's last block
+            self.merge_counts(other)
+            self.tail = other.tail
+            self.n += other.n - len(other.head)
+
+class SerialAccumulator(BlockAccumulator):
+    """Serial test: counts non-overlapping d-tuples in the cells^d cells of the unit d-cube.
+
+    Every tuple of cell codes is packed into one cell index, and the cells
+    are counted with np.bincount.
+    """
+
+    def __init__(self, dimension=2, cells=SERIAL_CELLS, min_val=0.0, max_val=1.0, start=0):
+        super().__init__(dimension, start)
+        self.dimension = dimension
+        self.cells = cells
+        self.min_val = min_val
+        self.max_val = max_val
+        self.counts = np.zeros(cells ** dimension, dtype=np.int64)
+
+    def codes(self, chunk):
+        return cell_codes(chunk, self.cells, self.min_val, self.max_val)
+
+    def add_blocks(self, blocks):
+        packed = blocks[:, 0].copy()
+        for column in range(1, self.dimension):
+            packed *= self.cells
+            packed += blocks[:, column]
+        self.counts += np.bincount(packed, minlength=len(self.counts))
+
+    def merge_counts(self, other):
+        self.counts += other.counts
+
+    def result(self, alpha):
+        """Returns (result, chi_square_stat, p_value) for the tuples seen so far."""
+        tuples = int(self.counts.sum())
+        if not tuples:
+            return "Not enough data", 0, 1
+        expected = tuples / len(self.counts)
+        chi_square_stat = float(((self.counts - expected) ** 2).sum() / expected)
+        p_value = chi2_sf(chi_square_stat, len(self.counts) - 1)
+        return ("Accepted" if p_value > alpha else "Rejected"), chi_square_stat, p_value
+
+class BirthdaySpacingsAccumulator(BlockAccumulator):
+    """Marsaglia's birthday spacings test.
+
+    Every block gives m birthdays in a year of `days` = grid ** VALUES_PER_DAY
+    days, a birthday being VALUES_PER_DAY consecutive numbers read as digits
+    base `grid`. The birthdays are sorted, the m spacings between them (the
+    last one wrapping around the year) are sorted in turn, and J counts the
+    repeated spacings. For a good generator J is close to Poisson with mean
+    m**3 / (4 * days); the histogram of J over all blocks is compared with it
+    by a chi-square test. By default m makes that mean 2. Every row of blocks
+    is sorted at once with np.sort(axis=1). grid is at most MAX_BIRTHDAY_GRID.
+    """
+
+    def __init__(self, grid=10 ** 5, birthdays=None, min_val=0.0, max_val=1.0, start=0):
+        if not 2 <= grid <= MAX_BIRTHDAY_GRID:
+            raise ValueError(f"Birthday grid must be between 2 and {MAX_BIRTHDAY_GRID}")
+        self.grid = grid
+        self.days = grid ** VALUES_PER_DAY
+        self.birthdays = birthdays or round((8 * self.days) ** (1 / 3))
+        super().__init__(self.birthdays * VALUES_PER_DAY, start)
+        self.min_val = min_val
+        self.max_val = max_val
+        self.mean = self.birthdays ** 3 / (4 * self.days)
+        self.counts = np.zeros(0, dtype=np.int64)
+
+    def codes(self, chunk):
+        return cell_codes(chunk, self.grid, self.min_val, self.max_val)
+
+    def add_blocks(self, blocks):
+        digits = blocks.reshape(len(blocks), self.birthdays, VALUES_PER_DAY)
+        days = digits[:, :, 0].copy()
+        for column in range(1, VALUES_PER_DAY):
+            days *= self.grid
+            days += digits[:, :, column]
+        days.sort(axis=1)
+        spacings = np.empty_like(days)
+        spacings[:, :-1] = np.diff(days, axis=1)
+        spacings[:, -1] = days[:, 0] + self.days - days[:, -1]
+        spacings.sort(axis=1)
+        repeats = np.count_nonzero(spacings[:, 1:] == spacings[:, :-1], axis=1)
+        self.add_counts(np.bincount(repeats))
+
+    def add_counts(self, counts):
+        if len(counts) > len(self.counts):
+            counts = counts.copy()
+            counts[:len(self.counts)] += self.counts
+            self.counts = counts
+        else:
+            self.counts[:len(counts)] += counts
+
+    def merge_counts(self, other):
+        self.add_counts(other.counts)
+
+    def result(self, alpha):
+        """Returns (result, chi_square_stat, p_value) for the blocks seen so far."""
+        samples = int(self.counts.sum())
+        if not samples:
+            return "Not enough data", 0, 1
+        classes = np.arange(len(self.counts) + 1)
+        expected = samples * np.array([poisson_pmf(k, self.mean) for k in classes])
+        expected[-1] = samples * poisson_sf(classes[-1] - 1, self.mean)
+        observed = np.append(self.counts, 0)
+        observed, expected = merge_small_classes(observed, expected)
+        if len(observed) < 2:
+            return "Not enough data", 0, 1
+        chi_square_stat = float(np.sum((observed - expected) ** 2 / expected))
+        p_value = chi2_sf(chi_square_stat, len(observed) - 1)
+        return ("Accepted" if p_value > alpha else "Rejected"), chi_square_stat, p_value
+
+if __name__ == "__main__":
+    from cli import main
+    main(["battery"] + sys.argv[1:])
@@ -1,142 +1,356 @@
-import numpy as np
-from scipy.stats import chi2
-from tabulate import tabulate
-import os
-
-def generate_random_numbers(quantity, min_val=0.0, max_val=1.0, precision=5, filename="gaprandom.txt"):
-    """Generates random numbers and saves them to a file."""
-    numbers = np.round(np.random.uniform(min_val, max_val, quantity), precision)
-
-    try:
-        with open(filename, 'w') as file:
-            for num in numbers:
-                file.write(f"{num:.{precision}f}\n")
-
-        print("\nGenerated Random Numbers:")
-        for i in range(0, len(numbers), 10):
-            print(" | ".join(map(str, numbers[i:i+10])))
-
-        print(f"\nAll numbers are saved in '{filename}'.")
-
-    except IOError:
-        print(f"Error: Unable to write to file '{filename}'.")
-
-    return numbers
-
-def load_random_numbers(filename, quantity):
-    numbers = []
-    if not os.path.exists(filename):
-        print(f"Error: File '{filename}' not found.")
-        return numbers
-
-    with open(filename, 'r') as file:
-        while len(numbers) < quantity:
-            line = file.readline().strip()
-            if not line:
-                break
-            try:
-                numbers.append(float(line))
-            except ValueError:
-                print(f"Skipping invalid line: {line}")
-
-    return numbers
-
-def gap_test(numbers, alpha, low, high):
-    """Performs the gap test and returns the result."""
-    gaps = []
-    gap = 0
-    in_range = False
-
-    for number in numbers:
-        if low <= number <= high:
-            if in_range:
-                gaps.append(gap)
-                gap = 0
-            in_range = True
-        else:
-            if in_range:
-                gap += 1
-
-    if not gaps:
-        return "Not enough gaps", 0, 0, 0, 1  # Avoid division by zero
-
-    k = len(gaps)
-    mean_gap = np.mean(gaps) if gaps else 0
-    expected = k  # The expected number of gaps is k
-    observed = np.sum(gaps)
-
-    chi_square_stat = (observed - expected) ** 2 / expected if expected != 0 else 0
-    df = max(k - 1, 1)  # Ensure degrees of freedom is at least 1
-    p_value = 1 - chi2.cdf(chi_square_stat, df=df)
-
-    return ("Accepted" if p_value > alpha else "Rejected"), k, mean_gap, chi_square_stat, p_value
-
-def get_user_input():
-    while True:
-        try:
-            quantity = int(input("Enter the number of random numbers to generate: "))
-            if quantity > 0:
-                break
-            print("Quantity must be a positive integer.")
-        except ValueError:
-            print("Invalid input. Please enter an integer.")
-
-    while True:
-        try:
-            min_val = float(input("Enter the minimum value [0.0]: ") or 0.0)
-            max_val = float(input("Enter the maximum value [1.0]: ") or 1.0)
-            if min_val < max_val:
-                break
-            print("Minimum value must be less than maximum value.")
-        except ValueError:
-            print("Invalid input. Please enter a float.")
-
-    while True:
-        try:
-            precision = int(input("Enter decimal precision [5]: ") or 5)
-            if 1 <= precision <= 10:
-                break
-            print("Precision must be between 1 and 10.")
-        except ValueError:
-            print("Invalid input. Please enter an integer.")
-
-    while True:
-        try:
-            low = float(input("Enter the lower bound: "))
-            high = float(input("Enter the upper bound: "))
-            if low < high:
-                break
-            print("Lower bound must be less than upper bound.")
-        except ValueError:
-            print("Invalid input. Please enter a float.")
-
-    while True:
-        try:
-            alpha = float(input("Enter the significance level (alpha): "))
-            if 0 < alpha < 1:
-                break
-            print("Alpha must be between 0 and 1.")
-        except ValueError:
-            print("Invalid input. Please enter a float.")
-
-    return quantity, min_val, max_val, precision, low, high, alpha
-
-if __name__ == "__main__":
-    quantity, min_val, max_val, precision, low, high, alpha = get_user_input()
-    numbers = generate_random_numbers(quantity, min_val, max_val, precision, "gaprandom.txt")
-    numbers = load_random_numbers("gaprandom.txt", quantity)
-
-    if len(numbers) < quantity:
-        print("Not enough data to perform the test.")
-    else:
-        result, k, mean_gap, chi_square_stat, p_value = gap_test(numbers, alpha, low, high)
-
-        table = [
-            ["Parameter", "Value"],
-            ["Number of Gaps", k],
-            ["Mean Gap", mean_gap],
-            ["Chi-square Statistic", chi_square_stat],
-            ["P-value", p_value],
-            ["Result", result]
-        ]
-        print(tabulate(table, headers="firstrow", tablefmt="grid"))
+import numpy as np
+from tabulate import tabulate
+import os
+import sys
+from contextlib import nullcontext
+from chi_ks import second_level_test
+from instrument import stage
+from pvalues import chi2_sf, chi2_sf_array
+from samplestore import SampleWriter, is_sample_file, iter_samples
+from stream import DEFAULT_CHUNK_SIZE, generate_chunks, iter_chunks, print_rows
+
+def generate_random_numbers(quantity, min_val=0.0, max_val=1.0, precision=5, filename="gaprandom.bin", seed=None, chunk_size=DEFAULT_CHUNK_SIZE, text_filename=None, echo=True, generator="pcg64"):
+    """Generates random numbers chunk by chunk and saves them to a binary sample file.
+
+    If text_filename is given the numbers are also exported there, one per line.
+    With echo=False nothing is printed. `generator` names the prng backend.
+    """
+    count = 0
+    try:
+        with SampleWriter(filename, generator=generator, seed=seed, precision=precision) as writer, \
+                (open(text_filename, 'w') if text_filename else nullcontext()) as text_file:
+            if echo:
+                print("\nGenerated Random Numbers:")
+            for chunk in generate_chunks(quantity, min_val, max_val, precision, seed, chunk_size, generator=generator):
+                writer.write(chunk)
+                if text_file:
+                    with stage("write", len(chunk), file=text_file):
+                        np.savetxt(text_file, chunk, fmt=f"%.{precision}f")
+                if echo:
+                    print_rows(chunk)
+                count += len(chunk)
+
+        if echo:
+            print(f"\nAll numbers are saved in '{filename}'.")
+
+    except IOError:
+        print(f"Error: Unable to write to file '{filename}'.")
+
+    return count
+
+def load_random_numbers(filename, quantity, chunk_size=DEFAULT_CHUNK_SIZE):
+    if not os.path.exists(filename):
+        print(f"Error: File '{filename}' not found.")
+        return
+
+    if is_sample_file(filename):
+        yield from iter_samples(filename, quantity, chunk_size)
+        return
+
+    remaining = quantity
+    with open(filename, 'r') as file:
+        while remaining > 0:
+            chunk = []
+            while len(chunk) < min(chunk_size, remaining):
+                line = file.readline().strip()
+                if not line:
+                    break
+                try:
+                    chunk.append(float(line))
+                except ValueError:
+                    print(f"Skipping invalid line: {line}")
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield np.array(chunk)
+
+def gap_classes(k, p):
+    """Returns t such that gap lengths 0..t-1 and >= t all expect at least 5 of k gaps."""
+    t = 0
+    while k * p * (1 - p) ** t >= 5 and k * (1 - p) ** (t + 1) >= 5:
+        t += 1
+    return max(t, 1)
+
+def gap_probabilities(p, t):
+    """Returns P(gap = j) for j < t followed by P(gap >= t)."""
+    return np.append(p * (1 - p) ** np.arange(t), (1 - p) ** t)
+
+class GapAccumulator:
+    """Bins the lengths of gaps between numbers in [low, high] chunk by chunk.
+
+    Gap lengths are histogrammed with np.bincount, and the index of the last
+    in-range number is carried over so gaps spanning two chunks are counted
+    exactly once. Memory depends only on the longest gap, not on the stream.
+    """
+
+    def __init__(self, low, high, min_val=0.0, max_val=1.0):
+        self.low = low
+        self.high = high
+        self.min_val = min_val
+        self.max_val = max_val
+        self.n = 0
+        self.k = 0
+        self.total_gap = 0
+        self.first_hit = None
+        self.last_hit = None
+        self.counts = np.zeros(0, dtype=np.int64)
+
+    def update(self, chunk):
+        chunk = np.asarray(chunk)
+        self.add_hits(np.flatnonzero((chunk >= self.low) & (chunk <= self.high)), len(chunk))
+
+    def add_hits(self, hits, length):
+        """Takes the next `length` numbers of the stream, given by the positions of the in-range ones."""
+        hits = hits + self.n
+        if len(hits):
+            if self.last_hit is not None:
+                hits = np.concatenate(([self.last_hit], hits))
+            else:
+                self.first_hit = hits[0]
+            self.last_hit = hits[-1]
+            self.add_gaps(np.diff(hits) - 1)
+        self.n += length
+
+    def merge(self, other):
+        """Adds the gaps of an accumulator fed with the part of the stream right after this one.
+
+        The gap between this part's last in-range number and the other part's
+        first one is added here, so no gap is lost at the boundary.
+        """
+        if other.first_hit is not None:
+            if self.last_hit is None:
+                self.first_hit = other.first_hit + self.n
+            else:
+                self.add_gaps(np.array([other.first_hit + self.n - self.last_hit - 1]))
+            self.last_hit = other.last_hit + self.n
+            if len(other.counts) > len(self.counts):
+                self.counts, counts = other.counts.copy(), self.counts
+            else:
+                counts = other.counts
+            self.counts[:len(counts)] += counts
+            self.k += other.k
+            self.total_gap += other.total_gap
+        self.n += other.n
+
+    def add_gaps(self, gaps):
+        if len(gaps) == 0:
+            return
+        binned = np.bincount(gaps)
+        if len(binned) > len(self.counts):
+            binned[:len(self.counts)] += self.counts
+            self.counts = binned
+        else:
+            self.counts[:len(binned)] += binned
+        self.k += len(gaps)
+        self.total_gap += int(gaps.sum())
+
+    def probability(self):
+        """Returns the probability that a uniform number falls in [low, high]."""
+        return (min(self.high, self.max_val) - max(self.low, self.min_val)) / (self.max_val - self.min_val)
+
+    def classes(self):
+        """Returns t such that gap lengths 0..t-1 and >= t all expect at least 5 gaps."""
+        return gap_classes(self.k, self.probability())
+
+    def result(self, alpha):
+        """Returns (result, k, mean_gap, chi_square_stat, p_value) for the gaps seen so far."""
+        k = self.k
+        if not k:
+            return "Not enough gaps", 0, 0, 0, 1  # Avoid division by zero
+
+        p = self.probability()
+        if not 0 < p < 1:
+            return "Invalid interval", k, self.total_gap / k, 0, 1
+
+        # Textbook gap test: P(gap = j) = p * (1 - p) ** j, lumping j >= t together
+        t = self.classes()
+        expected = k * gap_probabilities(p, t)
+        observed = np.zeros(t + 1)
+        head = self.counts[:t]
+        observed[:len(head)] = head
+        observed[t] = k - head.sum()
+
+        chi_square_stat = np.sum((observed - expected) ** 2 / expected)
+        p_value = chi2_sf(chi_square_stat, t)
+
+        mean_gap = self.total_gap / k
+        return ("Accepted" if p_value > alpha else "Rejected"), k, mean_gap, chi_square_stat, p_value
+
+def split_intervals(min_val, max_val, count):
+    """Returns `count` adjacent intervals of equal width covering [min_val, max_val]."""
+    edges = np.linspace(min_val, max_val, count + 1)
+    return list(zip(edges[:-1].tolist(), edges[1:].tolist()))
+
+class MultiGapAccumulator:
+    """Runs the gap test for many [low, high] intervals in one pass over the stream.
+
+    The interval bounds are sorted into one array of edges, and every number is
+    placed with one np.searchsorted call: between edges i - 1 and i it lands in
+    piece 2i, on edge i in piece 2i + 1. A table of which intervals cover
+    each piece turns that into (position, interval) hits, which are grouped by
+    interval with one stable sort and handed to one GapAccumulator per
+    interval. Intervals may overlap.
+    """
+
+    def __init__(self, intervals, min_val=0.0, max_val=1.0):
+        self.intervals = [(float(low), float(high)) for low, high in intervals]
+        if not self.intervals or any(low > high for low, high in self.intervals):
+            raise ValueError("need at least one interval with low <= high")
+        self.accumulators = [GapAccumulator(low, high, min_val, max_val) for low, high in self.intervals]
+        self.n = 0
+        self.edges = np.unique(np.array(self.intervals).ravel())
+        lows = np.searchsorted(self.edges, [low for low, _ in self.intervals])
+        highs = np.searchsorted(self.edges, [high for _, high in self.intervals])
+        pieces = np.arange(2 * len(self.edges) + 1)[:, None]
+        cover = (pieces >= 2 * lows + 1) & (pieces <= 2 * highs + 1)
+        self.cover_count = cover.sum(axis=1)
+        self.cover_start = np.cumsum(self.cover_count) - self.cover_count
+        # Interval ids grouped by piece; 16-bit ids let the stable sort below use a radix sort
+        self.cover_ids = np.nonzero(cover)[1].astype(np.int16 if len(self.intervals) < 1 << 15 else np.int64)
+
+    def update(self, chunk):
+        chunk = np.asarray(chunk)
+        # With r edges <= x, x is in piece 2r, or on edge r - 1 (piece 2r - 1)
+        right = np.searchsorted(self.edges, chunk, 'right')
+        pieces = 2 * right - (self.edges[right - 1] == chunk)
+        covers = self.cover_count[pieces]
+        positions = np.repeat(np.arange(len(chunk)), covers)
+        # The j-th hit of a number is interval cover_ids[cover_start[piece] + j]
+        shift = np.repeat(self.cover_start[pieces] - (np.cumsum(covers) - covers), covers)
+        ids = self.cover_ids[shift + np.arange(len(positions))]
+        order = np.argsort(ids, kind='stable')
+        positions = positions[order]
+        bounds = np.searchsorted(ids[order], np.arange(len(self.accumulators) + 1))
+        for accumulator, start, stop in zip(self.accumulators, bounds[:-1], bounds[1:]):
+            accumulator.add_hits(positions[start:stop], len(chunk))
+        self.n += len(chunk)
+
+    def merge(self, other):
+        """Adds the gaps of an accumulator fed with the part of the stream right after this one."""
+        if other.intervals != self.intervals:
+            raise ValueError("Cannot merge gap accumulators with different intervals")
+        for accumulator, part in zip(self.accumulators, other.accumulators):
+            accumulator.merge(part)
+        self.n += other.n
+
+    def result(self, alpha):
+        """Returns one (low, high, result, k, mean_gap, chi_square_stat, p_value) per interval."""
+        return [(low, high) + accumulator.result(alpha)
+                for (low, high), accumulator in zip(self.intervals, self.accumulators)]
+
+def gap_block_p_values(blocks, low, high, min_val=0.0, max_val=1.0):
+    """Returns the gap test p-value of every row of a 2-D array of blocks.
+
+    Gaps are counted within each block. The in-range positions of all blocks
+    come from one np.nonzero in row order, and the gap lengths, capped at t,
+    are counted with one np.bincount offset by row. All blocks share the
+    classes t chosen for the block with the fewest gaps.
+    """
+    rows, _ = blocks.shape
+    p = GapAccumulator(low, high, min_val, max_val).probability()
+    if not 0 < p < 1:
+        raise ValueError("the gap interval must lie inside [min_val, max_val] and be narrower")
+    row, column = np.nonzero((blocks >= low) & (blocks <= high))
+    same = row[1:] == row[:-1]
+    gaps = (np.diff(column) - 1)[same]
+    row = row[1:][same]
+    k = np.bincount(row, minlength=rows)
+    if k.min() == 0:
+        raise ValueError("some blocks have no gaps; use longer blocks or a wider interval")
+    t = gap_classes(k.min(), p)
+    observed = np.bincount(row * (t + 1) + np.minimum(gaps, t), minlength=rows * (t + 1)).reshape(rows, t + 1)
+    expected = k[:, None] * gap_probabilities(p, t)
+    statistics = ((observed - expected) ** 2 / expected).sum(axis=1)
+    return chi2_sf_array(statistics, t)
+
+def gap_test(numbers, alpha, low, high, min_val=0.0, max_val=1.0, block_size=None):
+    """Performs the gap test on a list/array or a stream of chunks and returns the result.
+
+    With block_size the test runs on every block of that many numbers instead
+    and the result is chi_ks.second_level_test()'s.
+    """
+    if block_size:
+        return second_level_test(numbers, block_size, lambda blocks: gap_block_p_values(
+            blocks, low, high, min_val, max_val), alpha)
+    accumulator = GapAccumulator(low, high, min_val, max_val)
+    for chunk in iter_chunks(numbers):
+        accumulator.update(chunk)
+    return accumulator.result(alpha)
+
+def get_user_input():
+    while True:
+        try:
+            quantity = int(input("Enter the number of random numbers to generate: "))
+            if quantity > 0:
+                break
+            print("Quantity must be a positive integer.")
+        except ValueError:
+            print("Invalid input. Please enter an integer.")
+
+    while True:
+        try:
+            min_val = float(input("Enter the minimum value [0.0]: ") or 0.0)
+            max_val = float(input("Enter the maximum value [1.0]: ") or 1.0)
+            if min_val < max_val:
+                break
+            print("Minimum value must be less than maximum value.")
+        except ValueError:
+            print("Invalid input. Please enter a float.")
+
+    while True:
+        try:
+            precision = int(input("Enter decimal precision [5]: ") or 5)
+            if 1 <= precision <= 10:
+                break
+            print("Precision must be between 1 and 10.")
+        except ValueError:
+            print("Invalid input. Please enter an integer.")
+
+    while True:
+        try:
+            low = float(input("Enter the lower bound: "))
+            high = float(input("Enter the upper bound: "))
+            if low < high:
+                break
+            print("Lower bound must be less than upper bound.")
+        except ValueError:
+            print("Invalid input. Please enter a float.")
+
+    while True:
+        try:
+            alpha = float(input("Enter the significance level (alpha): "))
+            if 0 < alpha < 1:
+                break
+            print("Alpha must be between 0 and 1.")
+        except ValueError:
+            print("Invalid input. Please enter a float.")
+
+    return quantity, min_val, max_val, precision, low, high, alpha
+
+def interactive_main():
+    """Prompts for the parameters, then generates, reloads and tests the numbers."""
+    quantity, min_val, max_val, precision, low, high, alpha = get_user_input()
+    generate_random_numbers(quantity, min_val, max_val, precision, "gaprandom.bin")
+
+    accumulator = GapAccumulator(low, high, min_val, max_val)
+    for chunk in load_random_numbers("gaprandom.bin", quantity):
+        accumulator.update(chunk)
+
+    if accumulator.n < quantity:
+        print("Not enough data to perform the test.")
+    else:
+        result, k, mean_gap, chi_square_stat, p_value = accumulator.result(alpha)
+
+        table = [
+            ["Parameter", "Value"],
+            ["Number of Gaps", k],
+            ["Mean Gap", mean_gap],
+            ["Chi-square Statistic", chi_square_stat],
+            ["P-value", p_value],
+            ["Result", result]
+        ]
+        print(tabulate(table, headers="firstrow", tablefmt="grid"))
+
+if __name__ == "__main__":
+    from cli import main
+    main(["gap"] + sys.argv[1:])
@@ -0,0 +1,527 @@
+import re
+import sys
+from collections import namedtuple
+from tabulate import tabulate
+import variates
+from simulation import Facility, Queue, RandomStream, Simulation, Source, Storage, Table
+
+# Blocks and control statements of the supported GPSS World subset
+BLOCKS = ("GENERATE", "TERMINATE", "ADVANCE", "ENTER", "LEAVE", "SEIZE", "RELEASE", "QUEUE", "DEPART",
+          "GATE", "TRANSFER", "TABULATE")
+DEFINITIONS = ("STORAGE", "TABLE")
+CONTROLS = ("START", "END")
+GATE_CONDITIONS = {
+    "SNF": ("storage", lambda entity: not entity.is_full()),
+    "SF": ("storage", lambda entity: entity.is_full()),
+    "SE": ("storage", lambda entity: entity.contents == 0),
+    "SNE": ("storage", lambda entity: entity.contents > 0),
+    "U": ("facility", lambda entity: entity.is_busy()),
+    "NU": ("facility", lambda entity: not entity.is_busy()),
+}
+
+Statement = namedtuple("Statement", "line label operation operands")
+Block = namedtuple("Block", "operation args next")
+
+class GPSSError(ValueError):
+    """A model that cannot be parsed or compiled, with the source line it refers to."""
+
+    def __init__(self, message, line=None):
+        super().__init__(message if line is None else f"line {line}: {message}")
+        self.line = line
+
+def rtf_to_text(rtf):
+    """Returns the plain text of an RTF document: paragraphs become lines, formatting is dropped."""
+    text = []
+    depth = 0
+    skip_depth = None
+    token = re.compile(r"\\([a-z]+)(-?\d+)? ?|\\'([0-9a-fA-F]{2})|\\(.)|([{}])|([^\\{}\r\n]+)|[\r\n]+", re.S)
+    for match in token.finditer(rtf):
+        word, _, hex_code, symbol, brace, plain = match.groups()
+        if brace == "{":
+            depth += 1
+            continue
+        if brace == "}":
+            if skip_depth == depth:
+                skip_depth = None
+            depth -= 1
+            continue
+        if skip_depth is not None:
+            continue
+        if word:
+            if word in ("fonttbl", "colortbl", "stylesheet", "info", "pict"):
+                skip_depth = depth
+            elif word in ("par", "line"):
+                text.append("\n")
+            elif word == "tab":
+                text.append("\t")
+        elif symbol == "*":
+            # {\* ...} groups are optional destinations
+            skip_depth = depth
+        elif symbol:
+            text.append(symbol)
+        elif hex_code:
+            text.append(bytes([int(hex_code, 16)]).decode("cp1250"))
+        elif plain:
+            text.append(plain)
+    return "".join(text)
+
+def load_source(filename):
+    """Returns the model text of a GPSS World .gps file or a plain text model.
+
+    GPSS World saves the model as RTF inside a binary container; the RTF group
+    is cut out and converted to text. Files without RTF are read as text.
+    """
+    with open(filename, 'rb') as file:
+        data = file.read()
+    start = data.find(b"{\\rtf")
+    if start < 0:
+        return data.decode("latin-1")
+    depth = 0
+    for end in range(start, len(data)):
+        if data[end] == ord("{") and data[end - 1] != ord("\\"):
+            depth += 1
+        elif data[end] == ord("}") and data[end - 1] != ord("\\"):
+            depth -= 1
+            if depth == 0:
+                break
+    return rtf_to_text(data[start:end + 1].decode("latin-1"))
+
+def parse(text):
+    """Parses model text into Statements; names and operations are upper-cased as in GPSS reports."""
+    statements = []
+    keywords = BLOCKS + DEFINITIONS + CONTROLS
+    for number, line in enumerate(text.splitlines(), 1):
+        line = line.split(";", 1)[0].strip()
+        if not line or line.startswith("*"):
+            continue
+        fields = line.split()
+        label = None
+        if fields[0].upper() not in keywords:
+            label = fields.pop(0).upper()
+            if not fields:
+                raise GPSSError(f"label '{label}' without an operation", number)
+        operation = fields[0].upper()
+        if operation not in keywords:
+            raise GPSSError(f"no supported operation in '{line}'", number)
+        rest = fields[1:]
+        operands = []
+        if operation == "GATE":
+            if not rest:
+                raise GPSSError("GATE needs a condition", number)
+            operands.append(rest.pop(0).upper())
+        if rest:
+            operands.extend(operand.strip().upper() for operand in "".join(rest).split(","))
+        statements.append(Statement(number, label, operation, operands))
+    return statements
+
+def _number(text, line, default=None):
+    if text in (None, ""):
+        if default is None:
+            raise GPSSError("missing operand", line)
+        return default
+    try:
+        value = float(text)
+    except ValueError:
+        raise GPSSError(f"'{text}' is not a number", line) from None
+    return int(value) if value.is_integer() else value
+
+def _argument(text, line):
+    """Compiles an operand to ('const', value) or a standard numerical attribute (kind, name)."""
+    if text in (None, ""):
+        raise GPSSError("missing operand", line)
+    try:
+        return ("const", _number(text, line))
+    except GPSSError:
+        pass
+    if text in ("M1", "C1"):
+        return (text, None)
+    match = re.fullmatch(r"(S|R|Q|F)\$?([A-Z_][A-Z0-9_]*)", text)
+    if match:
+        return match.groups()
+    raise GPSSError(f"unsupported operand '{text}'", line)
+
+class Program:
+    """A compiled model: entity definitions and a table of blocks with resolved transitions.
+
+    Each block holds its operation, operands already converted to numbers,
+    entity names and block indices, and the index of the next block, so a run
+    only binds the entities and never looks at the source text again.
+    """
+
+    def __init__(self, blocks, storages, tables, labels, start=None):
+        self.blocks = blocks
+        self.storages = storages
+        self.tables = tables
+        self.labels = labels
+        self.start = start
+
+    def run(self, start=None, seed=None, generator="pcg64", until=None):
+        """Runs the model until the termination count `start` reaches zero and returns the report."""
+        start = start or self.start
+        if start is None and until is None:
+            raise ValueError("a START count or an end time is required")
+        return _Run(self, seed, generator).execute(start, until)
+
+def compile_model(statements):
+    """Compiles parsed statements into a Program."""
+    labels = {}
+    block_statements = []
+    storages, tables = {}, {}
+    start = None
+    for statement in statements:
+        if statement.operation == "STORAGE":
+            if not statement.label:
+                raise GPSSError("STORAGE needs a label", statement.line)
+            storages[statement.label] = _number(statement.operands[0] if statement.operands else None, statement.line)
+        elif statement.operation == "TABLE":
+            operands = statement.operands + [""] * (4 - len(statement.operands))
+            if not statement.label:
+                raise GPSSError("TABLE needs a label", statement.line)
+            tables[statement.label] = (_argument(operands[0], statement.line), _number(operands[1], statement.line),
+                                       _number(operands[2], statement.line), _number(operands[3], statement.line))
+        elif statement.operation == "START":
+            start = _number(statement.operands[0] if statement.operands else None, statement.line)
+        elif statement.operation == "END":
+            break
+        else:
+            if statement.label:
+                if statement.label in labels:
+                    raise GPSSError(f"label '{statement.label}' defined twice", statement.line)
+                labels[statement.label] = len(block_statements)
+            block_statements.append(statement)
+
+    def target(name, line):
+        if name not in labels:
+            raise GPSSError(f"undefined label '{name}'", line)
+        return labels[name]
+
+    blocks = []
+    for index, statement in enumerate(block_statements):
+        operation, line = statement.operation, statement.line
+        operands = statement.operands + [""] * (5 - len(statement.operands))
+        following = index + 1 if index + 1 < len(block_statements) else None
+        if operation == "GENERATE":
+            args = (_number(operands[0], line, 0), _number(operands[1], line, 0),
+                    _number(operands[2], line) if operands[2] else None,
+                    _number(operands[3], line) if operands[3] else None)
+        elif operation == "ADVANCE":
+            args = (_number(operands[0], line, 0), _number(operands[1], line, 0))
+        elif operation == "TERMINATE":
+            args = (_number(operands[0], line, 0),)
+            following = None
+        elif operation in ("ENTER", "LEAVE"):
+            if operands[0] not in storages:
+                raise GPSSError(f"storage '{operands[0]}' is not defined", line)
+            args = (operands[0], _number(operands[1], line, 1))
+        elif operation in ("SEIZE", "RELEASE", "QUEUE", "DEPART"):
+            if not operands[0]:
+                raise GPSSError(f"{operation} needs an entity name", line)
+            args = (operands[0],)
+        elif operation == "GATE":
+            condition, name, alternate = operands[0], operands[1], operands[2]
+            if condition not in GATE_CONDITIONS:
+                raise GPSSError(f"unsupported GATE condition '{condition}'", line)
+            if GATE_CONDITIONS[condition][0] == "storage" and name not in storages:
+                raise GPSSError(f"storage '{name}' is not defined", line)
+            args = (condition, name, target(alternate, line) if alternate else None)
+        elif operation == "TRANSFER":
+            mode, first, second = operands[0], operands[1], operands[2]
+            if mode == "":
+                args = (1.0, None, target(first, line))
+            else:
+                if not re.fullmatch(r"[0-9.]+", mode):
+                    raise GPSSError(f"unsupported TRANSFER mode '{mode}'", line)
+                # A fraction, or parts per thousand
+                fraction = _number(mode, line)
+                args = (fraction if fraction < 1 else fraction / 1000,
+                        target(first, line) if first else following, target(second, line))
+            following = None
+        elif operation == "TABULATE":
+            if operands[0] not in tables:
+                raise GPSSError(f"table '{operands[0]}' is not defined", line)
+            args = (operands[0], _number(operands[1], line, 1))
+        if following is None and operation not in ("TERMINATE", "TRANSFER"):
+            raise GPSSError(f"{operation} is the last block; transactions would have nowhere to go", line)
+        blocks.append(Block(operation, args, following))
+    if not any(block.operation == "GENERATE" for block in blocks):
+        raise GPSSError("the model has no GENERATE block")
+    return Program(blocks, storages, tables, labels, start)
+
+class _Transaction:
+    __slots__ = ("number", "mark", "block", "queued")
+
+    def __init__(self, number, mark):
+        self.number = number
+        self.mark = mark
+        self.block = None
+        self.queued = None
+
+class _Run:
+    """One run of a Program: the entities, one handler per block and the transaction mover."""
+
+    def __init__(self, program, seed, generator):
+        self.program = program
+        self.simulation = simulation = Simulation()
+        self.stream = RandomStream(generator, seed)
+        self.storages = {name: Storage(simulation, name, capacity) for name, capacity in program.storages.items()}
+        self.facilities = {}
+        self.queues = {}
+        self.tables = {name: Table(name, first, width, classes)
+                       for name, (_, first, width, classes) in program.tables.items()}
+        self.gate_waiters = {}
+        self.entry_counts = [0] * len(program.blocks)
+        self.current_counts = [0] * len(program.blocks)
+        self.transactions = 0
+        self.termination_count = None
+        self.handlers = [getattr(self, f"_compile_{block.operation.lower()}")(index, block)
+                         for index, block in enumerate(program.blocks)]
+
+    def _facility(self, name):
+        if name not in self.facilities:
+            self.facilities[name] = Facility(self.simulation, name)
+        return self.facilities[name]
+
+    def _queue(self, name):
+        if name not in self.queues:
+            self.queues[name] = Queue(self.simulation, name)
+        return self.queues[name]
+
+    def _value(self, argument):
+        kind, name = argument
+        simulation = self.simulation
+        if kind == "const":
+            return lambda xact: name
+        if kind == "M1":
+            return lambda xact: simulation.now - xact.mark
+        if kind == "C1":
+            return lambda xact: simulation.now
+        if kind in ("S", "R"):
+            if name not in self.storages:
+                raise GPSSError(f"storage '{name}' is not defined")
+            storage = self.storages[name]
+            return (lambda xact: storage.contents) if kind == "S" else (lambda xact: storage.available)
+        if kind == "Q":
+            queue = self._queue(name)
+            return lambda xact: queue.contents
+        facility = self._facility(name)
+        return lambda xact: int(facility.is_busy())
+
+    def _time(self, mean, spread):
+        """Returns a sampler of GPSS A +- B times (a constant when B is 0)."""
+        if not spread:
+            return lambda: mean
+        return self.stream.sampler(variates.Spread(mean, spread))
+
+    # Move a transaction through the blocks until it is delayed, blocked or terminated
+    def move(self, xact, index):
+        handlers, entries = self.handlers, self.entry_counts
+        while True:
+            entries[index] += 1
+            following = handlers[index](xact)
+            if following is None:
+                xact.block = index
+                self.current_counts[index] += 1
+                return
+            if following < 0:
+                return
+            index = following
+
+    def resume(self, xact, index):
+        self.current_counts[xact.block] -= 1
+        self.move(xact, index)
+
+    def wake(self, xact, index):
+        """Resumes a transaction that waited for an entity, after the current one has moved on."""
+        self.simulation.schedule(0.0, self.resume, xact, index)
+
+    def _retry_gates(self, name):
+        waiters = self.gate_waiters.get(name)
+        if waiters:
+            self.gate_waiters[name] = []
+            for xact, index in waiters:
+                self.simulation.schedule(0.0, self._retry, xact, index)
+
+    def _retry(self, xact, index):
+        # A retried GATE is not a new entry
+        self.entry_counts[index] -= 1
+        self.resume(xact, index)
+
+    def _compile_generate(self, index, block):
+        mean, spread, offset, limit = block.args
+        following = block.next
+
+        def create():
+            self.transactions += 1
+            self.move(_Transaction(self.transactions, self.simulation.now), index)
+        Source(self.simulation, self._time(mean, spread), create, first=offset, limit=limit)
+        return lambda xact: following
+
+    def _compile_terminate(self, index, block):
+        count = block.args[0]
+
+        def terminate(xact):
+            if count and self.termination_count is not None:
+                self.termination_count -= count
+                if self.termination_count <= 0:
+                    self.simulation.stop()
+            return -1
+        return terminate
+
+    def _compile_advance(self, index, block):
+        duration = self._time(*block.args)
+        schedule, resume, following = self.simulation.schedule, self.resume, block.next
+
+        def advance(xact):
+            schedule(duration(), resume, xact, following)
+        return advance
+
+    def _compile_enter(self, index, block):
+        name, count = block.args
+        storage, following = self.storages[name], block.next
+
+        def enter(xact):
+            if storage.try_enter(count):
+                self._retry_gates(name)
+                return following
+            storage.enter(self._entered, count, xact, following, name)
+        return enter
+
+    def _entered(self, xact, index, name):
+        self.wake(xact, index)
+        self._retry_gates(name)
+
+    def _compile_leave(self, index, block):
+        name, count = block.args
+        storage, following = self.storages[name], block.next
+
+        def leave(xact):
+            storage.leave(count)
+            self._retry_gates(name)
+            return following
+        return leave
+
+    def _compile_seize(self, index, block):
+        name = block.args[0]
+        facility, following = self._facility(name), block.next
+
+        def seize(xact):
+            if facility.try_enter(1):
+                self._retry_gates(name)
+                return following
+            facility.seize(self._entered, xact, following, name)
+        return seize
+
+    def _compile_release(self, index, block):
+        name = block.args[0]
+        facility, following = self._facility(name), block.next
+
+        def release(xact):
+            facility.release()
+            self._retry_gates(name)
+            return following
+        return release
+
+    def _compile_queue(self, index, block):
+        name = block.args[0]
+        queue, following = self._queue(name), block.next
+
+        def join(xact):
+            if xact.queued is None:
+                xact.queued = {}
+            xact.queued[name] = queue.join()
+            return following
+        return join
+
+    def _compile_depart(self, index, block):
+        name = block.args[0]
+        queue, following = self._queue(name), block.next
+
+        def depart(xact):
+            queue.depart(xact.queued.pop(name))
+            return following
+        return depart
+
+    def _compile_gate(self, index, block):
+        condition, name, alternate = block.args
+        kind, test = GATE_CONDITIONS[condition]
+        entity = self.storages[name] if kind == "storage" else self._facility(name)
+        following = block.next
+
+        def gate(xact):
+            if test(entity):
+                return following
+            if alternate is not None:
+                return alternate
+            # Refused: wait until the entity changes, then try again
+            self.gate_waiters.setdefault(name, []).append((xact, index))
+        return gate
+
+    def _compile_transfer(self, index, block):
+        fraction, first, second = block.args
+        if fraction >= 1.0:
+            return lambda xact: second
+        draw = self.stream.random
+        return lambda xact: second if draw() < fraction else first
+
+    def _compile_tabulate(self, index, block):
+        name, weight = block.args
+        table, value = self.tables[name], self._value(self.program.tables[name][0])
+        following = block.next
+
+        def tabulate_(xact):
+            for _ in range(weight):
+                table.tabulate(value(xact))
+            return following
+        return tabulate_
+
+    def execute(self, start, until):
+        self.termination_count = start
+        self.simulation.run(until=until)
+        labels = {index: label for label, index in self.program.labels.items()}
+        return {
+            "end_time": self.simulation.now,
+            "transactions": self.transactions,
+            "blocks": [[labels.get(index, ""), index + 1, block.operation, self.entry_counts[index],
+                        self.current_counts[index]] for index, block in enumerate(self.program.blocks)],
+            "facilities": {name: facility.report() for name, facility in self.facilities.items()},
+            "storages": {name: storage.report() for name, storage in self.storages.items()},
+            "queues": {name: queue.report() for name, queue in self.queues.items()},
+            "tables": {name: table.report() for name, table in self.tables.items()},
+        }
+
+def load_model(filename):
+    """Loads, parses and compiles a model file."""
+    return compile_model(parse(load_source(filename)))
+
+def print_report(title, report):
+    """Prints a run report in the layout of a GPSS World report."""
+    print(f"\n{title}")
+    print(f"End time: {report['end_time']:.3f}   Transactions: {report['transactions']}")
+    print()
+    print(tabulate(report["blocks"], headers=["Label", "Loc", "Block type", "Entry count", "Current count"],
+                   tablefmt="simple"))
+    if report["facilities"]:
+        print()
+        print(tabulate([[name, r["entries"], r["utilization"], r["average_time"], r["delay"]]
+                        for name, r in report["facilities"].items()],
+                       headers=["Facility", "Entries", "Util.", "Ave. time", "Delay"], tablefmt="simple",
+                       floatfmt=".3f"))
+    if report["queues"]:
+        print()
+        print(tabulate([[name, r["max"], r["contents"], r["entries"], r["zero_entries"], r["average_contents"],
+                         r["average_time"], r["average_time_nonzero"]] for name, r in report["queues"].items()],
+                       headers=["Queue", "Max", "Cont.", "Entry", "Entry(0)", "Ave. cont.", "Ave. time", "Ave.(-0)"],
+                       tablefmt="simple", floatfmt=".3f"))
+    if report["storages"]:
+        print()
+        print(tabulate([[name, r["capacity"], r["remaining"], r["max"], r["entries"], r["average_contents"],
+                         r["utilization"], r["delay"]] for name, r in report["storages"].items()],
+                       headers=["Storage", "Cap.", "Rem.", "Max.", "Entries", "Ave. C.", "Util.", "Delay"],
+                       tablefmt="simple", floatfmt=".3f"))
+    for name, table in report["tables"].items():
+        print(f"\nTable {name}: entries {table['entries']}, mean {table['mean']:.3f}, std {table['std']:.3f}")
+        print(tabulate(table["frequencies"], headers=["Upper limit", "Frequency"], tablefmt="simple"))
+
+if __name__ == "__main__":
+    from cli import main
+    main(["gpss"] + sys.argv[1:])
@@ -0,0 +1,154 @@
+import sys
+import threading
+import time
+from contextlib import nullcontext
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Stages the pipeline is instrumented with, in report order; other names are reported after them
+STAGES = ("generate", "format", "write", "load", "test", "report")
+
+_enabled = False
+_records = {}
+# Stages currently running in each thread, innermost last, as [record, start time, file, file position]
+_local = threading.local()
+_lock = threading.Lock()
+_DISABLED = nullcontext()
+
+class StageRecord:
+    """Totals of one stage: calls, exclusive seconds, samples, bytes and the peak RSS seen at its end."""
+
+    __slots__ = ("name", "calls", "seconds", "samples", "bytes", "peak_rss")
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.seconds = 0.0
+        self.samples = 0
+        self.bytes = 0
+        self.peak_rss = 0
+
+    def as_dict(self):
+        return {"stage": self.name, "calls": self.calls, "seconds": self.seconds, "samples": self.samples,
+                "samples_per_s": self.samples / self.seconds if self.samples and self.seconds > 0 else None,
+                "bytes": self.bytes, "peak_rss_mb": self.peak_rss / 2 ** 20 if self.peak_rss else None}
+
+def peak_rss():
+    """Returns the peak resident set size of the process so far in bytes, or 0 if unknown."""
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+class _Stage:
+    __slots__ = ("record", "samples", "nbytes", "file")
+
+    def __init__(self, record, samples, nbytes, file):
+        self.record = record
+        self.samples = samples
+        self.nbytes = nbytes
+        self.file = file
+
+    def __enter__(self):
+        active = _active()
+        now = time.perf_counter()
+        if active:
+            # Time spent in a nested stage is not counted for the stage around it
+            outer = active[-1]
+            with _lock:
+                outer[0].seconds += now - outer[1]
+        active.append([self.record, now, self.file, self.file.tell() if self.file is not None else 0])
+        return self
+
+    def __exit__(self, *exc_info):
+        active = _active()
+        now = time.perf_counter()
+        record, start, file, position = active.pop()
+        nbytes = self.nbytes
+        if file is not None and not file.closed:
+            nbytes += file.tell() - position
+        rss = peak_rss()
+        with _lock:
+            record.seconds += now - start
+            record.calls += 1
+            record.samples += self.samples
+            record.bytes += nbytes
+            record.peak_rss = max(record.peak_rss, rss)
+        if active:
+            active[-1][1] = now
+        return False
+
+def _active():
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+def enable():
+    """Starts collecting stage timings; they accumulate until reset()."""
+    global _enabled
+    _enabled = True
+
+def disable():
+    global _enabled
+    _enabled = False
+
+def is_enabled():
+    return _enabled
+
+def reset():
+    _records.clear()
+
+def stage(name, samples=0, nbytes=0, file=None):
+    """Returns a context manager that charges the time it spans to stage `name`.
+
+    `samples` and `nbytes` are added to the stage's counters; with `file`, the
+    bytes by which its position advances are counted as well. Time spent in a
+    stage entered inside another one is charged to the inner stage only, and
+    stages running in several threads at once add up their times.
+    When instrumentation is disabled this returns a shared no-op context.
+    """
+    if not _enabled:
+        return _DISABLED
+    with _lock:
+        record = _records.get(name)
+        if record is None:
+            record = _records[name] = StageRecord(name)
+    return _Stage(record, samples, nbytes, file)
+
+def timed_chunks(name, chunks):
+    """Charges the time spent producing each chunk of an iterator to stage `name`.
+
+    Returns `chunks` itself when instrumentation is disabled.
+    """
+    if not _enabled:
+        return chunks
+    return _timed_chunks(name, iter(chunks))
+
+def _timed_chunks(name, chunks):
+    while True:
+        with stage(name) as timer:
+            chunk = next(chunks, None)
+            if chunk is not None:
+                timer.samples = len(chunk)
+        if chunk is None:
+            return
+        yield chunk
+
+def report():
+    """Returns the totals of every stage as a list of dicts, in pipeline order."""
+    order = {name: index for index, name in enumerate(STAGES)}
+    records = sorted(_records.values(), key=lambda record: order.get(record.name, len(STAGES)))
+    return [record.as_dict() for record in records]
+
+def format_report(rows):
+    """Returns the stage totals as a text table."""
+    from tabulate import tabulate
+    return tabulate([[row["stage"], row["calls"], row["seconds"], row["samples"], row["samples_per_s"], row["bytes"],
+                      row["peak_rss_mb"]] for row in rows],
+                    headers=["Stage", "Calls", "Seconds", "Samples", "Samples/s", "Bytes", "Peak RSS (MB)"],
+                    tablefmt="grid", floatfmt=".4g")
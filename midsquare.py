@@ -1,90 +1,193 @@
-import numpy as np
-from scipy.stats import chisquare
-from tabulate import tabulate
-import os
-
-def generate_random_numbers(seed, num_digits, quantity):
-    """Generate random numbers using the mid-square method."""
-    random_numbers = []
-    for _ in range(quantity):
-        # Square the seed
-        squared = seed ** 2
-        # Zero pad the squared number to make sure it has at least 2 * num_digits
-        squared_str = str(squared).zfill(num_digits * 2)
-        # Extract the middle digits based on num_digits
-        mid_start = (len(squared_str) - num_digits) // 2
-        mid_end = mid_start + num_digits
-        # Extract middle digits and update seed
-        seed = int(squared_str[mid_start:mid_end])
-        random_numbers.append(seed)
-    return random_numbers
-
-def chi_square_test(numbers, num_bins=10, alpha=0.05):
-    """Performs Chi-Square test to check if numbers are uniformly distributed."""
-    # Create bins and count the occurrences of numbers in each bin
-    counts, bin_edges = np.histogram(numbers, bins=num_bins, range=(0, 9999))
-    
-    # Expected frequencies if the numbers were uniformly distributed
-    expected = np.full_like(counts, fill_value=len(numbers) / num_bins)
-    
-    # Perform the Chi-square test
-    chi2_stat, p_value = chisquare(counts, expected)
-    
-    # Determine acceptance based on the p-value
-    result = "Accepted" if p_value > alpha else "Rejected"
-    return result, chi2_stat, p_value
-
-def save_numbers_to_file(numbers, filename="midsquare.txt"):
-    """Saves the generated random numbers to a file."""
-    with open(filename, 'w') as file:
-        for num in numbers:
-            file.write(f"{num}\n")
-    print(f"Random numbers saved to {filename}")
-
-def get_user_input():
-    """Prompts the user for input and returns the values."""
-    while True:
-        try:
-            seed = int(input("Enter the seed (number of digits must match): "))
-            num_digits = int(input("Enter the number of digits to consider: "))
-            quantity = int(input("Enter the number of random numbers to generate: "))
-            alpha = float(input("Enter the significance level (alpha): "))
-            if 0 < alpha < 1:
-                break
-            else:
-                print("Alpha must be between 0 and 1.")
-        except ValueError:
-            print("Invalid input. Please enter valid integers or floats.")
-    return seed, num_digits, quantity, alpha
-
-def display_numbers_in_rows(numbers, numbers_per_row=10):
-    """Displays the numbers in rows with 10 numbers per row."""
-    for i in range(0, len(numbers), numbers_per_row):
-        print(" | ".join(str(num) for num in numbers[i:i+numbers_per_row]))
-
-if __name__ == "__main__":
-    # Get user input
-    seed, num_digits, quantity, alpha = get_user_input()
-
-    # Generate random numbers using Mid-Square method
-    random_numbers = generate_random_numbers(seed, num_digits, quantity)
-
-    # Save the numbers to a file
-    save_numbers_to_file(random_numbers)
-
-    # Display the numbers in rows of 10 numbers each
-    print("\nGenerated Random Numbers:")
-    display_numbers_in_rows(random_numbers)
-
-    # Test randomness using Chi-Square test
-    result, chi2_stat, p_value = chi_square_test(random_numbers)
-
-    # Display results
-    table = [
-        ["Parameter", "Value"],
-        ["Chi-square Statistic", chi2_stat],
-        ["P-value", p_value],
-        ["Result", result]
-    ]
-    print("\nChi-Square Test Results:")
-    print(tabulate(table, headers="firstrow", tablefmt="grid"))
+import numpy as np
+from tabulate import tabulate
+import os
+import sys
+from instrument import stage
+from pvalues import chi2_sf
+
+# Widths up to 9 digits square into less than 10**18, so the state fits in uint64
+MAX_UINT64_DIGITS = 9
+
+def next_seed(seed, num_digits):
+    """Returns the middle num_digits digits of seed squared using integer arithmetic."""
+    squared = seed * seed
+    width = 2 * num_digits
+    limit = 10 ** width
+    # A seed with more digits than num_digits squares wider than 2 * num_digits
+    while squared >= limit:
+        width += 1
+        limit *= 10
+    drop = width - (width - num_digits) // 2 - num_digits
+    return (squared // 10 ** drop) % 10 ** num_digits
+
+def find_cycle(seed, num_digits, max_steps=None):
+    """Finds the tail length and period of the sequence started at seed (Brent's method).
+
+    The sequence is seed, x1, x2, ... ; tail is the index of the first value that
+    belongs to the cycle and period is the cycle length. Only a constant number of
+    values is kept in memory. Returns (None, None) if no cycle shows up within
+    max_steps iterations.
+    """
+    power = period = 1
+    tortoise = seed
+    hare = next_seed(seed, num_digits)
+    steps = 1
+    while tortoise != hare:
+        if max_steps is not None and steps >= max_steps:
+            return None, None
+        if power == period:
+            tortoise = hare
+            power *= 2
+            period = 0
+        hare = next_seed(hare, num_digits)
+        period += 1
+        steps += 1
+
+    tail = 0
+    tortoise = hare = seed
+    for _ in range(period):
+        hare = next_seed(hare, num_digits)
+    while tortoise != hare:
+        tortoise = next_seed(tortoise, num_digits)
+        hare = next_seed(hare, num_digits)
+        tail += 1
+    return tail, period
+
+def is_degenerate(seed, num_digits, tail, period, min_period=10):
+    """Returns True if the sequence collapses to zero or cycles in fewer than min_period values."""
+    if period is None:
+        return False
+    value = seed
+    for _ in range(tail):
+        value = next_seed(value, num_digits)
+    return value == 0 or period < min_period
+
+def generate_with_cycle(seed, num_digits, quantity):
+    """Generate mid-square numbers and return (numbers, tail, period).
+
+    Widths up to MAX_UINT64_DIGITS return a uint64 NumPy array, wider seeds a list
+    of Python ints. Once the cycle is known the rest of the stream is filled by
+    indexing into the values already generated instead of squaring again.
+    """
+    with stage("generate", quantity):
+        tail, period = find_cycle(seed, num_digits, max_steps=quantity)
+        head = quantity if period is None else min(quantity, tail + period)
+
+        fits = num_digits <= MAX_UINT64_DIGITS
+        numbers = np.empty(quantity, dtype=np.uint64) if fits else [0] * quantity
+
+        value = seed
+        if head and value >= 10 ** num_digits:
+            value = next_seed(value, num_digits)
+            numbers[0] = value
+            start = 1
+        else:
+            start = 0
+        divisor = 10 ** (num_digits - num_digits // 2)
+        modulus = 10 ** num_digits
+        for i in range(start, head):
+            value = (value * value // divisor) % modulus
+            numbers[i] = value
+
+        if head < quantity:
+            # Output position i holds x(i + 1); positions past the head repeat the cycle
+            if fits:
+                index = tail + (np.arange(head + 1, quantity + 1) - tail) % period
+                index[index < 1] += period
+                numbers[head:] = numbers[index - 1]
+            else:
+                for i in range(head, quantity):
+                    j = tail + (i + 1 - tail) % period
+                    if j < 1:
+                        j += period
+                    numbers[i] = numbers[j - 1]
+    return numbers, tail, period
+
+def generate_random_numbers(seed, num_digits, quantity):
+    """Generate random numbers using the mid-square method."""
+    numbers, _, _ = generate_with_cycle(seed, num_digits, quantity)
+    return numbers
+
+def chi_square_test(numbers, num_bins=10, alpha=0.05, num_digits=4):
+    """Performs Chi-Square test to check if numbers are uniformly distributed."""
+    # Create bins and count the occurrences of numbers in each bin
+    counts, bin_edges = np.histogram(numbers, bins=num_bins, range=(0, 10 ** num_digits - 1))
+    
+    # Expected frequencies if the numbers were uniformly distributed
+    expected = np.full_like(counts, fill_value=len(numbers) / num_bins)
+    
+    # Perform the Chi-square test
+    chi2_stat = np.sum((counts - expected) ** 2 / expected)
+    p_value = chi2_sf(chi2_stat, num_bins - 1)
+    
+    # Determine acceptance based on the p-value
+    result = "Accepted" if p_value > alpha else "Rejected"
+    return result, chi2_stat, p_value
+
+def save_numbers_to_file(numbers, filename="midsquare.txt", echo=True):
+    """Saves the generated random numbers to a file."""
+    with open(filename, 'w') as file, stage("write", len(numbers), file=file):
+        for num in numbers:
+            file.write(f"{num}\n")
+    if echo:
+        print(f"Random numbers saved to {filename}")
+
+def get_user_input():
+    """Prompts the user for input and returns the values."""
+    while True:
+        try:
+            seed = int(input("Enter the seed (number of digits must match): "))
+            num_digits = int(input("Enter the number of digits to consider: "))
+            quantity = int(input("Enter the number of random numbers to generate: "))
+            alpha = float(input("Enter the significance level (alpha): "))
+            if 0 < alpha < 1:
+                break
+            else:
+                print("Alpha must be between 0 and 1.")
+        except ValueError:
+            print("Invalid input. Please enter valid integers or floats.")
+    return seed, num_digits, quantity, alpha
+
+def display_numbers_in_rows(numbers, numbers_per_row=10):
+    """Displays the numbers in rows with 10 numbers per row."""
+    for i in range(0, len(numbers), numbers_per_row):
+        print(" | ".join(str(num) for num in numbers[i:i+numbers_per_row]))
+
+def interactive_main():
+    """Prompts for the parameters, then generates, saves and tests the numbers."""
+    # Get user input
+    seed, num_digits, quantity, alpha = get_user_input()
+
+    # Generate random numbers using Mid-Square method
+    random_numbers, tail, period = generate_with_cycle(seed, num_digits, quantity)
+
+    # Save the numbers to a file
+    save_numbers_to_file(random_numbers)
+
+    # Display the numbers in rows of 10 numbers each
+    print("\nGenerated Random Numbers:")
+    display_numbers_in_rows(random_numbers)
+
+    # Test randomness using Chi-Square test
+    result, chi2_stat, p_value = chi_square_test(random_numbers, num_digits=num_digits)
+
+    # Display results
+    table = [
+        ["Parameter", "Value"],
+        ["Chi-square Statistic", chi2_stat],
+        ["P-value", p_value],
+        ["Result", result]
+    ]
+    print("\nChi-Square Test Results:")
+    print(tabulate(table, headers="firstrow", tablefmt="grid"))
+
+    if period is None:
+        print(f"\nNo cycle found within the first {quantity} numbers.")
+    else:
+        print(f"\nTail length: {tail}, Period: {period}")
+        if is_degenerate(seed, num_digits, tail, period):
+            print("Warning: the sequence degenerates to zero or a very short cycle.")
+
+if __name__ == "__main__":
+    from cli import main
+    main(["midsquare"] + sys.argv[1:])
@@ -0,0 +1,135 @@
+import sys
+from collections import deque
+from tabulate import tabulate
+import variates
+from simulation import Facility, Queue, RandomStream, Simulation, Source, Table
+
+# Defaults of the report models. The reports do not show the GPSS source, so
+# the times are chosen to give loads like the ones reported; a number is an
+# exponential mean, a pair (A, B) is GPSS-style uniform A +- B, and any
+# variates.from_spec tuple such as ("weibull", 1.5, 10.0) also works.
+MODELS = {
+    "grocery": dict(queues=1, servers_per_queue=1, interarrival=4.5, service=(3.5, 1.5), duration=100.0,
+                    server_name="CLERK", queue_name="LINE"),
+    "barber-1q2": dict(queues=1, servers_per_queue=2, interarrival=6.0, service=(10.0, 2.0), customers=100),
+    "barber-1q3": dict(queues=1, servers_per_queue=3, interarrival=6.0, service=(10.0, 2.0), customers=100),
+    "barber-2q2": dict(queues=2, servers_per_queue=2, interarrival=3.0, service=(10.0, 2.0), customers=100),
+}
+
+def sampler(stream, spec):
+    """Returns a zero-argument sampler for a time spec (see variates.from_spec)."""
+    return stream.sampler(variates.from_spec(spec))
+
+class _Line:
+    """One waiting line: its queue statistics, its servers and the customers waiting for them."""
+
+    def __init__(self, simulation, queue_name, servers):
+        self.queue = Queue(simulation, queue_name)
+        self.servers = servers
+        self.waiting = deque()
+        self.busy = 0
+
+def _shortest(lines):
+    """Returns the line with the fewest customers, the first one on ties.
+
+    A plain loop: min() with a key method costs about twice as much, once per arrival.
+    """
+    best = lines[0]
+    shortest = best.busy + len(best.waiting)
+    for line in lines[1:]:
+        length = line.busy + len(line.waiting)
+        if length < shortest:
+            best, shortest = line, length
+    return best
+
+def service_system(queues=1, servers_per_queue=1, interarrival=6.0, service=(10.0, 2.0), customers=None,
+                   duration=None, seed=None, generator="pcg64", server_name="BARBER", queue_name="QUEUE"):
+    """Simulates customers choosing the shortest of `queues` lines, each served by its own servers.
+
+    A customer joins the shortest line (the first one on ties), waits for the
+    first free server of that line, is served and leaves. The run ends after
+    `customers` customers have left or at time `duration`, whichever comes
+    first. Returns the report dict.
+    """
+    if customers is None and duration is None:
+        raise ValueError("customers or duration is required")
+    simulation = Simulation()
+    stream = RandomStream(generator, seed)
+    service_time = sampler(stream, service)
+    lines = []
+    for i in range(queues):
+        first = i * servers_per_queue + 1
+        names = [f"{server_name}{first + j}" for j in range(servers_per_queue)] \
+            if queues * servers_per_queue > 1 else [server_name]
+        lines.append(_Line(simulation, f"{queue_name}{i + 1}" if queues > 1 else queue_name,
+                           [Facility(simulation, name) for name in names]))
+    waiting = Table("WAITING", 0.0, 5.0, 20)
+    in_system = Table("IN_SYSTEM", 5.0, 5.0, 20)
+    done = [0]
+
+    def start_service(line, arrived):
+        for server in line.servers:
+            if not server.contents:
+                break
+        line.busy += 1
+        server.seize(simulation.schedule, service_time(), finish, line, server, arrived)
+
+    def arrive():
+        line = _shortest(lines) if queues > 1 else lines[0]
+        if line.busy < len(line.servers):
+            line.queue.pass_through()
+            waiting.tabulate(0.0)
+            start_service(line, simulation.now)
+        else:
+            line.waiting.append(line.queue.join())
+
+    def finish(line, server, arrived):
+        server.release()
+        line.busy -= 1
+        in_system.tabulate(simulation.now - arrived)
+        if line.waiting:
+            entered = line.waiting.popleft()
+            line.queue.depart(entered)
+            waiting.tabulate(simulation.now - entered)
+            start_service(line, entered)
+        done[0] += 1
+        if done[0] == customers:
+            simulation.stop()
+
+    source = Source(simulation, sampler(stream, interarrival), arrive)
+    simulation.run(until=duration)
+    return {
+        "end_time": simulation.now,
+        "arrivals": source.count,
+        "customers": done[0],
+        "events": simulation.events_processed,
+        "facilities": {server.name: server.report() for line in lines for server in line.servers},
+        "queues": {line.queue.name: line.queue.report() for line in lines},
+        "tables": {table.name: table.report() for table in (waiting, in_system)},
+    }
+
+def run_model(name, **overrides):
+    """Runs one of MODELS with its defaults replaced by the non-None overrides."""
+    params = dict(MODELS[name])
+    params.update({key: value for key, value in overrides.items() if value is not None})
+    return service_system(**params)
+
+def print_report(title, report):
+    """Prints a report in the layout of a GPSS World report."""
+    print(f"\n{title}")
+    print(f"End time: {report['end_time']:.3f}   Arrivals: {report['arrivals']}   Customers served: {report['customers']}")
+    print(tabulate([[name, r["entries"], r["utilization"], r["average_time"], r["delay"]]
+                    for name, r in report["facilities"].items()],
+                   headers=["Facility", "Entries", "Util.", "Ave. time", "Delay"], tablefmt="simple", floatfmt=".3f"))
+    print()
+    print(tabulate([[name, r["max"], r["contents"], r["entries"], r["zero_entries"], r["average_contents"],
+                     r["average_time"], r["average_time_nonzero"]] for name, r in report["queues"].items()],
+                   headers=["Queue", "Max", "Cont.", "Entry", "Entry(0)", "Ave. cont.", "Ave. time", "Ave.(-0)"],
+                   tablefmt="simple", floatfmt=".3f"))
+    for name, table in report["tables"].items():
+        print(f"\nTable {name}: entries {table['entries']}, mean {table['mean']:.3f}, std {table['std']:.3f}")
+        print(tabulate(table["frequencies"], headers=["Upper limit", "Frequency"], tablefmt="simple"))
+
+if __name__ == "__main__":
+    from cli import main
+    main(["sim"] + sys.argv[1:])
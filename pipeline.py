@@ -0,0 +1,159 @@
+import asyncio
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from battery import battery_report, build_accumulators
+from instrument import stage
+from samplestore import SampleWriter
+from stream import DEFAULT_CHUNK_SIZE, generate_chunks
+
+DEFAULT_QUEUE_SIZE = 4
+# Marks the end of the stream in every queue
+_END = None
+
+class BatteryPipeline:
+    """Generates a stream and runs the test battery on it while it is produced.
+
+    One producer draws chunks from stream.generate_chunks and puts each one in
+    a bounded asyncio.Queue per consumer: one per battery test and, with
+    filename, one that appends the chunks to a sample file as
+    gaptest.generate_random_numbers would. A full queue makes the producer
+    wait, so at most queue_size chunks per consumer are in memory. Generating,
+    writing and updating an accumulator run in the executor, so a slow disk or
+    test does not stop the other stages. The default executor is a thread
+    pool with one thread per core, since NumPy releases the GIL for most of
+    the work; more threads than cores only add switching. partial() gives the results so far
+    while the stream runs.
+    """
+
+    def __init__(self, quantity, seed=None, generator="pcg64", chunk_size=DEFAULT_CHUNK_SIZE, filename=None,
+                 queue_size=DEFAULT_QUEUE_SIZE, executor=None, **params):
+        self.quantity = quantity
+        self.seed = seed
+        self.generator = generator
+        self.chunk_size = chunk_size
+        self.filename = filename
+        self.queue_size = queue_size
+        self.executor = executor
+        self.params = params
+        self.accumulators = build_accumulators(**params)
+        # Samples each test has taken in so far, and a lock held while its accumulator is updated
+        self.counts = dict.fromkeys(self.accumulators, 0)
+        self.locks = {}
+        self.produced = 0
+        self.written = 0
+        self.done = False
+        self._executor = None
+
+    async def run(self, alpha=0.05):
+        """Runs the whole stream through the battery and returns (rows, count) like battery.run_battery."""
+        loop = asyncio.get_running_loop()
+        self.locks = {name: asyncio.Lock() for name in self.accumulators}
+        queues = {name: asyncio.Queue(self.queue_size) for name in self.accumulators}
+        executor = self._executor = self.executor or ThreadPoolExecutor(min(len(queues) + 2, os.cpu_count() or 1))
+        tasks = [asyncio.create_task(self._test(loop, executor, name, queue)) for name, queue in queues.items()]
+        if self.filename is not None:
+            queues["write"] = asyncio.Queue(self.queue_size)
+            tasks.append(asyncio.create_task(self._write(loop, executor, queues["write"])))
+        tasks.append(asyncio.create_task(self._produce(loop, executor, list(queues.values()))))
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+        finally:
+            self._executor = None
+            if executor is not self.executor:
+                executor.shutdown(wait=False)
+        self.done = True
+        return battery_report(self.accumulators, alpha), self.produced
+
+    async def partial(self, alpha=0.05):
+        """Returns (rows, count) for the samples every test has taken in so far.
+
+        Returns None until every test has taken in its first chunk. Each
+        accumulator is locked in turn, so every row is consistent; tests may
+        be up to queue_size chunks ahead of count. The report is computed in
+        the executor, so the stream keeps flowing meanwhile.
+        """
+        if min(self.counts.values()) == 0:
+            return None
+        for lock in self.locks.values():
+            await lock.acquire()
+        try:
+            loop = asyncio.get_running_loop()
+            rows = await loop.run_in_executor(self._executor, battery_report, self.accumulators, alpha)
+            return rows, min(self.counts.values())
+        finally:
+            for lock in self.locks.values():
+                lock.release()
+
+    async def _produce(self, loop, executor, queues):
+        chunks = generate_chunks(self.quantity, self.params.get("min_val", 0.0), self.params.get("max_val", 1.0),
+                                 self.params.get("precision", 5), self.seed, self.chunk_size, generator=self.generator)
+        while True:
+            chunk = await loop.run_in_executor(executor, next, chunks, _END)
+            for queue in queues:
+                await queue.put(chunk)
+            if chunk is _END:
+                return
+            self.produced += len(chunk)
+
+    async def _test(self, loop, executor, name, queue):
+        accumulator = self.accumulators[name]
+        lock = self.locks[name]
+
+        def update(chunk):
+            with stage("test", len(chunk)):
+                accumulator.update(chunk)
+
+        while True:
+            chunk = await queue.get()
+            if chunk is _END:
+                return
+            async with lock:
+                await loop.run_in_executor(executor, update, chunk)
+                self.counts[name] += len(chunk)
+
+    async def _write(self, loop, executor, queue):
+        writer = SampleWriter(self.filename, generator=self.generator, seed=self.seed,
+                              precision=self.params.get("precision", 5))
+        try:
+            while True:
+                chunk = await queue.get()
+                if chunk is _END:
+                    return
+                await loop.run_in_executor(executor, writer.write, chunk)
+                self.written += len(chunk)
+        finally:
+            writer.close()
+
+async def watch(pipeline, alpha, interval, callback):
+    """Calls callback(rows, count) with pipeline.partial() every `interval` seconds until the run ends.
+
+    Intervals that end before every test has seen data are skipped.
+    """
+    while not pipeline.done:
+        await asyncio.sleep(interval)
+        if not pipeline.done:
+            partial = await pipeline.partial(alpha)
+            if partial is not None:
+                callback(*partial)
+
+async def run_pipeline(pipeline, alpha=0.05, interval=None, callback=None):
+    """Runs a BatteryPipeline, reporting partial results every `interval` seconds if given.
+
+    Returns (rows, count).
+    """
+    if interval is None or callback is None:
+        return await pipeline.run(alpha)
+    watcher = asyncio.create_task(watch(pipeline, alpha, interval, callback))
+    try:
+        return await pipeline.run(alpha)
+    finally:
+        watcher.cancel()
+
+if __name__ == "__main__":
+    from cli import main
+    main(["stream"] + sys.argv[1:])
@@ -1,115 +1,336 @@
-import numpy as np
-import os
-from scipy.stats import chi2
-from collections import Counter
-from tabulate import tabulate
-
-def generate_random_numbers(quantity, min_val=0.0, max_val=1.0, precision=5, filename="pokerrandom.txt"):
-    numbers = np.round(np.random.uniform(min_val, max_val, quantity), precision)
-
-    try:
-        with open(filename, 'w') as file:
-            for num in numbers:
-                file.write(f"{num:.{precision}f}\n")
-
-        # Display numbers in rows of 10
-        print("\nGenerated Random Numbers:")
-        for i in range(0, len(numbers), 10):
-            print(" | ".join(map(str, numbers[i:i+10])))
-
-        print(f"\nAll numbers are saved in '{filename}'.")
-
-    except IOError:
-        print(f"Error: Unable to write to file '{filename}'.")
-
-    return numbers
-
-def load_random_numbers(filename):
-    numbers = []
-    if not os.path.exists(filename):
-        print(f"Error: File '{filename}' not found.")
-        return numbers
-
-    with open(filename, 'r') as file:
-        numbers = [float(line.strip()) for line in file if line.strip().replace('.', '', 1).isdigit()]
-
-    return numbers
-
-def get_digit_pattern(number, precision):
-    digits = str(number).replace('.', '')[:precision]
-    return ''.join(sorted(digits))
-
-def poker_test(numbers, alpha, precision):
-    n = len(numbers)
-    digit_patterns = [get_digit_pattern(num, precision) for num in numbers]
-    counts = Counter(digit_patterns)
-
-    unique_patterns = len(counts)
-    expected = n / unique_patterns if unique_patterns else 1
-    chi_square_stat = sum((count - expected) ** 2 / expected for count in counts.values())
-
-    degrees_of_freedom = unique_patterns - 1
-    p_value = 1 - chi2.cdf(chi_square_stat, df=degrees_of_freedom)
-
-    return ("Accepted" if p_value > alpha else "Rejected"), chi_square_stat, p_value
-
-def get_user_input():
-    while True:
-        try:
-            quantity = int(input("Enter the number of random numbers to generate: "))
-            if quantity > 0:
-                break
-            print("Quantity must be a positive integer.")
-        except ValueError:
-            print("Invalid input. Please enter an integer.")
-
-    while True:
-        try:
-            min_val = float(input("Enter the minimum value [0.0]: ") or 0.0)
-            max_val = float(input("Enter the maximum value [1.0]: ") or 1.0)
-            if min_val < max_val:
-                break
-            print("Minimum value must be less than maximum value.")
-        except ValueError:
-            print("Invalid input. Please enter a float.")
-
-    while True:
-        try:
-            precision = int(input("Enter decimal precision [5]: ") or 5)
-            if 1 <= precision <= 10:
-                break
-            print("Precision must be between 1 and 10.")
-        except ValueError:
-            print("Invalid input. Please enter an integer.")
-
-    while True:
-        try:
-            alpha = float(input("Enter the significance level (alpha): "))
-            if 0 < alpha < 1:
-                break
-            print("Alpha must be between 0 and 1.")
-        except ValueError:
-            print("Invalid input. Please enter a float.")
-
-    return quantity, min_val, max_val, precision, alpha
-
-if __name__ == "__main__":
-    quantity, min_val, max_val, precision, alpha = get_user_input()
-
-    generate_random_numbers(quantity, min_val, max_val, precision, "pokerrandom.txt")
-
-    numbers = load_random_numbers("pokerrandom.txt")
-
-    result, chi_square_stat, p_value = poker_test(numbers, alpha, precision)
-
-    print("\nPoker Test Results:")
-    table = [
-        ["Parameter", "Value"],
-        ["Chi-square Statistic", chi_square_stat],
-        ["P-value", p_value],
-        ["Result", result]
-    ]
-    print(tabulate(table, headers="firstrow", tablefmt="grid"))
-
-    if p_value == 0:
-        print("P-value is 0.0, suggesting non-randomness. Increase precision for meaningful results.")
+import numpy as np
+import os
+import sys
+import math
+import functools
+from tabulate import tabulate
+from itertools import islice
+from contextlib import nullcontext
+from chi_ks import second_level_test
+from instrument import stage
+from pvalues import chi2_sf, chi2_sf_array
+from samplestore import SampleWriter, is_sample_file, iter_samples
+from stream import DEFAULT_CHUNK_SIZE, generate_chunks, iter_chunks, print_rows
+
+def generate_random_numbers(quantity, min_val=0.0, max_val=1.0, precision=5, filename="pokerrandom.bin", seed=None, chunk_size=DEFAULT_CHUNK_SIZE, text_filename=None, echo=True, generator="pcg64"):
+    """Generates random numbers chunk by chunk and saves them to a binary sample file.
+
+    If text_filename is given the numbers are also exported there, one per line.
+    With echo=False nothing is printed. `generator` names the prng backend.
+    """
+    count = 0
+    try:
+        with SampleWriter(filename, generator=generator, seed=seed, precision=precision) as writer, \
+                (open(text_filename, 'w') if text_filename else nullcontext()) as text_file:
+            if echo:
+                print("\nGenerated Random Numbers:")
+            for chunk in generate_chunks(quantity, min_val, max_val, precision, seed, chunk_size, generator=generator):
+                writer.write(chunk)
+                if text_file:
+                    with stage("write", len(chunk), file=text_file):
+                        np.savetxt(text_file, chunk, fmt=f"%.{precision}f")
+                if echo:
+                    print_rows(chunk)
+                count += len(chunk)
+
+        if echo:
+            print(f"\nAll numbers are saved in '{filename}'.")
+
+    except IOError:
+        print(f"Error: Unable to write to file '{filename}'.")
+
+    return count
+
+def load_random_numbers(filename, quantity=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    if not os.path.exists(filename):
+        print(f"Error: File '{filename}' not found.")
+        return
+
+    if is_sample_file(filename):
+        yield from iter_samples(filename, quantity, chunk_size)
+        return
+
+    remaining = quantity
+    with open(filename, 'r') as file:
+        while remaining is None or remaining > 0:
+            lines = list(islice(file, chunk_size if remaining is None else min(chunk_size, remaining)))
+            if not lines:
+                break
+            chunk = [float(line.strip()) for line in lines if line.strip().replace('.', '', 1).isdigit()]
+            if remaining is not None:
+                remaining -= len(chunk)
+            yield np.array(chunk)
+
+MIN_HAND_SIZE = 3
+MAX_HAND_SIZE = 10
+
+# Names of the classic hands, keyed by the digit counts larger than one
+HAND_NAMES = {
+    (): "All different",
+    (2,): "One pair",
+    (2, 2): "Two pairs",
+    (3,): "Three of a kind",
+    (3, 2): "Full house",
+    (4,): "Four of a kind",
+    (5,): "Five of a kind",
+}
+
+# A hand is identified by sum(11 ** (count - 1)) over the digits it contains.
+# At most ten digits share any count, so the key is unique for each hand type.
+# Entries past MAX_HAND_SIZE pad the table to the 16 values of a 4-bit count.
+PATTERN_WEIGHTS = np.array([0] + [11 ** (count - 1) for count in range(1, MAX_HAND_SIZE + 1)] + [0] * 5, dtype=np.int64)
+
+# Digit counts are packed four bits per digit into a uint64
+DIGIT_BITS = np.array([1 << (4 * digit) for digit in range(10)], dtype=np.uint64)
+
+def _pack_digit_counts(values, num_digits):
+    packed = np.zeros(len(values), dtype=np.uint64)
+    for _ in range(num_digits):
+        values, digits = np.divmod(values, 10)
+        packed += DIGIT_BITS[digits]
+    return packed
+
+# Packed digit counts of every 5-digit block, and the key contribution of
+# every 16-bit group of four packed counts
+BLOCK_DIGITS = 5
+BLOCK_COUNTS = _pack_digit_counts(np.arange(10 ** BLOCK_DIGITS), BLOCK_DIGITS)
+_groups = np.arange(1 << 16)
+GROUP_KEYS = sum(PATTERN_WEIGHTS[(_groups >> shift) & 15] for shift in (0, 4, 8, 12))
+
+# Hand sizes small enough to classify through a table of every possible hand
+LOOKUP_DIGITS = 6
+
+def _partitions(total, largest):
+    if total == 0:
+        yield ()
+        return
+    for part in range(min(total, largest), 0, -1):
+        for rest in _partitions(total - part, part):
+            yield (part,) + rest
+
+def hand_categories(hand_size):
+    """Returns (names, keys, probabilities) of every hand type for hand_size digits.
+
+    The probability of a hand with digit counts c1, ..., cr (r distinct digits)
+    is 10!/(10 - r)! / prod(m!) * hand_size!/prod(ci!) / 10**hand_size, where m
+    counts how many digits share each count. Keys are returned sorted.
+    """
+    categories = []
+    for counts in _partitions(hand_size, hand_size):
+        if len(counts) > 10:
+            continue
+        arrangements = math.perm(10, len(counts))
+        for count in set(counts):
+            arrangements //= math.factorial(counts.count(count))
+        orderings = math.factorial(hand_size)
+        for count in counts:
+            orderings //= math.factorial(count)
+        probability = arrangements * orderings / 10 ** hand_size
+        key = int(sum(PATTERN_WEIGHTS[count] for count in counts))
+        repeats = tuple(count for count in counts if count > 1)
+        name = HAND_NAMES.get(repeats, "-".join(map(str, counts)))
+        categories.append((key, name, probability))
+    categories.sort()
+    keys, names, probabilities = zip(*categories)
+    return list(names), np.array(keys, dtype=np.int64), np.array(probabilities)
+
+def scale_hands(numbers, hand_size):
+    """Returns the first hand_size decimals of every number as an integer."""
+    return (np.rint(np.asarray(numbers, dtype=float) * 10 ** hand_size) % 10 ** hand_size).astype(np.int64)
+
+def hand_keys(hands, hand_size):
+    """Returns the hand-type key of every integer hand of hand_size digits."""
+    packed = np.zeros(len(hands), dtype=np.uint64)
+    blocks = 0
+    for _ in range(0, hand_size, BLOCK_DIGITS):
+        hands, block = np.divmod(hands, 10 ** BLOCK_DIGITS)
+        packed += BLOCK_COUNTS[block]
+        blocks += 1
+    # The last block was counted with leading zeros it does not have
+    packed -= np.uint64(blocks * BLOCK_DIGITS - hand_size)
+    groups = packed.view(np.uint16).reshape(-1, 4)
+    return GROUP_KEYS[groups].sum(axis=1)
+
+@functools.lru_cache(maxsize=None)
+def _hand_lookup(hand_size):
+    keys = hand_categories(hand_size)[1]
+    return np.searchsorted(keys, hand_keys(np.arange(10 ** hand_size), hand_size)).astype(np.int8)
+
+def classify_hands(numbers, hand_size, keys=None):
+    """Returns the index into hand_categories(hand_size) of every number's hand."""
+    hands = scale_hands(numbers, hand_size)
+    if hand_size <= LOOKUP_DIGITS:
+        return _hand_lookup(hand_size)[hands]
+    if keys is None:
+        keys = hand_categories(hand_size)[1]
+    return np.searchsorted(keys, hand_keys(hands, hand_size))
+
+def merge_small_classes(observed, expected, minimum=5):
+    """Lumps the least likely classes together until every class expects at least `minimum`.
+
+    `observed` may also be 2-D with one row per class, e.g. one column per block.
+    """
+    order = np.argsort(expected)
+    observed, expected = observed[order], expected[order]
+    merged_observed, merged_expected = [], []
+    pending_observed = pending_expected = 0
+    for o, e in zip(observed, expected):
+        pending_observed += o
+        pending_expected += e
+        if pending_expected >= minimum:
+            merged_observed.append(pending_observed)
+            merged_expected.append(pending_expected)
+            pending_observed = pending_expected = 0
+    if pending_expected and merged_expected:
+        merged_observed[-1] += pending_observed
+        merged_expected[-1] += pending_expected
+    return np.array(merged_observed, dtype=float), np.array(merged_expected)
+
+class PokerAccumulator:
+    """Counts poker hands chunk by chunk for the poker test."""
+
+    def __init__(self, precision):
+        self.precision = precision
+        self.n = 0
+        self.valid = MIN_HAND_SIZE <= precision <= MAX_HAND_SIZE
+        if self.valid:
+            self.names, self.keys, self.probabilities = hand_categories(precision)
+            self.counts = np.zeros(len(self.keys), dtype=np.int64)
+
+    def update(self, chunk):
+        if self.valid and len(chunk):
+            hands = classify_hands(chunk, self.precision, self.keys)
+            self.counts += np.bincount(hands, minlength=len(self.keys))
+        self.n += len(chunk)
+
+    def merge(self, other):
+        """Adds the hand counts of an accumulator fed with another part of the stream."""
+        if self.valid:
+            self.counts += other.counts
+        self.n += other.n
+
+    def table(self):
+        """Returns rows of (hand, observed, expected) for the values seen so far; none for an invalid hand size."""
+        if not self.valid:
+            return []
+        return [[name, int(count), self.n * probability]
+                for name, count, probability in zip(self.names, self.counts, self.probabilities)]
+
+    def result(self, alpha):
+        """Returns (result, chi_square_stat, p_value) for the values seen so far."""
+        if not self.valid:
+            return "Invalid hand size", 0, 0
+
+        observed, expected = merge_small_classes(self.counts, self.n * self.probabilities)
+        if len(observed) < 2:
+            return "Not enough data", 0, 1
+
+        chi_square_stat = np.sum((observed - expected) ** 2 / expected)
+        degrees_of_freedom = len(observed) - 1
+        p_value = chi2_sf(chi_square_stat, degrees_of_freedom)
+
+        return ("Accepted" if p_value > alpha else "Rejected"), chi_square_stat, p_value
+
+def poker_block_p_values(blocks, precision):
+    """Returns the poker test p-value of every row of a 2-D array of blocks.
+
+    All hands are classified in one call and counted with one np.bincount by
+    offsetting the category of row r by r * categories. Every block has the
+    same expected counts, so the small classes are merged for all blocks at once.
+    """
+    if not MIN_HAND_SIZE <= precision <= MAX_HAND_SIZE:
+        raise ValueError(f"hand size must be between {MIN_HAND_SIZE} and {MAX_HAND_SIZE}")
+    rows, size = blocks.shape
+    _, keys, probabilities = hand_categories(precision)
+    hands = classify_hands(blocks.ravel(), precision, keys).astype(np.int64)
+    hands += np.repeat(np.arange(rows) * len(keys), size)
+    counts = np.bincount(hands, minlength=rows * len(keys)).reshape(rows, len(keys))
+    observed, expected = merge_small_classes(counts.T, size * probabilities)
+    if len(observed) < 2:
+        raise ValueError("blocks are too short for the poker test")
+    statistics = ((observed - expected[:, None]) ** 2 / expected[:, None]).sum(axis=0)
+    return chi2_sf_array(statistics, len(observed) - 1)
+
+def poker_test(numbers, alpha, precision, block_size=None):
+    """Performs the poker test on a list/array or a stream of chunks.
+
+    With block_size the test runs on every block of that many numbers instead
+    and the result is chi_ks.second_level_test()'s.
+    """
+    if block_size:
+        return second_level_test(numbers, block_size, lambda blocks: poker_block_p_values(blocks, precision), alpha)
+    accumulator = PokerAccumulator(precision)
+    for chunk in iter_chunks(numbers):
+        accumulator.update(chunk)
+    return accumulator.result(alpha)
+
+def get_user_input():
+    while True:
+        try:
+            quantity = int(input("Enter the number of random numbers to generate: "))
+            if quantity > 0:
+                break
+            print("Quantity must be a positive integer.")
+        except ValueError:
+            print("Invalid input. Please enter an integer.")
+
+    while True:
+        try:
+            min_val = float(input("Enter the minimum value [0.0]: ") or 0.0)
+            max_val = float(input("Enter the maximum value [1.0]: ") or 1.0)
+            if min_val < max_val:
+                break
+            print("Minimum value must be less than maximum value.")
+        except ValueError:
+            print("Invalid input. Please enter a float.")
+
+    while True:
+        try:
+            precision = int(input("Enter decimal precision [5]: ") or 5)
+            if MIN_HAND_SIZE <= precision <= MAX_HAND_SIZE:
+                break
+            print(f"Precision must be between {MIN_HAND_SIZE} and {MAX_HAND_SIZE}.")
+        except ValueError:
+            print("Invalid input. Please enter an integer.")
+
+    while True:
+        try:
+            alpha = float(input("Enter the significance level (alpha): "))
+            if 0 < alpha < 1:
+                break
+            print("Alpha must be between 0 and 1.")
+        except ValueError:
+            print("Invalid input. Please enter a float.")
+
+    return quantity, min_val, max_val, precision, alpha
+
+def interactive_main():
+    """Prompts for the parameters, then generates, reloads and tests the numbers."""
+    quantity, min_val, max_val, precision, alpha = get_user_input()
+
+    generate_random_numbers(quantity, min_val, max_val, precision, "pokerrandom.bin")
+
+    accumulator = PokerAccumulator(precision)
+    for chunk in load_random_numbers("pokerrandom.bin"):
+        accumulator.update(chunk)
+
+    result, chi_square_stat, p_value = accumulator.result(alpha)
+
+    print("\nHands:")
+    print(tabulate(accumulator.table(), headers=["Hand", "Observed", "Expected"], tablefmt="grid"))
+
+    print("\nPoker Test Results:")
+    table = [
+        ["Parameter", "Value"],
+        ["Chi-square Statistic", chi_square_stat],
+        ["P-value", p_value],
+        ["Result", result]
+    ]
+    print(tabulate(table, headers="firstrow", tablefmt="grid"))
+
+    if p_value == 0:
+        print("P-value is 0.0, suggesting non-randomness. Increase precision for meaningful results.")
+
+if __name__ == "__main__":
+    from cli import main
+    main(["poker"] + sys.argv[1:])
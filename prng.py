@@ -0,0 +1,297 @@
+import numpy as np
+
+# Numbers produced per vectorized step of the congruential generators
+BLOCK_SIZE = 1 << 14
+
+GENERATORS = {}
+
+def register(name):
+    """Class decorator that adds a generator backend to the registry under name."""
+    def decorator(cls):
+        cls.name = name
+        GENERATORS[name] = cls
+        return cls
+    return decorator
+
+def available_generators():
+    """Returns the names of the registered generators."""
+    return sorted(GENERATORS)
+
+def create_generator(name="pcg64", seed=None):
+    """Returns a new generator of the registered backend `name` seeded with seed."""
+    try:
+        return GENERATORS[name](seed)
+    except KeyError:
+        raise ValueError(f"Unknown generator '{name}', choose from {', '.join(available_generators())}") from None
+
+def _entropy_seed(seed):
+    """Returns seed as an int, drawing one from the OS when seed is None."""
+    return int(np.random.SeedSequence().entropy) if seed is None else int(seed)
+
+class Generator:
+    """Base class of the generator backends.
+
+    A backend produces uniform doubles in [0, 1) with random(size). advance(n)
+    skips the next n numbers and substream(i) returns a new generator for the
+    i-th of a set of non-overlapping streams of the same seed, so that workers
+    can draw disjoint, reproducible streams in parallel.
+    """
+
+    name = None
+
+    def random(self, size):
+        raise NotImplementedError
+
+    def advance(self, steps):
+        raise NotImplementedError
+
+    def substream(self, index):
+        raise NotImplementedError
+
+    def uniform(self, low=0.0, high=1.0, size=None):
+        return low + (high - low) * self.random(size)
+
+def _affine_tables(multiplier, increment, modulus, size):
+    """Returns (A, C) with x_{n+j} = A[j-1] * x_n + C[j-1] mod modulus, j = 1..size."""
+    multipliers, increments = [], []
+    a, c = 1, 0
+    for _ in range(size):
+        a, c = a * multiplier % modulus, (c * multiplier + increment) % modulus
+        multipliers.append(a)
+        increments.append(c)
+    return np.array(multipliers, dtype=np.uint64), np.array(increments, dtype=np.uint64)
+
+def _affine_power(multiplier, increment, modulus, steps):
+    """Returns (A, C) of the affine map x -> multiplier * x + increment applied steps times."""
+    a, c = 1, 0
+    while steps:
+        if steps & 1:
+            a, c = a * multiplier % modulus, (c * multiplier + increment) % modulus
+        multiplier, increment = multiplier * multiplier % modulus, (increment * multiplier + increment) % modulus
+        steps >>= 1
+    return a, c
+
+@register("lcg")
+class LCG(Generator):
+    """Linear congruential generator x = a * x + c mod 2**64 (Knuth's MMIX constants).
+
+    The top 53 bits of each state give the double. Blocks of BLOCK_SIZE states
+    are computed at once from a table of the affine map's powers, with uint64
+    arithmetic doing the reduction mod 2**64. The period 2**64 gives 2**16
+    non-overlapping substreams of 2**48 numbers.
+    """
+
+    MULTIPLIER = 6364136223846793005
+    INCREMENT = 1442695040888963407
+    MODULUS = 1 << 64
+    STREAM_SPACING = 1 << 48
+    SUBSTREAMS = 1 << 16
+    _tables = None
+
+    def __init__(self, seed=None):
+        self.seed = _entropy_seed(seed)
+        self.state = self.seed % self.MODULUS
+        if LCG._tables is None:
+            LCG._tables = _affine_tables(self.MULTIPLIER, self.INCREMENT, self.MODULUS, BLOCK_SIZE)
+
+    def _block(self, size):
+        multipliers, increments = self._tables
+        states = multipliers[:size] * np.uint64(self.state) + increments[:size]
+        self.state = int(states[-1])
+        return states
+
+    def random(self, size=None):
+        out = np.empty(1 if size is None else size)
+        for start in range(0, len(out), BLOCK_SIZE):
+            states = self._block(min(BLOCK_SIZE, len(out) - start))
+            out[start:start + len(states)] = (states >> np.uint64(11)) * (1.0 / (1 << 53))
+        return out[0] if size is None else out
+
+    def advance(self, steps):
+        a, c = _affine_power(self.MULTIPLIER, self.INCREMENT, self.MODULUS, steps)
+        self.state = (a * self.state + c) % self.MODULUS
+        return self
+
+    def substream(self, index):
+        if not 0 <= index < self.SUBSTREAMS:
+            raise ValueError(f"{self.name} has substreams 0..{self.SUBSTREAMS - 1} only, not {index}")
+        stream = type(self)(self.seed)
+        return stream.advance(index * self.STREAM_SPACING)
+
+@register("minstd")
+class MINSTD(Generator):
+    """Multiplicative congruential generator x = 48271 * x mod (2**31 - 1) (Park-Miller).
+
+    Blocks are computed as a**j * x mod m; both factors are below 2**31, so the
+    products fit in uint64. The period is only 2**31 - 2, which the substreams
+    split into 1024 pieces of about 2.1 million numbers: substream() only
+    takes indices 0..1023, since higher ones would wrap around the period and
+    overlap the others.
+    """
+
+    MULTIPLIER = 48271
+    MODULUS = (1 << 31) - 1
+    SUBSTREAMS = 1024
+    STREAM_SPACING = (MODULUS - 1) // SUBSTREAMS
+    _table = None
+
+    def __init__(self, seed=None):
+        self.seed = _entropy_seed(seed)
+        # The state must lie in 1..m-1
+        self.state = self.seed % (self.MODULUS - 1) + 1
+        if MINSTD._table is None:
+            MINSTD._table = _affine_tables(self.MULTIPLIER, 0, self.MODULUS, BLOCK_SIZE)[0]
+
+    def random(self, size=None):
+        out = np.empty(1 if size is None else size)
+        for start in range(0, len(out), BLOCK_SIZE):
+            states = self._table[:min(BLOCK_SIZE, len(out) - start)] * np.uint64(self.state) % np.uint64(self.MODULUS)
+            self.state = int(states[-1])
+            out[start:start + len(states)] = states / self.MODULUS
+        return out[0] if size is None else out
+
+    def advance(self, steps):
+        self.state = pow(self.MULTIPLIER, steps, self.MODULUS) * self.state % self.MODULUS
+        return self
+
+    def substream(self, index):
+        if not 0 <= index < self.SUBSTREAMS:
+            raise ValueError(f"{self.name} has substreams 0..{self.SUBSTREAMS - 1} only, not {index}")
+        stream = type(self)(self.seed)
+        return stream.advance(index * self.STREAM_SPACING)
+
+def _matrix_multiply(a, b, modulus):
+    return [[sum(a[i][k] * b[k][j] for k in range(3)) % modulus for j in range(3)] for i in range(3)]
+
+def _matrix_power(matrix, steps, modulus):
+    result = [[int(i == j) for j in range(3)] for i in range(3)]
+    while steps:
+        if steps & 1:
+            result = _matrix_multiply(result, matrix, modulus)
+        matrix = _matrix_multiply(matrix, matrix, modulus)
+        steps >>= 1
+    return result
+
+def _mulmod(a_high, a_low, x, modulus):
+    """Returns a * x mod modulus for a = a_high * 2**16 + a_low, a and x below 2**32, in uint64."""
+    return ((a_high * x % modulus) * np.uint64(1 << 16) + a_low * x) % modulus
+
+@register("mrg32k3a")
+class MRG32k3a(Generator):
+    """L'Ecuyer's combined multiple recursive generator MRG32k3a.
+
+    Each component is an order-3 recursion x_n = A x_{n-1} mod m on the state
+    vector (x_{n-2}, x_{n-1}, x_n). Blocks use the last rows of A**1..A**BLOCK_SIZE;
+    the coefficients are split into 16-bit halves so every product fits in
+    uint64. Substreams are the standard streams, 2**127 steps apart.
+    """
+
+    M1 = 4294967087
+    M2 = 4294944443
+    A1 = [[0, 1, 0], [0, 0, 1], [M1 - 810728, 1403580, 0]]
+    A2 = [[0, 1, 0], [0, 0, 1], [M2 - 1370589, 0, 527612]]
+    STREAM_SPACING = 1 << 127
+    _tables = None
+
+    def __init__(self, seed=None):
+        self.seed = _entropy_seed(seed)
+        words = np.random.SeedSequence(self.seed).generate_state(6, np.uint32).tolist()
+        self.state1 = [word % self.M1 for word in words[:3]]
+        self.state2 = [word % self.M2 for word in words[3:]]
+        # Neither component may start from the all-zero state
+        if not any(self.state1):
+            self.state1[0] = 1
+        if not any(self.state2):
+            self.state2[0] = 1
+        if MRG32k3a._tables is None:
+            MRG32k3a._tables = (self._row_table(self.A1, self.M1), self._row_table(self.A2, self.M2))
+
+    @staticmethod
+    def _row_table(matrix, modulus):
+        # The last row of A**(j+1) is the last row of A**j times A
+        rows = [matrix[2]]
+        for _ in range(BLOCK_SIZE - 1):
+            row = rows[-1]
+            rows.append([sum(row[k] * matrix[k][j] for k in range(3)) % modulus for j in range(3)])
+        rows = np.array(rows, dtype=np.uint64)
+        return rows >> np.uint64(16), rows & np.uint64(0xFFFF)
+
+    @staticmethod
+    def _component(table, state, modulus, size):
+        high, low = table[0][:size], table[1][:size]
+        modulus = np.uint64(modulus)
+        values = np.zeros(size, dtype=np.uint64)
+        for k in range(3):
+            values += _mulmod(high[:, k], low[:, k], np.uint64(state[k]), modulus)
+        return values % modulus
+
+    def random(self, size=None):
+        out = np.empty(1 if size is None else size)
+        for start in range(0, len(out), BLOCK_SIZE):
+            count = min(BLOCK_SIZE, len(out) - start)
+            x1 = self._component(self._tables[0], self.state1, self.M1, count)
+            x2 = self._component(self._tables[1], self.state2, self.M2, count)
+            self.state1 = (self.state1 + x1[-3:].tolist())[-3:]
+            self.state2 = (self.state2 + x2[-3:].tolist())[-3:]
+            z = x1.astype(np.int64) - x2.astype(np.int64)
+            z[z <= 0] += self.M1
+            out[start:start + count] = z / (self.M1 + 1)
+        return out[0] if size is None else out
+
+    def advance(self, steps):
+        for name, matrix, modulus in (("state1", self.A1, self.M1), ("state2", self.A2, self.M2)):
+            power = _matrix_power(matrix, steps, modulus)
+            state = getattr(self, name)
+            setattr(self, name, [sum(power[i][k] * state[k] for k in range(3)) % modulus for i in range(3)])
+        return self
+
+    def substream(self, index):
+        stream = type(self)(self.seed)
+        return stream.advance(index * self.STREAM_SPACING)
+
+class _NumPyGenerator(Generator):
+    """Backend that wraps a NumPy bit generator in a numpy.random.Generator."""
+
+    bit_generator = None
+
+    def __init__(self, seed=None, bit_generator=None):
+        self.seed = _entropy_seed(seed)
+        self._bits = bit_generator if bit_generator is not None else self.bit_generator(self.seed)
+        self._rng = np.random.Generator(self._bits)
+
+    def random(self, size=None):
+        return self._rng.random(size)
+
+    def uniform(self, low=0.0, high=1.0, size=None):
+        return self._rng.uniform(low, high, size)
+
+    def substream(self, index):
+        return type(self)(self.seed, self.bit_generator(self.seed).jumped(index))
+
+@register("pcg64")
+class PCG64(_NumPyGenerator):
+    """NumPy's PCG64, the default. Each double consumes one 64-bit output, so advance is exact."""
+
+    bit_generator = np.random.PCG64
+
+    def advance(self, steps):
+        self._bits.advance(steps)
+        return self
+
+@register("mt19937")
+class MT19937(_NumPyGenerator):
+    """NumPy's Mersenne Twister. Substreams jump 2**128 steps apart.
+
+    The Mersenne Twister has no cheap arbitrary jump, so advance draws and
+    discards the raw outputs (two 32-bit words per double) in blocks.
+    """
+
+    bit_generator = np.random.MT19937
+
+    def advance(self, steps):
+        remaining = 2 * steps
+        while remaining > 0:
+            size = min(remaining, 1 << 22)
+            self._bits.random_raw(size)
+            remaining -= size
+        return self
@@ -0,0 +1,319 @@
+import math
+
+# Stop the incomplete gamma series and continued fraction at this relative size
+EPSILON = 1e-15
+TINY = 1e-300
+# Far more terms than any finite argument needs; reaching it means the expansion diverged
+MAX_ITERATIONS = 100000
+# Largest matrix the exact Kolmogorov distribution may use; above it the Pelz-Good expansion is accurate
+MAX_KOLMOGOROV_MATRIX = 160
+
+def _gamma_series(a, x):
+    """P(a, x) by its power series, for x < a + 1."""
+    term = total = 1.0 / a
+    denominator = a
+    while abs(term) > abs(total) * EPSILON:
+        denominator += 1
+        if denominator - a > MAX_ITERATIONS:
+            raise RuntimeError(f"incomplete gamma series did not converge for a={a}, x={x}")
+        term *= x / denominator
+        total += term
+    return total * math.exp(-x + a * math.log(x) - math.lgamma(a))
+
+def _gamma_fraction(a, x):
+    """Q(a, x) by its continued fraction (modified Lentz), for x >= a + 1."""
+    b = x + 1.0 - a
+    c = 1.0 / TINY
+    d = 1.0 / b
+    h = d
+    for i in range(1, MAX_ITERATIONS + 1):
+        an = -i * (i - a)
+        b += 2.0
+        d = an * d + b
+        d = TINY if abs(d) < TINY else d
+        c = b + an / c
+        c = TINY if abs(c) < TINY else c
+        d = 1.0 / d
+        delta = d * c
+        h *= delta
+        if abs(delta - 1.0) < EPSILON:
+            break
+    else:
+        raise RuntimeError(f"incomplete gamma continued fraction did not converge for a={a}, x={x}")
+    return h * math.exp(-x + a * math.log(x) - math.lgamma(a))
+
+def gamma_p(a, x):
+    """Regularized lower incomplete gamma function P(a, x); nan for a nan x."""
+    if math.isnan(x):
+        return math.nan
+    if x <= 0:
+        return 0.0
+    if math.isinf(x):
+        return 1.0
+    if x < a + 1:
+        return _gamma_series(a, x)
+    return 1.0 - _gamma_fraction(a, x)
+
+def gamma_q(a, x):
+    """Regularized upper incomplete gamma function Q(a, x) = 1 - P(a, x), accurate in the far tail."""
+    if math.isnan(x):
+        return math.nan
+    if x <= 0:
+        return 1.0
+    if math.isinf(x):
+        return 0.0
+    if x < a + 1:
+        return 1.0 - _gamma_series(a, x)
+    return _gamma_fraction(a, x)
+
+def chi2_sf(x, df):
+    """P(X > x) for a chi-square variable with df degrees of freedom."""
+    return gamma_q(df / 2, float(x) / 2)
+
+def gamma_q_array(a, x):
+    """gamma_q at one a for every value of the array x, all values evaluated together with NumPy.
+
+    Both expansions run until every value has converged; the terms of values
+    that converged earlier only keep shrinking. nan stays nan and inf gives 0.
+    """
+    import numpy as np
+    x = np.asarray(x, dtype=float)
+    q = np.ones(x.shape)
+    q[np.isnan(x)] = np.nan
+    q[x == np.inf] = 0.0
+    series = (x > 0) & (x < a + 1)
+    fraction = (x >= a + 1) & (x < np.inf)
+    if series.any():
+        v = x[series]
+        term = np.full(v.shape, 1.0 / a)
+        total = term.copy()
+        denominator = a
+        while np.any(np.abs(term) > np.abs(total) * EPSILON):
+            denominator += 1
+            if denominator - a > MAX_ITERATIONS:
+                raise RuntimeError(f"incomplete gamma series did not converge for a={a}")
+            term *= v / denominator
+            total += term
+        q[series] = 1.0 - total * np.exp(-v + a * np.log(v) - math.lgamma(a))
+    if fraction.any():
+        v = x[fraction]
+        b = v + 1.0 - a
+        c = np.full(v.shape, 1.0 / TINY)
+        d = 1.0 / b
+        h = d.copy()
+        for i in range(1, MAX_ITERATIONS + 1):
+            an = -i * (i - a)
+            b += 2.0
+            d = an * d + b
+            d[np.abs(d) < TINY] = TINY
+            c = b + an / c
+            c[np.abs(c) < TINY] = TINY
+            d = 1.0 / d
+            delta = d * c
+            h *= delta
+            if np.all(np.abs(delta - 1.0) < EPSILON):
+                break
+        else:
+            raise RuntimeError(f"incomplete gamma continued fraction did not converge for a={a}")
+        q[fraction] = h * np.exp(-v + a * np.log(v) - math.lgamma(a))
+    return q
+
+def chi2_sf_array(x, df):
+    """chi2_sf for every value of the array x, e.g. the statistics of many blocks."""
+    import numpy as np
+    return gamma_q_array(df / 2, np.asarray(x, dtype=float) / 2)
+
+def chi2_isf(p, df):
+    """The x with chi2_sf(x, df) = p, found by bisection."""
+    low, high = 0.0, max(1.0, 2.0 * df)
+    while chi2_sf(high, df) > p:
+        low, high = high, 2 * high
+    for _ in range(200):
+        middle = (low + high) / 2
+        if chi2_sf(middle, df) > p:
+            low = middle
+        else:
+            high = middle
+        if high - low <= 1e-14 * high:
+            break
+    return (low + high) / 2
+
+def poisson_pmf(k, mean):
+    return math.exp(k * math.log(mean) - mean - math.lgamma(k + 1)) if k >= 0 else 0.0
+
+def poisson_sf(k, mean):
+    """P(X > k) for a Poisson variable."""
+    return gamma_p(k + 1, mean) if k >= 0 else 1.0
+
+def normal_sf(z):
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+# Coefficients of Acklam's rational approximation to the normal quantile
+_A = (-3.969683028665376e+01, 2.209460984245205e+02, -2.759285104469687e+02,
+      1.383577518672690e+02, -3.066479806614716e+01, 2.506628277459239e+00)
+_B = (-5.447609879822406e+01, 1.615858368580409e+02, -1.556989798598866e+02,
+      6.680131188771972e+01, -1.328068155288572e+01)
+_C = (-7.784894002430293e-03, -3.223964580411365e-01, -2.400758277161838e+00,
+      -2.549732539343734e+00, 4.374664141464968e+00, 2.938163982698783e+00)
+_D = (7.784695709041462e-03, 3.224671290700398e-01, 2.445134137142996e+00, 3.754408661907416e+00)
+
+def normal_isf(p):
+    """The z with P(Z > z) = p for a standard normal Z.
+
+    Acklam's approximation (relative error about 1e-9) followed by one step
+    of Halley's method on math.erfc, which brings it to full precision.
+    """
+    if not 0 < p < 1:
+        raise ValueError("p must be between 0 and 1")
+    q = min(p, 1 - p)
+    if q < 0.02425:
+        t = math.sqrt(-2 * math.log(q))
+        z = -(((((_C[0] * t + _C[1]) * t + _C[2]) * t + _C[3]) * t + _C[4]) * t + _C[5]) / \
+            ((((_D[0] * t + _D[1]) * t + _D[2]) * t + _D[3]) * t + 1)
+    else:
+        r = q - 0.5
+        s = r * r
+        z = -(((((_A[0] * s + _A[1]) * s + _A[2]) * s + _A[3]) * s + _A[4]) * s + _A[5]) * r / \
+            (((((_B[0] * s + _B[1]) * s + _B[2]) * s + _B[3]) * s + _B[4]) * s + 1)
+    # z solves P(Z > z) = q; refine on the upper tail, where erfc keeps its precision
+    error = normal_sf(z) - q
+    u = -error * math.sqrt(2 * math.pi) * math.exp(z * z / 2)
+    z = z - u / (1 + z * u / 2)
+    return z if p <= 0.5 else -z
+
+def normal_ppf(p):
+    return -normal_isf(p)
+
+def kolmogorov_asymptotic_sf(x):
+    """P(K > x) for the limiting Kolmogorov distribution K = lim sqrt(n) * D_n."""
+    if x <= 0:
+        return 1.0
+    if x < 1.0:
+        # Jacobi's form converges fast for small x
+        w = math.sqrt(2 * math.pi) / x
+        terms = sum(math.exp(-(2 * j - 1) ** 2 * math.pi ** 2 / (8 * x * x)) for j in range(1, 8))
+        return 1.0 - w * terms
+    return 2 * sum((-1) ** (j - 1) * math.exp(-2 * j * j * x * x) for j in range(1, 101))
+
+def _kolmogorov_exact_cdf(d, n):
+    """P(D_n < d) by Marsaglia, Tsang and Wang's matrix method."""
+    import numpy as np
+    k = int(n * d) + 1
+    m = 2 * k - 1
+    h = k - n * d
+    i = np.arange(m)
+    power = i[:, None] - i[None, :] + 1
+    matrix = (power >= 0).astype(float)
+    matrix[:, 0] -= h ** (i + 1)
+    matrix[-1, :] -= h ** (m - i)
+    if 2 * h - 1 > 0:
+        matrix[-1, 0] += (2 * h - 1) ** m
+    factorials = np.array([math.factorial(j) if j > 0 else 1 for j in range(m + 1)], dtype=float)
+    matrix /= np.where(power > 0, factorials[np.clip(power, 0, m)], 1.0)
+
+    # Square and multiply, keeping the scale in a separate exponent
+    result, exponent = np.eye(m), 0.0
+    base, base_exponent = matrix, 0.0
+    steps = n
+    while steps:
+        if steps & 1:
+            result = result @ base
+            exponent += base_exponent
+            scale = np.abs(result).max()
+            if scale > 1e140:
+                result /= scale
+                exponent += math.log(scale)
+        steps >>= 1
+        if steps:
+            base = base @ base
+            base_exponent *= 2
+            scale = np.abs(base).max()
+            if scale > 1e140:
+                base /= scale
+                base_exponent += math.log(scale)
+    value = result[k - 1, k - 1]
+    if value <= 0:
+        return 0.0
+    return math.exp(math.log(value) + exponent + math.lgamma(n + 1) - n * math.log(n))
+
+def _pelz_good_cdf(d, n):
+    """P(D_n <= d) by the Pelz-Good expansion K0 + K1 / sqrt(n) + K2 / n + K3 / n**1.5 at z = sqrt(n) * d."""
+    z = math.sqrt(n) * d
+    z2, z4, z6 = z * z, z ** 4, z ** 6
+    pi2, pi4, pi6 = math.pi ** 2, math.pi ** 4, math.pi ** 6
+    q = math.exp(-pi2 / (8 * z2))
+    terms = [0.0, 0.0, 0.0, 0.0]
+    # Sums over odd m = 2k - 1 of c(m) * q ** (m * m), by Horner's scheme in q ** (8k)
+    top = int(math.ceil(16 * z / math.pi))
+    for k in range(top, 0, -1):
+        m2 = (2 * k - 1) ** 2
+        step = q ** (8 * k)
+        coefficients = (1.0,
+                        -z2 + pi2 * m2 / 4,
+                        6 * z6 + 2 * z4 + (2 * z4 - 5 * z2) * pi2 * m2 / 4 + pi4 * (1 - 2 * z2) * m2 * m2 / 16,
+                        -30 * z6 - 90 * z ** 8 + pi2 * (135 * z4 - 96 * z6) * m2 / 4
+                        + pi4 * (212 * z4 - 60 * z2) * m2 * m2 / 16 + pi6 * (5 - 30 * z2) * m2 ** 3 / 64)
+        terms = [term * step + coefficient for term, coefficient in zip(terms, coefficients)]
+    root2pi = math.sqrt(2 * math.pi)
+    terms = [term * q * root2pi / scale for term, scale in zip(terms, (z, 6 * z4, 72 * z ** 7, 6480 * z ** 10))]
+    # The remaining sums run over all integers k
+    q = math.exp(-pi2 / (2 * z2))
+    k2 = [k * k for k in range(1, top + 1)]
+    terms[2] -= pi2 * root2pi / (36 * z ** 3) * sum(kk * q ** kk for kk in k2)
+    terms[3] += pi2 * root2pi / (216 * z6) * sum((3 * z2 - pi2 * kk) * kk * q ** kk for kk in k2)
+    return sum(term / n ** (i / 2) for i, term in enumerate(terms))
+
+def kolmogorov_sf(d, n):
+    """P(D_n > d) for the two-sided one-sample Kolmogorov-Smirnov statistic of n numbers.
+
+    Exact (Marsaglia, Tsang and Wang) while the matrix stays small, which
+    covers small samples and the usual acceptance region. Otherwise the
+    Pelz-Good expansion, or the limiting distribution far in the tail where
+    p is below 1e-15.
+    """
+    d = float(d)
+    if math.isnan(d):
+        return math.nan
+    if d <= 0:
+        return 1.0
+    if d >= 1:
+        return 0.0
+    if n * d * d >= 18:
+        return kolmogorov_asymptotic_sf(math.sqrt(n) * d)
+    if 2 * (int(n * d) + 1) - 1 <= MAX_KOLMOGOROV_MATRIX:
+        return min(1.0, max(0.0, 1.0 - _kolmogorov_exact_cdf(d, n)))
+    return min(1.0, max(0.0, 1.0 - _pelz_good_cdf(d, n)))
+
+def compare_with_scipy():
+    """Returns rows of (function, largest absolute error, largest relative error) against SciPy."""
+    import numpy as np
+    from scipy import stats
+    rows = []
+
+    def record(name, ours, theirs):
+        ours, theirs = np.asarray(ours, dtype=float), np.asarray(theirs, dtype=float)
+        absolute = np.abs(ours - theirs)
+        relative = absolute / np.maximum(np.abs(theirs), 1e-300)
+        rows.append((name, float(absolute.max()), float(relative[np.abs(theirs) > 1e-300].max())))
+
+    points = [(x, df) for df in (1, 2, 3, 5, 9, 10, 30, 100, 511, 4095) for x in np.linspace(0.01, 3 * df + 50, 60)]
+    record("chi2_sf", [chi2_sf(x, df) for x, df in points], [stats.chi2.sf(x, df) for x, df in points])
+    statistics = np.linspace(0.0, 150.0, 301)
+    for df in (1, 4, 9, 99):
+        record(f"chi2_sf_array (df={df})", chi2_sf_array(statistics, df), stats.chi2.sf(statistics, df))
+    probabilities = [(p, df) for df in (1, 9, 63, 511) for p in (0.5, 0.1, 0.05, 0.01, 1e-4)]
+    record("chi2_isf", [chi2_isf(p, df) for p, df in probabilities], [stats.chi2.isf(p, df) for p, df in probabilities])
+    points = [(k, mean) for mean in (0.5, 2.0, 10.0) for k in range(0, 30)]
+    record("poisson_pmf", [poisson_pmf(k, m) for k, m in points], [stats.poisson.pmf(k, m) for k, m in points])
+    record("poisson_sf", [poisson_sf(k, m) for k, m in points], [stats.poisson.sf(k, m) for k, m in points])
+    alphas = np.concatenate((np.logspace(-12, -1, 40), np.linspace(0.1, 0.9, 40)))
+    record("normal_isf", [normal_isf(a / 2) for a in alphas], stats.norm.isf(alphas / 2))
+    # kstwo.sf itself takes seconds per call for millions of numbers, so stop at 10 ** 5
+    points = [(d, n) for n in (5, 10, 50, 100, 141, 1000, 10000, 10 ** 5) for d in np.linspace(0.2, 3.0, 40) / math.sqrt(n)
+              if d < 1]
+    record("kolmogorov_sf", [kolmogorov_sf(d, n) for d, n in points], [stats.kstwo.sf(d, n) for d, n in points])
+    return rows
+
+if __name__ == "__main__":
+    from tabulate import tabulate
+    print(tabulate(compare_with_scipy(), headers=["Function", "Max abs. error", "Max rel. error"], tablefmt="grid"))
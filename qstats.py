@@ -0,0 +1,148 @@
+import math
+
+class Welford:
+    """Streaming mean and variance (Welford's algorithm) that can merge with another accumulator."""
+
+    __slots__ = ("count", "mean", "_m2")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    def update(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+
+    def merge(self, other):
+        """Adds the observations of other (Chan et al.'s pairwise update)."""
+        if other.count == 0:
+            return
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / total
+        self._m2 += other._m2 + delta * delta * self.count * other.count / total
+        self.count = total
+
+    def variance(self):
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    def std(self):
+        return math.sqrt(self.variance())
+
+    def half_width(self, confidence=0.95):
+        """Half-width of the Student t confidence interval for the mean."""
+        if self.count < 2:
+            return math.inf
+        # SciPy is only needed here, once per report, so it is not loaded with the module
+        from scipy.stats import t as student_t
+        return student_t.ppf((1 + confidence) / 2, self.count - 1) * self.std() / math.sqrt(self.count)
+
+class TimeWeighted:
+    """Time-weighted contents, e.g. of a queue or storage, kept as a running area.
+
+    change(delta, now) integrates the contents up to now before changing
+    them, so nothing is stored per event. Reads take the current time:
+    area_until(now) is the integral of the contents since the start and
+    average_until(now) divides it by the observed time. close(now) folds
+    the time up to now into the totals; merge() then pools the area and
+    time of runs closed this way, e.g. independent replications.
+    """
+
+    __slots__ = ("contents", "max_contents", "entries", "_area", "_changed", "_start", "_elapsed")
+
+    def __init__(self, start=0.0):
+        self.contents = 0
+        self.max_contents = 0
+        self.entries = 0
+        self._area = 0.0
+        self._changed = start
+        self._start = start
+        # Observed time before _start: closed periods and merged runs
+        self._elapsed = 0.0
+
+    def change(self, delta, now):
+        self._area += self.contents * (now - self._changed)
+        self._changed = now
+        self.contents += delta
+        if self.contents > self.max_contents:
+            self.max_contents = self.contents
+
+    def area_until(self, now):
+        """Returns the integral of the contents over the observed time up to now."""
+        return self._area + self.contents * (now - self._changed)
+
+    def elapsed_until(self, now):
+        return self._elapsed + now - self._start
+
+    def average_until(self, now):
+        elapsed = self.elapsed_until(now)
+        return self.area_until(now) / elapsed if elapsed > 0 else 0.0
+
+    def time_per_entry_until(self, now):
+        """Average time per entry (area / entries, as GPSS reports it)."""
+        return self.area_until(now) / self.entries if self.entries else 0.0
+
+    def close(self, now):
+        """Adds the time up to now to the totals, so that the accumulator can be merged."""
+        self._area = self.area_until(now)
+        self._elapsed += now - self._start
+        self._changed = self._start = now
+
+    def merge(self, other):
+        """Pools the area, time, entries and maximum of another closed accumulator."""
+        self._area += other._area
+        self._elapsed += other._elapsed
+        self.entries += other.entries
+        self.max_contents = max(self.max_contents, other.max_contents)
+
+class Table(Welford):
+    """Frequency table (GPSS TABLE): first upper limit, class width and number of classes.
+
+    The first class holds values <= first, the last class everything above the
+    second-to-last limit. The class counts are a preallocated list (faster to
+    increment than an array.array) and a value is placed by one division, so
+    tabulate() costs the same whatever the number of classes. Mean and
+    standard deviation come from Welford.
+    """
+
+    __slots__ = ("name", "first", "width", "counts")
+
+    def __init__(self, name, first, width, classes):
+        super().__init__()
+        self.name = name
+        self.first = first
+        self.width = width
+        self.counts = [0] * classes
+
+    def tabulate(self, value):
+        counts = self.counts
+        if value <= self.first:
+            counts[0] += 1
+        else:
+            # ceil((value - first) / width), capped at the overflow class
+            index = -int((self.first - value) // self.width)
+            counts[index if index < len(counts) else -1] += 1
+        # Welford.update, inlined since this runs once per transaction
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+
+    def merge(self, other):
+        """Adds the entries of a table with the same classes, e.g. from another replication."""
+        if (other.first, other.width, len(other.counts)) != (self.first, self.width, len(self.counts)):
+            raise ValueError(f"Table {self.name}: cannot merge tables with different classes")
+        for index, frequency in enumerate(other.counts):
+            self.counts[index] += frequency
+        super().merge(other)
+
+    def limits(self):
+        """Returns the upper limit of every class; the last one is infinite."""
+        return [self.first + i * self.width for i in range(len(self.counts) - 1)] + [math.inf]
+
+    def report(self):
+        return {"entries": self.count, "mean": self.mean, "std": self.std(),
+                "frequencies": [[limit, frequency] for limit, frequency in zip(self.limits(), self.counts) if frequency]}
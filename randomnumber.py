@@ -1,73 +1,123 @@
-import random
-from datetime import datetime
-
-def generate_random_numbers():
-    try:
-        quantity = int(input("Enter the number of random numbers to generate: "))
-        if quantity <= 0:
-            print("Error: Invalid input - Quantity must be a positive integer.")
-            return
-
-        min_value = float(input("Enter the minimum value [0.0]: ") or "0.0")
-        max_value = float(input("Enter the maximum value [1.0]: ") or "1.0")
-        precision = int(input("Enter decimal precision [5]: ") or "5")
-
-        if precision < 0:
-            print("Error: Invalid input - Precision must be a non-negative integer.")
-            return
-
-        if min_value >= max_value:
-            print("Error: Invalid input - Minimum value must be less than maximum value.")
-            return
-
-        filename = "randomnumber.txt"  # Fixed filename
-
-        # Generate random numbers and store them in a list
-        random_numbers = []
-        for _ in range(quantity):
-            random_number = round(random.uniform(min_value, max_value), precision)
-            random_numbers.append(random_number)
-
-        # Save numbers to the file in table form
-        save_to_file_table(random_numbers, filename, per_row=10)
-
-        print(f"\n random numbers are save in {filename} files","\n")
-
-        show_stats = input("Would you like to see statistics? (yes/no): ").lower().startswith('y')
-
-        if show_stats:
-            min_val = min(random_numbers)
-            max_val = max(random_numbers)
-            avg_val = sum(random_numbers) / len(random_numbers)
-
-            print("\nStatistics:")
-            print(f"  Minimum value: {min_val}")
-            print(f"  Maximum value: {max_val}")
-            print(f"  Average value: {avg_val:.{precision}f} \n")
-
-    except ValueError as e:
-        print(f"Error: Invalid input - {e}")
-    except IOError as e:
-        print(f"Error writing to file: {e}")
-
-def save_to_file_table(numbers, filename, per_row=10):
-    """Saves the numbers to a file in table form."""
-    try:
-        with open(filename, 'w') as file:
-            # Determine the width of each column
-            max_length = max(len(str(num)) for num in numbers)
-            column_width = max_length + 4  # Add padding
-
-            # Write the numbers in table format
-            for i in range(0, len(numbers), per_row):
-                row = ""
-                for num in numbers[i:i + per_row]:
-                    row += f"{str(num).ljust(column_width)}"
-                file.write(row.rstrip() + "\n")
-
-        
-    except IOError as e:
-        print(f"Error writing to file: {e}")
-
-if __name__ == "__main__":
-    generate_random_numbers()
\ No newline at end of file
+import numpy as np
+from instrument import stage
+from stream import generate_chunks, iter_chunks
+from datetime import datetime
+import sys
+
+def generate_random_numbers():
+    try:
+        quantity = int(input("Enter the number of random numbers to generate: "))
+        if quantity <= 0:
+            print("Error: Invalid input - Quantity must be a positive integer.")
+            return
+
+        min_value = float(input("Enter the minimum value [0.0]: ") or "0.0")
+        max_value = float(input("Enter the maximum value [1.0]: ") or "1.0")
+        precision = int(input("Enter decimal precision [5]: ") or "5")
+
+        if precision < 0:
+            print("Error: Invalid input - Precision must be a non-negative integer.")
+            return
+
+        if min_value >= max_value:
+            print("Error: Invalid input - Minimum value must be less than maximum value.")
+            return
+
+        filename = "randomnumber.txt"  # Fixed filename
+
+        stats = write_random_numbers(quantity, min_value, max_value, precision, filename)
+
+        print(f"\n random numbers are save in {filename} files","\n")
+
+        show_stats = input("Would you like to see statistics? (yes/no): ").lower().startswith('y')
+
+        if show_stats:
+            print("\nStatistics:")
+            print(f"  Minimum value: {stats['min']}")
+            print(f"  Maximum value: {stats['max']}")
+            print(f"  Average value: {stats['mean']:.{precision}f} \n")
+
+    except ValueError as e:
+        print(f"Error: Invalid input - {e}")
+    except IOError as e:
+        print(f"Error writing to file: {e}")
+
+def write_random_numbers(quantity, min_value=0.0, max_value=1.0, precision=5, filename="randomnumber.txt", seed=None,
+                         generator="pcg64"):
+    """Generates random numbers chunk by chunk, saves them in table form and returns their statistics."""
+    stats = {"count": 0, "min": float("inf"), "max": float("-inf"), "total": 0.0}
+
+    def tracked(chunks):
+        for chunk in chunks:
+            stats["count"] += len(chunk)
+            stats["min"] = min(stats["min"], float(chunk.min()))
+            stats["max"] = max(stats["max"], float(chunk.max()))
+            stats["total"] += float(chunk.sum())
+            yield chunk
+
+    save_to_file_table(tracked(generate_chunks(quantity, min_value, max_value, precision, seed,
+                                                      generator=generator)), filename,
+                       per_row=10, precision=precision, min_value=min_value, max_value=max_value)
+    stats["mean"] = stats.pop("total") / stats["count"]
+    return stats
+
+def column_width(precision, min_value, max_value):
+    """Returns the column width for numbers in [min_value, max_value] with the given precision."""
+    # No number in the range formats wider than the wider of the two bounds
+    return max(len(f"{min_value:.{precision}f}"), len(f"{max_value:.{precision}f}")) + 4  # Add padding
+
+def _row_format(count, column_width, precision):
+    return f"%-{column_width}.{precision}f" * (count - 1) + f"%.{precision}f\n"
+
+def save_to_file_table(numbers, filename, per_row=10, mode='w', precision=None, min_value=None, max_value=None,
+                       rows_per_block=10_000):
+    """Saves the numbers to a file in table form; mode='a' appends.
+
+    When precision and the bounds are given the column width is known up front,
+    so `numbers` may be a list/array or an iterable of chunks. Rows are then
+    rendered rows_per_block at a time with a single %-format call, and a
+    partial row left at the end of a chunk is carried into the next one.
+    Without them the width comes from scanning the numbers and each value is
+    written as str(num).
+    """
+    try:
+        with open(filename, mode) as file:
+            if precision is None or min_value is None or max_value is None:
+                # Determine the width of each column
+                max_length = max(len(str(num)) for num in numbers)
+                width = max_length + 4  # Add padding
+
+                # Write the numbers in table format
+                for i in range(0, len(numbers), per_row):
+                    row = ""
+                    for num in numbers[i:i + per_row]:
+                        row += f"{str(num).ljust(width)}"
+                    file.write(row.rstrip() + "\n")
+                return
+
+            width = column_width(precision, min_value, max_value)
+            block_size = per_row * rows_per_block
+            block_format = _row_format(per_row, width, precision) * rows_per_block
+            pending = np.empty(0)
+            for chunk in iter_chunks(numbers):
+                values = np.concatenate((pending, chunk)) if len(pending) else chunk
+                full = len(values) - len(values) % per_row
+                for start in range(0, full, block_size):
+                    block = values[start:min(start + block_size, full)]
+                    with stage("format", len(block)):
+                        if len(block) == block_size:
+                            text = block_format % tuple(block.tolist())
+                        else:
+                            text = _row_format(per_row, width, precision) * (len(block) // per_row) % tuple(block.tolist())
+                    with stage("write", len(block), nbytes=len(text)):
+                        file.write(text)
+                pending = values[full:]
+            if len(pending):
+                file.write(_row_format(len(pending), width, precision) % tuple(pending.tolist()))
+
+    except IOError as e:
+        print(f"Error writing to file: {e}")
+
+if __name__ == "__main__":
+    from cli import main
+    main(["random"] + sys.argv[1:])
\ No newline at end of file
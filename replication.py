@@ -0,0 +1,138 @@
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from qstats import Welford
+
+DEFAULT_METRICS = {
+    "grocery": ("tables.WAITING.mean", "facilities.CLERK.utilization"),
+    "barber-1q2": ("tables.WAITING.mean", "facilities.BARBER1.utilization"),
+    "barber-1q3": ("tables.WAITING.mean", "facilities.BARBER1.utilization"),
+    "barber-2q2": ("tables.WAITING.mean", "facilities.BARBER1.utilization"),
+}
+
+def report_metrics(report, prefix=""):
+    """Flattens the numbers of a simulation report into {"queues.QUEUE.average_time": value, ...}."""
+    metrics = {}
+    for key, value in report.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            metrics.update(report_metrics(value, name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            metrics[name] = float(value)
+    return metrics
+
+def _runner(model, params):
+    """Returns run(seed_generator) for a model name of models.MODELS or a GPSS model file."""
+    import models
+    if model in models.MODELS:
+        return lambda generator: models.run_model(model, generator=generator, **params)
+    import gpss
+    program = gpss.load_model(model)
+    start, until = params.get("start"), params.get("until")
+    return lambda generator: program.run(start, generator=generator, until=until)
+
+def _run_batch(model, params, generator, seed, first, count):
+    """Runs replications first..first+count-1, each on its own substream, and returns Welfords per metric."""
+    from prng import create_generator
+    run = _runner(model, params)
+    base = create_generator(generator, seed)
+    accumulators = {}
+    for index in range(first, first + count):
+        for name, value in report_metrics(run(base.substream(index))).items():
+            if name not in accumulators:
+                accumulators[name] = Welford()
+            accumulators[name].update(value)
+    return accumulators
+
+def _merge(total, part):
+    for name, accumulator in part.items():
+        if name not in total:
+            total[name] = Welford()
+        total[name].merge(accumulator)
+
+def _precise_enough(accumulators, metrics, target, relative, confidence):
+    for name in metrics:
+        accumulator = accumulators.get(name)
+        if accumulator is None:
+            raise ValueError(f"Unknown metric '{name}'")
+        limit = target * abs(accumulator.mean) if relative else target
+        if accumulator.half_width(confidence) > limit:
+            return False
+    return True
+
+def replicate(model, metrics=None, target=None, relative=False, confidence=0.95, min_replications=10,
+              max_replications=1000, batch_size=20, workers=None, seed=None, generator="pcg64", **params):
+    """Runs independent replications of a model and returns confidence intervals of its statistics.
+
+    model is a name of models.MODELS or a GPSS model file; params are passed
+    to it (customers, duration, interarrival, service, or start and until for
+    GPSS files). Replication i draws from substream i of the seeded generator,
+    so the streams never overlap and a result does not depend on the number
+    of workers. Batches of batch_size replications run in a process pool and
+    come back as Welford accumulators, which are merged in batch order. With a target
+    the run stops, after at least min_replications, once the confidence
+    interval half-width of every watched metric is at most target (or
+    target * |mean| if relative).
+    """
+    if seed is None:
+        # Every replication must draw from the same family of substreams
+        seed = int(np.random.SeedSequence().entropy)
+    if metrics is None:
+        metrics = DEFAULT_METRICS.get(model, ())
+    workers = workers or os.cpu_count()
+
+    batches = [(first, min(batch_size, max_replications - first)) for first in range(0, max_replications, batch_size)]
+    accumulators = {}
+    done = 0
+    stopped = False
+
+    def finished():
+        return (target is not None and done >= min_replications
+                and _precise_enough(accumulators, metrics, target, relative, confidence))
+
+    if workers == 1:
+        for first, count in batches:
+            _merge(accumulators, _run_batch(model, params, generator, seed, first, count))
+            done += count
+            if finished():
+                stopped = True
+                break
+    else:
+        with ProcessPoolExecutor(workers) as executor:
+            pending = iter(batches)
+            futures = []
+            for first, count in pending:
+                futures.append((count, executor.submit(_run_batch, model, params, generator, seed, first, count)))
+                if len(futures) == 2 * workers:
+                    break
+            while futures:
+                count, future = futures.pop(0)
+                _merge(accumulators, future.result())
+                done += count
+                if finished():
+                    stopped = True
+                    for _, future in futures:
+                        future.cancel()
+                    break
+                for first, count in pending:
+                    futures.append((count, executor.submit(_run_batch, model, params, generator, seed, first, count)))
+                    break
+
+    unknown = [name for name in metrics if name not in accumulators]
+    if unknown:
+        raise ValueError(f"Unknown metric(s): {', '.join(unknown)}")
+    return {
+        "model": model,
+        "replications": done,
+        "seed": seed,
+        "confidence": confidence,
+        "target_reached": stopped,
+        "metrics": {name: {"mean": accumulator.mean, "std": accumulator.std(), "count": accumulator.count,
+                           "half_width": accumulator.half_width(confidence)}
+                    for name, accumulator in sorted(accumulators.items())},
+    }
+
+if __name__ == "__main__":
+    from cli import main
+    main(["replicate"] + sys.argv[1:])
@@ -0,0 +1,123 @@
+import os
+import struct
+import numpy as np
+from instrument import stage
+from stream import DEFAULT_CHUNK_SIZE
+
+# Header: magic, dtype code, precision (-1 = not rounded), has_seed flag,
+# seed, sample count, generator name. 64 bytes, so the samples that follow
+# stay aligned.
+MAGIC = b"SIMUSMP1"
+HEADER = struct.Struct("<8s4siiQQ28s")
+HEADER_SIZE = HEADER.size
+# Seeds are stored in an unsigned 64-bit field
+MAX_SEED = 2 ** 64 - 1
+DTYPES = {"f8": np.dtype("<f8"), "u4": np.dtype("<u4")}
+
+def is_sample_file(filename):
+    """Returns True if filename starts with the sample-store header."""
+    try:
+        with open(filename, 'rb') as file:
+            return file.read(len(MAGIC)) == MAGIC
+    except IOError:
+        return False
+
+def read_header(filename):
+    """Returns the header of a sample file as a dict."""
+    with open(filename, 'rb') as file:
+        raw = file.read(HEADER.size)
+    if len(raw) < HEADER.size or raw[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"'{filename}' is not a sample file")
+    _, dtype, precision, has_seed, seed, count, generator = HEADER.unpack(raw)
+    return {
+        "dtype": dtype.rstrip(b"\0").decode(),
+        "precision": None if precision < 0 else precision,
+        "seed": seed if has_seed else None,
+        "count": count,
+        "generator": generator.rstrip(b"\0").decode(),
+    }
+
+class SampleWriter:
+    """Writes chunks of samples to a binary sample file.
+
+    The header is written with a count of zero and rewritten with the real
+    count on close, so the file can be filled from a stream of any length.
+    The seed, if given, must lie in 0..MAX_SEED.
+    """
+
+    def __init__(self, filename, dtype="f8", generator="", seed=None, precision=None):
+        if dtype not in DTYPES:
+            raise ValueError(f"Unsupported dtype '{dtype}'")
+        if seed is not None and not 0 <= seed <= MAX_SEED:
+            raise ValueError(f"Seed {seed} cannot be stored: it must be between 0 and {MAX_SEED}")
+        self.filename = filename
+        self.dtype = dtype
+        self.generator = generator
+        self.seed = seed
+        self.precision = precision
+        self.count = 0
+        self.file = open(filename, 'wb')
+        self._write_header()
+
+    def _write_header(self):
+        self.file.seek(0)
+        self.file.write(HEADER.pack(
+            MAGIC,
+            self.dtype.encode(),
+            -1 if self.precision is None else self.precision,
+            self.seed is not None,
+            0 if self.seed is None else self.seed,
+            self.count,
+            self.generator.encode()[:28],
+        ))
+
+    def write(self, chunk):
+        with stage("write", len(chunk), file=self.file):
+            self.file.write(np.ascontiguousarray(chunk, dtype=DTYPES[self.dtype]).tobytes())
+        self.count += len(chunk)
+
+    def close(self):
+        if not self.file.closed:
+            self._write_header()
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def write_samples(filename, chunks, dtype="f8", generator="", seed=None, precision=None):
+    """Writes an iterable of chunks to a sample file and returns the number of samples."""
+    with SampleWriter(filename, dtype, generator, seed, precision) as writer:
+        for chunk in chunks:
+            writer.write(chunk)
+    return writer.count
+
+def open_samples(filename):
+    """Returns (samples, header) with the samples memory-mapped read-only."""
+    header = read_header(filename)
+    if header["count"] == 0:
+        return np.empty(0, dtype=DTYPES[header["dtype"]]), header
+    samples = np.memmap(filename, dtype=DTYPES[header["dtype"]], mode='r',
+                        offset=HEADER_SIZE, shape=(header["count"],))
+    return samples, header
+
+def iter_samples(filename, quantity=None, chunk_size=DEFAULT_CHUNK_SIZE, start=0):
+    """Yields zero-copy chunks of a sample file, starting at sample `start`."""
+    samples, _ = open_samples(filename)
+    stop = len(samples) if quantity is None else min(len(samples), start + quantity)
+    for begin in range(start, stop, chunk_size):
+        yield samples[begin:min(begin + chunk_size, stop)]
+
+def export_text(filename, text_filename, precision=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Writes the samples of a sample file as text, one value per line."""
+    header = read_header(filename)
+    if precision is None:
+        precision = header["precision"]
+    fmt = "%d" if header["dtype"] == "u4" else "%.17g" if precision is None else f"%.{precision}f"
+    with open(text_filename, 'w') as file:
+        for chunk in iter_samples(filename, chunk_size=chunk_size):
+            with stage("write", len(chunk), file=file):
+                np.savetxt(file, chunk, fmt=fmt)
+    return os.path.getsize(text_filename)
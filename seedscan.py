@@ -0,0 +1,207 @@
+import os
+import sys
+import numpy as np
+from pvalues import chi2_isf, chi2_sf
+
+MIN_WIDTH = 2
+MAX_WIDTH = 8
+DEFAULT_DRAWS = 100
+# Same bins as midsquare.chi_square_test
+NUM_BINS = 10
+CHUNK_ROWS = 1 << 20
+
+# One record per seed, indexed by the seed itself
+INDEX_DTYPE = np.dtype([("tail", "<u4"), ("period", "<u4"), ("cycle", "<u4"), ("chi2", "<f4")])
+
+def midsquare_map(width):
+    """Returns next[x], the mid-square successor of every width-digit state x, as a uint32 array."""
+    size = 10 ** width
+    following = np.empty(size, dtype=np.uint32)
+    for start in range(0, size, CHUNK_ROWS):
+        states = np.arange(start, min(start + CHUNK_ROWS, size), dtype=np.uint64)
+        # Same step as midsquare.generate_with_cycle: squares of width digits fit in uint64
+        following[start:start + CHUNK_ROWS] = (states * states // np.uint64(10 ** (width - width // 2))) % np.uint64(size)
+    return following
+
+def state_bins(width):
+    """Returns the chi-square bin of every state, with the edges np.histogram uses over [0, 10 ** width - 1]."""
+    size = 10 ** width
+    bins = np.empty(size, dtype=np.uint8)
+    for start in range(0, size, CHUNK_ROWS):
+        states = np.arange(start, min(start + CHUNK_ROWS, size), dtype=np.uint64)
+        bins[start:start + CHUNK_ROWS] = np.minimum(states * NUM_BINS // np.uint64(size - 1), NUM_BINS - 1)
+    return bins
+
+def _peel(following):
+    """Strips the functional graph down to its cycles.
+
+    Repeatedly removes every state that no remaining state maps to (Kahn's
+    algorithm, one vectorized round at a time). Returns the rounds of removed
+    states in removal order and the mask of states left, which are the ones on
+    a cycle. A state is always removed in an earlier round than its successor.
+    """
+    indegree = np.bincount(following, minlength=len(following)).astype(np.int32)
+    frontier = np.flatnonzero(indegree == 0).astype(np.uint32)
+    rounds = []
+    while len(frontier):
+        rounds.append(frontier)
+        targets, hits = np.unique(following[frontier], return_counts=True)
+        indegree[targets] -= hits.astype(np.int32)
+        frontier = targets[indegree[targets] == 0]
+    return rounds, indegree > 0
+
+def _power(following, exponent):
+    """Returns following applied exponent times to every state (pointer doubling)."""
+    result = np.arange(len(following), dtype=np.uint32)
+    base = following
+    while exponent:
+        if exponent & 1:
+            result = base[result]
+        exponent >>= 1
+        if exponent:
+            base = base[base]
+    return result
+
+def scan(width, draws=DEFAULT_DRAWS, filename=None):
+    """Analyses every seed of a width and writes the index to filename (a .npy file).
+
+    For every seed the index holds the tail (steps before the sequence enters
+    its cycle), the period, the smallest state of the cycle (0 means the
+    sequence collapses to zero) and the chi-square statistic of its first
+    `draws` numbers over NUM_BINS bins, as midsquare.chi_square_test computes
+    it. The work is linear in the number of seeds: cycles come from _peel,
+    and the other seeds are filled from their successors in reverse peeling
+    order, the bin counts by sliding a window of `draws` steps. Also writes
+    the seeds ranked best first (see rank_seeds). Returns the index, memory
+    mapped.
+    """
+    if not MIN_WIDTH <= width <= MAX_WIDTH:
+        raise ValueError(f"width must be between {MIN_WIDTH} and {MAX_WIDTH}")
+    if not 0 < draws < 1 << 16:
+        raise ValueError("draws must be between 1 and 65535")
+    filename = filename or index_path(width, draws)
+    os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
+    size = 10 ** width
+    following = midsquare_map(width)
+    rounds, on_cycle = _peel(following)
+    window_end = _power(following, draws + 1)
+
+    index = np.lib.format.open_memmap(filename + ".tmp", mode='w+', dtype=INDEX_DTYPE, shape=(size,))
+    tail, period, cycle = index["tail"], index["period"], index["cycle"]
+    bins = state_bins(width)
+    counts = np.zeros((size, NUM_BINS), dtype=np.uint8 if draws < 256 else np.uint16)
+
+    # States on a cycle: walk every cycle all at once until each state is back
+    states = np.flatnonzero(on_cycle).astype(np.uint32)
+    current = states.copy()
+    smallest = states.copy()
+    lengths = np.zeros(len(states), dtype=np.uint32)
+    step = 0
+    while step < draws or not lengths.all():
+        step += 1
+        current = following[current]
+        if step <= draws:
+            counts[states, bins[current]] += 1
+        np.minimum(smallest, current, out=smallest)
+        lengths[(lengths == 0) & (current == states)] = step
+    tail[states] = 0
+    period[states] = lengths
+    cycle[states] = smallest
+    del current, smallest, lengths
+
+    # Every other state from its successor, which lies on a cycle or was removed later
+    for frontier in reversed(rounds):
+        successor = following[frontier]
+        tail[frontier] = tail[successor] + 1
+        period[frontier] = period[successor]
+        cycle[frontier] = cycle[successor]
+        row = counts[successor]
+        row[np.arange(len(frontier)), bins[window_end[frontier]]] -= 1
+        row[np.arange(len(frontier)), bins[successor]] += 1
+        counts[frontier] = row
+    del rounds, window_end, following, bins
+
+    expected = draws / NUM_BINS
+    for start in range(0, size, CHUNK_ROWS):
+        block = counts[start:start + CHUNK_ROWS].astype(np.float64)
+        index["chi2"][start:start + CHUNK_ROWS] = ((block - expected) ** 2).sum(axis=1) / expected
+    del counts
+
+    np.save(ranking_path(filename), rank_seeds(index))
+    index.flush()
+    del index, tail, period, cycle
+    os.replace(filename + ".tmp", filename)
+    return load_index(filename)
+
+def rank_seeds(index):
+    """Returns the seeds ordered best first: most distinct values (tail + period), then lowest chi-square."""
+    key = np.empty(len(index), dtype=np.uint64)
+    for start in range(0, len(index), CHUNK_ROWS):
+        records = index[start:start + CHUNK_ROWS]
+        distinct = records["tail"].astype(np.uint64) + records["period"]
+        # Bit patterns of non-negative float32 sort like the floats themselves
+        key[start:start + CHUNK_ROWS] = ((np.uint64(2 ** 32 - 1) - distinct) << np.uint64(32)) \
+            | records["chi2"].view(np.uint32)
+    return np.argsort(key, kind='stable').astype(np.uint32)
+
+def index_path(width, draws=DEFAULT_DRAWS, directory="."):
+    return os.path.join(directory, f"midsquare-w{width}-d{draws}.npy")
+
+def ranking_path(filename):
+    return filename[:-len(".npy")] + "-rank.npy"
+
+def load_index(filename):
+    """Returns the index of a scan, memory mapped read-only."""
+    return np.load(filename, mmap_mode='r')
+
+def open_index(width, draws=DEFAULT_DRAWS, directory=".", rebuild=False):
+    """Returns the index of a width, scanning the seed space first if there is no index file yet."""
+    filename = index_path(width, draws, directory)
+    if rebuild or not os.path.exists(filename) or not os.path.exists(ranking_path(filename)):
+        return scan(width, draws, filename)
+    return load_index(filename)
+
+def seed_info(index, seed, alpha=0.05, min_period=10):
+    """Returns the index record of one seed as a dict with its chi-square p-value and verdict."""
+    record = index[seed]
+    p_value = chi2_sf(record["chi2"], NUM_BINS - 1)
+    return {
+        "seed": int(seed),
+        "tail": int(record["tail"]),
+        "period": int(record["period"]),
+        "distinct": int(record["tail"]) + int(record["period"]),
+        "cycle": int(record["cycle"]),
+        "zero": int(record["cycle"]) == 0,
+        "degenerate": int(record["cycle"]) == 0 or int(record["period"]) < min_period,
+        "chi_square": float(record["chi2"]),
+        "p_value": p_value,
+        "result": "Accepted" if p_value > alpha else "Rejected",
+    }
+
+def best_seeds(index, ranking, count=10, alpha=0.05, min_period=10, min_seed=0, block=1 << 16):
+    """Returns seed_info of the `count` best seeds that pass the chi-square test at alpha.
+
+    Seeds whose sequence collapses to zero or ends in a cycle shorter than
+    min_period are skipped, and so are seeds below min_seed (10 ** (width - 1)
+    keeps only seeds written with width significant digits). The ranking is
+    read block by block from its memory map, so a query touches only the start
+    of the file.
+    """
+    critical = chi2_isf(alpha, NUM_BINS - 1)
+    found = []
+    for start in range(0, len(ranking), block):
+        seeds = np.asarray(ranking[start:start + block])
+        records = index[seeds]
+        keep = ((records["cycle"] != 0) & (records["period"] >= min_period)
+                & (records["chi2"] < critical) & (seeds >= min_seed))
+        found.extend(seed_info(index, seed, alpha, min_period) for seed in seeds[keep][:count - len(found)])
+        if len(found) == count:
+            break
+    return found
+
+def load_ranking(width, draws=DEFAULT_DRAWS, directory="."):
+    return np.load(ranking_path(index_path(width, draws, directory)), mmap_mode='r')
+
+if __name__ == "__main__":
+    from cli import main
+    main(["seedscan"] + sys.argv[1:])
@@ -0,0 +1,302 @@
+import math
+from collections import deque
+from heapq import heappop, heappush
+from itertools import count
+import variates
+from prng import create_generator
+from qstats import Table, TimeWeighted
+
+class Simulation:
+    """Heap-based discrete-event simulation engine.
+
+    The core schedules plain callbacks: schedule(delay, callback, *args) puts
+    an event on the future events heap and run() pops events in time order
+    (ties in scheduling order) and calls them. process() adds a lighter
+    process layer on top, where a Python generator describes one transaction
+    and yields what it waits for (see Process).
+    """
+
+    def __init__(self):
+        self.now = 0.0
+        self._events = []
+        self._sequence = count()
+        self._stopped = False
+        self.events_processed = 0
+
+    def schedule(self, delay, callback, *args):
+        """Calls callback(*args) after delay time units."""
+        heappush(self._events, (self.now + delay, next(self._sequence), callback, args))
+
+    def schedule_at(self, time, callback, *args):
+        """Calls callback(*args) at absolute time `time`."""
+        heappush(self._events, (time, next(self._sequence), callback, args))
+
+    def process(self, generator, delay=0.0):
+        """Starts a process running `generator` after delay and returns it."""
+        process = Process(self, generator)
+        self.schedule(delay, process.resume)
+        return process
+
+    def stop(self):
+        """Ends run() after the current event."""
+        self._stopped = True
+
+    def pending(self):
+        """Returns the number of events on the future events heap."""
+        return len(self._events)
+
+    def run(self, until=None):
+        """Processes events until the heap is empty, stop() is called or the clock passes until.
+
+        Returns the simulation time at the end of the run.
+        """
+        events = self._events
+        self._stopped = False
+        processed = 0
+        while events and not self._stopped:
+            if until is not None and events[0][0] > until:
+                self.now = until
+                break
+            self.now, _, callback, args = heappop(events)
+            callback(*args)
+            processed += 1
+        else:
+            if until is not None and not self._stopped and self.now < until:
+                self.now = until
+        self.events_processed += processed
+        return self.now
+
+class Process:
+    """A transaction described by a generator running on a Simulation.
+
+    The generator yields a number to hold for that long (ADVANCE), or a
+    callable that takes a resume callback and calls it when the process may
+    continue, e.g. the request() of a Facility or Storage. Whatever resume is
+    called with is sent back into the generator.
+    """
+
+    __slots__ = ("simulation", "generator", "finished")
+
+    def __init__(self, simulation, generator):
+        self.simulation = simulation
+        self.generator = generator
+        self.finished = False
+
+    def resume(self, value=None):
+        try:
+            command = self.generator.send(value)
+        except StopIteration:
+            self.finished = True
+            return
+        if callable(command):
+            command(self.resume)
+        else:
+            self.simulation.schedule(command, self.resume)
+
+class _TimeWeighted(TimeWeighted):
+    """Time-weighted contents shared by storages, facilities and queues, read at the simulation clock."""
+
+    __slots__ = ("simulation", "name")
+
+    def __init__(self, simulation, name):
+        super().__init__(simulation.now)
+        self.simulation = simulation
+        self.name = name
+
+    def area(self):
+        """Returns the integral of the contents over time up to now."""
+        return self.area_until(self.simulation.now)
+
+    def average_contents(self):
+        return self.average_until(self.simulation.now)
+
+    def average_time(self):
+        """Average time per entry (area / entries, as GPSS reports it)."""
+        return self.time_per_entry_until(self.simulation.now)
+
+class Storage(_TimeWeighted):
+    """A storage of `capacity` units (GPSS STORAGE, ENTER, LEAVE).
+
+    enter() calls the callback at once if the units are free, otherwise the
+    request waits in a FIFO delay chain. The chain is served in order, so a
+    large request at the head is not overtaken by smaller ones behind it.
+    """
+
+    __slots__ = ("capacity", "delay_chain")
+
+    def __init__(self, simulation, name, capacity=1):
+        super().__init__(simulation, name)
+        self.capacity = capacity
+        self.delay_chain = deque()
+
+    @property
+    def available(self):
+        return self.capacity - self.contents
+
+    def is_full(self):
+        return self.contents >= self.capacity
+
+    def enter(self, callback, count=1, *args):
+        """Takes count units and calls callback(*args), waiting for them if needed."""
+        if count > self.capacity:
+            raise ValueError(f"{self.name}: request of {count} exceeds capacity {self.capacity}")
+        if not self.delay_chain and self.contents + count <= self.capacity:
+            self.change(count, self.simulation.now)
+            self.entries += count
+            callback(*args)
+        else:
+            self.delay_chain.append((count, callback, args))
+
+    def try_enter(self, count=1):
+        """Takes count units if they are free and nobody is waiting; returns whether it did."""
+        if self.delay_chain or self.contents + count > self.capacity:
+            return False
+        self.change(count, self.simulation.now)
+        self.entries += count
+        return True
+
+    def leave(self, count=1):
+        """Frees count units and admits waiting requests that now fit."""
+        self.change(-count, self.simulation.now)
+        chain = self.delay_chain
+        while chain and self.contents + chain[0][0] <= self.capacity:
+            count, callback, args = chain.popleft()
+            self.change(count, self.simulation.now)
+            self.entries += count
+            callback(*args)
+
+    def request(self, count=1):
+        """Returns a command for processes: `yield storage.request()` waits for the units."""
+        return lambda resume: self.enter(resume, count)
+
+    def utilization(self):
+        return self.average_contents() / self.capacity
+
+    def report(self):
+        return {"capacity": self.capacity, "remaining": self.available, "max": self.max_contents,
+                "entries": self.entries, "average_contents": self.average_contents(),
+                "utilization": self.utilization(), "delay": len(self.delay_chain)}
+
+class Facility(Storage):
+    """A single server (GPSS FACILITY, SEIZE, RELEASE)."""
+
+    __slots__ = ()
+
+    def __init__(self, simulation, name):
+        super().__init__(simulation, name, 1)
+
+    def is_busy(self):
+        return self.contents > 0
+
+    def seize(self, callback, *args):
+        if self.contents or self.delay_chain:
+            self.delay_chain.append((1, callback, args))
+            return
+        self.change(1, self.simulation.now)
+        self.entries += 1
+        callback(*args)
+
+    def release(self):
+        self.change(-1, self.simulation.now)
+        if self.delay_chain:
+            _, callback, args = self.delay_chain.popleft()
+            self.change(1, self.simulation.now)
+            self.entries += 1
+            callback(*args)
+
+    def report(self):
+        return {"entries": self.entries, "utilization": self.utilization(), "average_time": self.average_time(),
+                "busy": self.is_busy(), "delay": len(self.delay_chain)}
+
+class Queue(_TimeWeighted):
+    """Queue statistics (GPSS QUEUE, DEPART); it does not hold anything up.
+
+    join() returns the entry time, which depart() takes back to count the
+    entries that left without waiting.
+    """
+
+    __slots__ = ("zero_entries",)
+
+    def __init__(self, simulation, name):
+        super().__init__(simulation, name)
+        self.zero_entries = 0
+
+    def join(self, count=1):
+        self.change(count, self.simulation.now)
+        self.entries += count
+        return self.simulation.now
+
+    def pass_through(self, count=1):
+        """Counts entries that join and depart at once, without calling join() and depart()."""
+        if self.contents + count > self.max_contents:
+            self.max_contents = self.contents + count
+        self.entries += count
+        self.zero_entries += count
+
+    def depart(self, entered, count=1):
+        self.change(-count, self.simulation.now)
+        if entered == self.simulation.now:
+            self.zero_entries += count
+
+    def average_time_nonzero(self):
+        nonzero = self.entries - self.zero_entries
+        return self.area() / nonzero if nonzero else 0.0
+
+    def report(self):
+        return {"max": self.max_contents, "contents": self.contents, "entries": self.entries,
+                "zero_entries": self.zero_entries, "average_contents": self.average_contents(),
+                "average_time": self.average_time(), "average_time_nonzero": self.average_time_nonzero()}
+
+class RandomStream:
+    """Random variates for the models, drawn in buffered blocks from a prng backend."""
+
+    def __init__(self, generator="pcg64", seed=None, buffer_size=4096):
+        self.rng = create_generator(generator, seed) if isinstance(generator, str) else generator
+        self.buffer_size = buffer_size
+        self._buffer = []
+
+    def random(self):
+        if not self._buffer:
+            # Reversed so that pop() hands out the block in stream order
+            self._buffer = self.rng.random(self.buffer_size)[::-1].tolist()
+        return self._buffer.pop()
+
+    def uniform(self, low, high):
+        return low + (high - low) * self.random()
+
+    def spread(self, mean, half_width):
+        """GPSS-style A +- B: uniform on [mean - half_width, mean + half_width]."""
+        return mean - half_width + 2.0 * half_width * self.random()
+
+    def exponential(self, mean):
+        return -mean * math.log(1.0 - self.random())
+
+    def sampler(self, distribution):
+        """Returns a zero-argument function giving one variate of a variates.Distribution per call.
+
+        The variates are generated a buffer at a time in bulk, so each call
+        only pops a ready value.
+        """
+        return variates.sampler(self.rng, distribution, self.buffer_size)
+
+class Source:
+    """Creates transactions (GPSS GENERATE): calls action() at every arrival.
+
+    interarrival is a zero-argument callable giving the time to the next
+    arrival. The first arrival comes after `first` if given, otherwise after
+    one interarrival time; limit caps the number of arrivals.
+    """
+
+    def __init__(self, simulation, interarrival, action, first=None, limit=None):
+        self.simulation = simulation
+        self.interarrival = interarrival
+        self.action = action
+        self.limit = limit
+        self.count = 0
+        simulation.schedule(interarrival() if first is None else first, self._arrive)
+
+    def _arrive(self):
+        self.count += 1
+        if self.limit is None or self.count < self.limit:
+            self.simulation.schedule(self.interarrival(), self._arrive)
+        self.action()
@@ -0,0 +1,60 @@
+import numpy as np
+from instrument import stage
+from prng import create_generator
+
+# A multiple of 10 so rows of 10 numbers never straddle two chunks
+DEFAULT_CHUNK_SIZE = 1_000_000
+
+def generate_chunks(quantity, min_val=0.0, max_val=1.0, precision=None, seed=None, chunk_size=DEFAULT_CHUNK_SIZE, start=0,
+                    generator="pcg64"):
+    """Yields quantity uniform random numbers as NumPy arrays of at most chunk_size values.
+
+    The numbers come from the registered prng backend `generator` seeded with
+    seed, so the same seed gives the same stream whatever the chunk size. If
+    precision is given the values are rounded to that many decimals. `start`
+    skips that many numbers of the stream by jumping ahead, so a stream can be
+    produced in separate pieces.
+    """
+    rng = create_generator(generator, seed)
+    if start:
+        rng.advance(start)
+    remaining = quantity
+    while remaining > 0:
+        size = min(chunk_size, remaining)
+        with stage("generate", size):
+            chunk = rng.uniform(min_val, max_val, size)
+            if precision is not None:
+                chunk = np.round(chunk, precision)
+        yield chunk
+        remaining -= size
+
+def iter_chunks(numbers, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yields NumPy chunks from a list/array of numbers or from an iterable of chunks."""
+    if isinstance(numbers, (list, tuple, np.ndarray)):
+        numbers = np.asarray(numbers, dtype=float)
+        for start in range(0, len(numbers), chunk_size):
+            yield numbers[start:start + chunk_size]
+    else:
+        for chunk in numbers:
+            yield np.asarray(chunk, dtype=float)
+
+def iter_blocks(numbers, block_size, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yields consecutive blocks of block_size numbers as 2-D arrays, one row per block.
+
+    Each chunk of the input gives the full blocks it completes in one array;
+    numbers left over are carried into the next chunk, and an incomplete last
+    block is dropped.
+    """
+    carry = np.empty(0)
+    for chunk in iter_chunks(numbers, chunk_size):
+        buffer = np.concatenate((carry, chunk)) if len(carry) else chunk
+        full = len(buffer) - len(buffer) % block_size
+        if full:
+            yield buffer[:full].reshape(-1, block_size)
+        carry = buffer[full:]
+
+def print_rows(chunk, per_row=10):
+    """Prints a chunk of numbers in rows separated by ' | '."""
+    with stage("format", len(chunk)):
+        for i in range(0, len(chunk), per_row):
+            print(" | ".join(map(str, chunk[i:i + per_row])))
@@ -0,0 +1,21 @@
+import numpy as np
+import pytest
+from actest import AutocorrelationAccumulator, autocorrelation_test
+
+@pytest.mark.parametrize("lag", [0, -1])
+def test_lag_below_one_is_rejected(lag):
+    with pytest.raises(ValueError):
+        AutocorrelationAccumulator(lag)
+    with pytest.raises(ValueError):
+        AutocorrelationAccumulator(lag, all_lags=True)
+
+@pytest.mark.parametrize("lag", [1, 3])
+def test_streamed_sums_match_the_array_test(lag):
+    numbers = np.random.default_rng(6).random(10001)
+    accumulator = AutocorrelationAccumulator(lag, center=numbers.mean())
+    for begin in range(0, len(numbers), 999):
+        accumulator.update(numbers[begin:begin + 999])
+    result, rho, z0, _ = accumulator.result(0.05)
+    expected = autocorrelation_test(numbers, lag, 0.05)
+    assert result == expected[0]
+    assert rho == pytest.approx(expected[1], rel=1e-9, abs=1e-12)
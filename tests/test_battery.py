@@ -0,0 +1,55 @@
+import pytest
+from battery import _run_shard, battery_report, open_source, run_battery, run_battery_parallel
+from instrument import peak_rss
+from samplestore import write_samples
+from stream import generate_chunks
+
+PARAMS = dict(min_val=0.0, max_val=1.0, precision=5, num_intervals=10, lag=2, gap_range=(0.2, 0.5))
+# Uneven shard bounds, so that blocks, gaps and lag pairs straddle them
+BOUNDS = [0, 1, 33333, 100000, 100003, 250000]
+
+def assert_same_rows(rows, expected):
+    assert [row[0] for row in rows] == [row[0] for row in expected]
+    for row, sequential in zip(rows, expected):
+        assert row[1] == pytest.approx(sequential[1], rel=1e-9, abs=1e-12), row[0]
+        assert row[2] == pytest.approx(sequential[2], rel=1e-9, abs=1e-12), row[0]
+        assert row[3] == sequential[3], row[0]
+
+def sequential(generator, seed=8, total=BOUNDS[-1]):
+    return run_battery(generate_chunks(total, precision=5, seed=seed, chunk_size=30000, generator=generator),
+                       **PARAMS)
+
+@pytest.mark.parametrize("generator", ["pcg64", "lcg", "mrg32k3a"])
+def test_merged_shards_match_a_single_pass(generator):
+    expected, count = sequential(generator)
+    parts = [_run_shard(None, 8, first, last, 30000, generator, PARAMS) for first, last in zip(BOUNDS, BOUNDS[1:])]
+    accumulators = parts[0]
+    for part in parts[1:]:
+        for name, accumulator in accumulators.items():
+            accumulator.merge(part[name])
+    assert count == BOUNDS[-1]
+    assert_same_rows(battery_report(accumulators, 0.05), expected)
+
+def test_parallel_battery_matches_run_battery():
+    expected, _ = sequential("pcg64")
+    rows, count = run_battery_parallel(workers=2, quantity=BOUNDS[-1], seed=8, chunk_size=30000, shards=3, **PARAMS)
+    assert count == BOUNDS[-1]
+    assert_same_rows(rows, expected)
+
+def test_parallel_battery_over_a_sample_file(tmp_path):
+    filename = str(tmp_path / "samples.bin")
+    write_samples(filename, generate_chunks(BOUNDS[-1], precision=5, seed=8, chunk_size=30000), seed=8, precision=5)
+    expected, _ = run_battery(open_source(filename=filename, chunk_size=30000), **PARAMS)
+    rows, count = run_battery_parallel(workers=2, filename=filename, chunk_size=30000, shards=4, **PARAMS)
+    assert count == BOUNDS[-1]
+    assert_same_rows(rows, expected)
+    assert_same_rows(rows, sequential("pcg64")[0])
+
+def test_many_shards_are_merged_as_they_arrive():
+    # Every shard carries an 8 MB K-S histogram; holding all 100 would take about 800 MB
+    before = peak_rss()
+    rows, count = run_battery_parallel(workers=2, quantity=BOUNDS[-1], seed=8, chunk_size=30000, shards=100,
+                                       **PARAMS)
+    assert (peak_rss() - before) < 300 * 2 ** 20
+    assert count == BOUNDS[-1]
+    assert_same_rows(rows, sequential("pcg64")[0])
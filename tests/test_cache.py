@@ -0,0 +1,27 @@
+from battery import cache_params, run_battery, run_battery_cached
+from cache import ResultCache
+from stream import generate_chunks
+
+def test_extended_cached_run_matches_a_fresh_run(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    rows, count, reused = run_battery_cached(cache, quantity=120000, seed=5, chunk_size=25000)
+    assert (count, reused) == (120000, 0)
+    assert cache.counts(cache_params(5)) == [120000]
+
+    rows, count, reused = run_battery_cached(cache, quantity=300000, seed=5, chunk_size=25000)
+    expected, _ = run_battery(generate_chunks(300000, precision=5, seed=5, chunk_size=25000))
+    assert (count, reused) == (300000, 120000)
+    assert [row[3] for row in rows] == [row[3] for row in expected]
+    for row, fresh in zip(rows, expected):
+        assert abs(row[1] - fresh[1]) <= 1e-9 * max(1.0, abs(fresh[1])), row[0]
+
+    # A shorter run reuses the longest cached prefix it can
+    _, _, reused = run_battery_cached(cache, quantity=200000, seed=5, chunk_size=25000)
+    assert reused == 120000
+
+def test_other_parameters_do_not_share_entries(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    run_battery_cached(cache, quantity=50000, seed=5, chunk_size=25000)
+    assert run_battery_cached(cache, quantity=50000, seed=6, chunk_size=25000)[2] == 0
+    assert run_battery_cached(cache, quantity=50000, seed=5, chunk_size=25000, lag=3)[2] == 0
+    assert run_battery_cached(cache, quantity=50000, seed=5, chunk_size=25000)[2] == 50000
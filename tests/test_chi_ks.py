@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+from chi_ks import ChiSquareAccumulator, KSAccumulator
+
+stats = pytest.importorskip("scipy.stats")
+
+@pytest.mark.parametrize("decimals", [None, 2, 5])
+def test_ks_sketch_is_within_its_error_bound(decimals):
+    numbers = np.random.default_rng(11).random(20000)
+    if decimals is not None:
+        numbers = np.round(numbers, decimals)
+    accumulator = KSAccumulator(resolution=10 ** 3)
+    accumulator.update(numbers)
+    d, _, _ = accumulator.result(0.05)
+    exact = stats.kstest(numbers, "uniform").statistic
+    assert exact - accumulator.error_bound() - 1e-12 <= d <= exact + 1e-12
+
+def test_merged_accumulators_match_one_pass():
+    numbers = np.random.default_rng(12).random(30000)
+    for make in (lambda: ChiSquareAccumulator(10), lambda: KSAccumulator(resolution=1 << 12)):
+        whole, first, second = make(), make(), make()
+        whole.update(numbers)
+        first.update(numbers[:12345])
+        second.update(numbers[12345:])
+        first.merge(second)
+        assert first.n == whole.n
+        np.testing.assert_array_equal(first.counts, whole.counts)
+        assert first.result(0.05) == whole.result(0.05)
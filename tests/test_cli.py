@@ -0,0 +1,28 @@
+import pytest
+from cli import main
+from pokertest import PokerAccumulator
+
+@pytest.mark.parametrize("argv", [
+    ["poker", "-n", "1000", "--precision", "2", "--seed", "1"],
+    ["poker", "-n", "1000", "--precision", "11", "--seed", "1"],
+    ["ac", "-n", "1000", "--lag", "0", "--seed", "1"],
+    ["ac", "-n", "1000", "--lag", "-2", "--seed", "1"],
+    ["ac", "-n", "1000", "--max-lag", "0", "--seed", "1"],
+    ["battery", "-n", "1000", "--lag", "0", "--seed", "1"],
+    ["stream", "-n", "1000", "--lag", "0", "--seed", "1"],
+    ["chi-ks", "-n", "1000", "--intervals", "0", "--seed", "1"],
+    ["chi-ks", "-n", "1000", "--intervals", "1", "--seed", "1"],
+    ["battery", "-n", "1000", "--intervals", "-3", "--seed", "1"],
+    ["gap", "-n", "1000", "--intervals", "1", "--seed", "1"],
+])
+def test_invalid_arguments_are_usage_errors(argv, capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        main(argv)
+    assert exit_info.value.code == 2
+    assert "error:" in capsys.readouterr().err
+
+def test_invalid_hand_size_has_an_empty_table():
+    accumulator = PokerAccumulator(2)
+    accumulator.update([0.12, 0.5])
+    assert accumulator.table() == []
+    assert accumulator.result(0.05)[0] == "Invalid hand size"
@@ -0,0 +1,19 @@
+import numpy as np
+import pytest
+from battery import build_accumulators
+from empirical import MAX_BIRTHDAY_GRID, BirthdaySpacingsAccumulator
+
+def test_birthday_grid_is_limited_to_int64():
+    with pytest.raises(ValueError):
+        BirthdaySpacingsAccumulator(MAX_BIRTHDAY_GRID * 10)
+    assert build_accumulators(precision=12)["Birthday spacings"].grid == MAX_BIRTHDAY_GRID
+
+def test_birthday_spacings_at_the_largest_grid():
+    accumulator = BirthdaySpacingsAccumulator(MAX_BIRTHDAY_GRID)
+    numbers = np.random.default_rng(5).random(2 * accumulator.block)
+    # Numbers at the top of the range give the largest days and the widest wrapping spacing
+    numbers[:2] = 1.0
+    accumulator.update(numbers)
+    assert accumulator.counts.sum() == 2
+    result, statistic, p_value = accumulator.result(0.05)
+    assert np.isfinite(statistic) and 0 <= p_value <= 1
@@ -0,0 +1,25 @@
+import os
+import pytest
+from gpss import GPSSError, compile_model, load_model, parse
+
+LAB2 = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "lab2.gps")
+
+def test_lab2_runs_from_the_gpss_world_file():
+    program = load_model(LAB2)
+    report = program.run(2000, seed=1)
+    assert report == program.run(2000, seed=1)
+    blocks = {block[2]: block[3] for block in report["blocks"] if block[0] == ""}
+    assert blocks["TERMINATE"] == 2000
+    storage = report["storages"]["LINII"]
+    assert storage["capacity"] == 2 and storage["max"] <= 2
+    assert 0 < storage["utilization"] <= 1
+    assert report["tables"]["HIST"]["entries"] == storage["entries"]
+
+def test_constant_generate_terminates_on_schedule():
+    program = compile_model(parse("GENERATE 10\nTERMINATE 1\n"))
+    report = program.run(100, seed=1)
+    assert report["end_time"] == pytest.approx(1000.0)
+
+def test_unknown_operation_is_reported_with_its_line():
+    with pytest.raises(GPSSError):
+        parse("GENERATE 10\nFROBNICATE 1\n")
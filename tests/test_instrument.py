@@ -0,0 +1,42 @@
+import time
+import pytest
+import instrument
+from instrument import stage
+
+@pytest.fixture
+def enabled():
+    instrument.reset()
+    instrument.enable()
+    yield
+    instrument.disable()
+    instrument.reset()
+
+def rows_by_stage():
+    return {row["stage"]: row for row in instrument.report()}
+
+def test_disabled_stage_is_a_shared_no_op():
+    assert not instrument.is_enabled()
+    assert stage("test") is stage("generate")
+    chunks = [[1, 2]]
+    assert instrument.timed_chunks("load", chunks) is chunks
+
+def test_nested_stages_are_timed_exclusively(enabled):
+    with stage("test", samples=10):
+        time.sleep(0.02)
+        with stage("report"):
+            time.sleep(0.05)
+    rows = rows_by_stage()
+    assert rows["report"]["seconds"] >= 0.05
+    assert 0.02 <= rows["test"]["seconds"] < 0.05
+    assert rows["test"]["samples"] == 10 and rows["test"]["calls"] == 1
+    assert rows["report"]["samples_per_s"] is None
+    # Pipeline stages come first, in pipeline order
+    assert [row["stage"] for row in instrument.report()] == ["test", "report"]
+
+def test_file_bytes_and_chunk_samples_are_counted(enabled, tmp_path):
+    with open(tmp_path / "out.txt", "w") as file, stage("write", 3, file=file):
+        file.write("0.1\n0.2\n0.3\n")
+    assert list(instrument.timed_chunks("load", iter([[1, 2, 3], [4]]))) == [[1, 2, 3], [4]]
+    rows = rows_by_stage()
+    assert rows["write"]["bytes"] == 12
+    assert rows["load"]["samples"] == 4 and rows["load"]["calls"] == 3
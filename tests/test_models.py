@@ -0,0 +1,19 @@
+import pytest
+from models import run_model, service_system
+
+def test_same_seed_gives_the_same_report():
+    assert run_model("barber-2q2", customers=2000, seed=9) == run_model("barber-2q2", customers=2000, seed=9)
+    assert run_model("barber-2q2", customers=2000, seed=9) != run_model("barber-2q2", customers=2000, seed=10)
+
+def test_mm1_mean_wait_matches_theory():
+    # M/M/1 with rho = 0.5: mean wait in queue rho * E[S] / (1 - rho) = 0.5
+    report = service_system(interarrival=1.0, service=0.5, customers=200000, seed=2)
+    assert report["customers"] == 200000
+    assert report["tables"]["WAITING"]["mean"] == pytest.approx(0.5, rel=0.05)
+    assert report["facilities"]["BARBER"]["utilization"] == pytest.approx(0.5, rel=0.02)
+
+def test_customers_join_the_shortest_line():
+    report = run_model("barber-2q2", customers=20000, seed=3)
+    entries = [queue["entries"] for queue in report["queues"].values()]
+    # The first line wins ties, so it takes a few more customers but both stay busy
+    assert entries[0] >= entries[1] > 0.4 * sum(entries)
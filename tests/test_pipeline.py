@@ -0,0 +1,30 @@
+import asyncio
+from battery import run_battery
+from pipeline import BatteryPipeline, run_pipeline
+from stream import generate_chunks
+
+def test_partial_is_none_before_the_first_chunk():
+    async def scenario():
+        pipeline = BatteryPipeline(200000, seed=1, chunk_size=50000)
+        before_run = await pipeline.partial()
+        task = asyncio.create_task(pipeline.run())
+        await asyncio.sleep(0)
+        before_chunk = await pipeline.partial()
+        rows, count = await task
+        return before_run, before_chunk, rows, count, await pipeline.partial()
+
+    before_run, before_chunk, rows, count, after = asyncio.run(scenario())
+    assert before_run is None
+    assert before_chunk is None
+    assert count == 200000
+    assert after == (rows, count)
+
+def test_watched_run_reports_progress_and_matches_battery():
+    reports = []
+    pipeline = BatteryPipeline(300000, seed=3, chunk_size=20000)
+    rows, count = asyncio.run(run_pipeline(pipeline, interval=0.001,
+                                           callback=lambda rows, count: reports.append(count)))
+    expected, expected_count = run_battery(generate_chunks(300000, precision=5, seed=3, chunk_size=20000))
+    assert count == expected_count
+    assert rows == expected
+    assert all(0 < reported <= count for reported in reports)
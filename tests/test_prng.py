@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+from prng import available_generators, create_generator
+
+@pytest.mark.parametrize("name", available_generators())
+def test_recorded_seed_reproduces_an_entropy_seeded_stream(name):
+    rng = create_generator(name)
+    replay = create_generator(name, rng.seed)
+    np.testing.assert_array_equal(rng.random(1000), replay.random(1000))
+    np.testing.assert_array_equal(rng.substream(3).random(100), create_generator(name, rng.seed).substream(3).random(100))
+
+@pytest.mark.parametrize("name", available_generators())
+def test_advance_skips_the_numbers_it_would_draw(name):
+    drawn = create_generator(name, 42).random(5000)
+    np.testing.assert_array_equal(create_generator(name, 42).advance(4000).random(1000), drawn[4000:])
+
+@pytest.mark.parametrize("name", available_generators())
+def test_substreams_differ(name):
+    rng = create_generator(name, 7)
+    assert not np.array_equal(rng.substream(0).random(100), rng.substream(1).random(100))
+
+@pytest.mark.parametrize("name", ["lcg", "minstd"])
+def test_substreams_stop_before_they_would_overlap(name):
+    rng = create_generator(name, 7)
+    last = rng.SUBSTREAMS - 1
+    assert not np.array_equal(rng.substream(0).random(100), rng.substream(last).random(100))
+    for index in (-1, rng.SUBSTREAMS):
+        with pytest.raises(ValueError):
+            rng.substream(index)
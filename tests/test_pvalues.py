@@ -0,0 +1,60 @@
+import math
+import numpy as np
+import pytest
+from pvalues import (chi2_isf, chi2_sf, chi2_sf_array, gamma_p, gamma_q, kolmogorov_sf, normal_isf, poisson_pmf,
+                     poisson_sf)
+
+stats = pytest.importorskip("scipy.stats")
+
+def test_chi2_sf_edge_inputs():
+    assert chi2_sf(0, 9) == 1.0
+    assert chi2_sf(-1.0, 9) == 1.0
+    assert chi2_sf(math.inf, 9) == 0.0
+    assert math.isnan(chi2_sf(math.nan, 9))
+    assert gamma_p(4.5, math.inf) == 1.0
+    assert math.isnan(gamma_p(4.5, math.nan))
+    assert gamma_q(4.5, 0.0) == 1.0
+
+def test_chi2_sf_array_edge_inputs():
+    values = chi2_sf_array([math.nan, 0.0, 3.0, math.inf], 9)
+    assert math.isnan(values[0])
+    assert values[1] == 1.0
+    assert values[2] == pytest.approx(stats.chi2.sf(3.0, 9), rel=1e-12)
+    assert values[3] == 0.0
+
+@pytest.mark.parametrize("df", [1, 2, 9, 100, 4095])
+def test_chi2_sf_matches_scipy(df):
+    x = np.concatenate((np.linspace(1e-6, 3 * df + 50, 50), [1e-300, 10 * df + 500]))
+    expected = stats.chi2.sf(x, df)
+    np.testing.assert_allclose([chi2_sf(v, df) for v in x], expected, rtol=1e-10, atol=1e-300)
+    np.testing.assert_allclose(chi2_sf_array(x, df), expected, rtol=1e-10, atol=1e-300)
+
+@pytest.mark.parametrize("p", [0.5, 0.05, 1e-6])
+def test_chi2_isf_inverts_chi2_sf(p):
+    assert chi2_isf(p, 9) == pytest.approx(stats.chi2.isf(p, 9), rel=1e-10)
+
+def test_poisson_matches_scipy():
+    for mean in (1e-3, 0.5, 10.0):
+        for k in range(0, 30):
+            assert poisson_pmf(k, mean) == pytest.approx(stats.poisson.pmf(k, mean), rel=1e-10, abs=1e-300)
+            assert poisson_sf(k, mean) == pytest.approx(stats.poisson.sf(k, mean), rel=1e-9, abs=1e-300)
+    assert poisson_pmf(-1, 2.0) == 0.0
+    assert poisson_sf(-1, 2.0) == 1.0
+
+def test_normal_isf_matches_scipy():
+    for p in (1e-15, 1e-6, 0.025, 0.3, 0.5, 0.9):
+        assert normal_isf(p) == pytest.approx(stats.norm.isf(p), rel=1e-12, abs=1e-15)
+    with pytest.raises(ValueError):
+        normal_isf(0.0)
+
+@pytest.mark.parametrize("n", [1, 2, 5, 50, 1000, 10 ** 5])
+def test_kolmogorov_sf_matches_scipy(n):
+    # The Pelz-Good expansion is good to a few 1e-6 in absolute terms
+    for d in np.linspace(0.05, 3.0, 25) / math.sqrt(n):
+        if d < 1:
+            assert kolmogorov_sf(d, n) == pytest.approx(stats.kstwo.sf(d, n), abs=5e-6)
+
+def test_kolmogorov_sf_edge_inputs():
+    assert kolmogorov_sf(0.0, 10) == 1.0
+    assert kolmogorov_sf(1.0, 10) == 0.0
+    assert math.isnan(kolmogorov_sf(math.nan, 10))
@@ -0,0 +1,57 @@
+import math
+import numpy as np
+import pytest
+from qstats import Table, TimeWeighted, Welford
+
+def test_welford_merge_matches_one_pass():
+    values = np.random.default_rng(4).normal(10.0, 3.0, 1001)
+    whole, first, second, empty = Welford(), Welford(), Welford(), Welford()
+    for value in values:
+        whole.update(value)
+    for value in values[:400]:
+        first.update(value)
+    for value in values[400:]:
+        second.update(value)
+    first.merge(second)
+    first.merge(empty)
+    assert first.count == whole.count == len(values)
+    assert first.mean == pytest.approx(np.mean(values), rel=1e-12)
+    assert first.variance() == pytest.approx(np.var(values, ddof=1), rel=1e-10)
+    assert whole.variance() == pytest.approx(first.variance(), rel=1e-10)
+    assert Welford().half_width() == math.inf
+
+def test_time_weighted_average_and_merge():
+    a = TimeWeighted()
+    a.change(2, 0.0)
+    a.change(-1, 5.0)
+    assert a.max_contents == 2
+    assert a.area_until(10.0) == 15.0
+    assert a.average_until(10.0) == 1.5
+    a.close(10.0)
+    b = TimeWeighted(start=10.0)
+    b.change(1, 10.0)
+    b.close(20.0)
+    a.merge(b)
+    assert a.elapsed_until(a._start) == 20.0
+    assert a.average_until(a._start) == 1.25
+    assert a.max_contents == 2
+
+def test_table_classes_and_merge():
+    values = [-1.0, 0.0, 0.5, 5.0, 5.1, 12.0, 99.0]
+    whole, first, second = Table("T", 0.0, 5.0, 4), Table("T", 0.0, 5.0, 4), Table("T", 0.0, 5.0, 4)
+    for value in values:
+        whole.tabulate(value)
+    for value in values[:3]:
+        first.tabulate(value)
+    for value in values[3:]:
+        second.tabulate(value)
+    # <= 0, (0, 5], (5, 10], above 10
+    assert whole.counts == [2, 2, 1, 2]
+    assert whole.limits() == [0.0, 5.0, 10.0, math.inf]
+    first.merge(second)
+    assert first.counts == whole.counts
+    assert first.report()["frequencies"] == whole.report()["frequencies"] == [[0.0, 2], [5.0, 2], [10.0, 1], [math.inf, 2]]
+    assert first.mean == pytest.approx(np.mean(values))
+    assert first.std() == pytest.approx(np.std(values, ddof=1))
+    with pytest.raises(ValueError):
+        first.merge(Table("T", 0.0, 2.0, 4))
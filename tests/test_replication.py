@@ -0,0 +1,23 @@
+import pytest
+from replication import replicate
+
+def summary(**options):
+    return replicate("barber-1q2", customers=200, max_replications=12, seed=17, **options)
+
+def test_result_does_not_depend_on_workers_or_batches():
+    serial = summary(workers=1, batch_size=4)
+    parallel = summary(workers=2, batch_size=4)
+    rebatched = summary(workers=1, batch_size=5)
+    assert serial["replications"] == parallel["replications"] == rebatched["replications"] == 12
+    assert serial["metrics"] == parallel["metrics"]
+    for name, metric in serial["metrics"].items():
+        assert rebatched["metrics"][name]["count"] == metric["count"]
+        assert rebatched["metrics"][name]["mean"] == pytest.approx(metric["mean"], rel=1e-12, abs=1e-12)
+        assert rebatched["metrics"][name]["std"] == pytest.approx(metric["std"], rel=1e-9, abs=1e-12)
+
+def test_stops_once_the_target_is_reached():
+    result = replicate("barber-1q2", metrics=["tables.WAITING.mean"], target=1e6, customers=100, min_replications=6,
+                       max_replications=100, batch_size=3, workers=1, seed=17)
+    assert result["target_reached"] and result["replications"] == 6
+    with pytest.raises(ValueError):
+        replicate("barber-1q2", metrics=["no.such.metric"], customers=50, max_replications=2, workers=1, seed=1)
@@ -0,0 +1,25 @@
+import numpy as np
+import pytest
+from cli import main
+from samplestore import MAX_SEED, SampleWriter, open_samples, read_header, write_samples
+
+def test_round_trip_keeps_the_largest_seed(tmp_path):
+    filename = tmp_path / "samples.bin"
+    numbers = np.random.default_rng(1).random(1000)
+    assert write_samples(filename, [numbers[:600], numbers[600:]], generator="pcg64", seed=MAX_SEED, precision=5) == 1000
+    samples, header = open_samples(filename)
+    np.testing.assert_array_equal(samples, numbers)
+    assert header == read_header(filename)
+    assert header["seed"] == MAX_SEED and header["count"] == 1000 and header["precision"] == 5
+
+@pytest.mark.parametrize("seed", [-1, MAX_SEED + 1])
+def test_unstorable_seed_is_rejected_before_the_file_is_opened(tmp_path, seed):
+    filename = tmp_path / "samples.bin"
+    with pytest.raises(ValueError):
+        SampleWriter(filename, seed=seed)
+    assert not filename.exists()
+
+@pytest.mark.parametrize("seed", ["-1", str(MAX_SEED + 1)])
+def test_cli_rejects_unstorable_seed(seed):
+    with pytest.raises(SystemExit):
+        main(["stream", "-n", "10", "--seed", seed])
@@ -0,0 +1,42 @@
+import math
+import numpy as np
+import pytest
+from actest import autocorrelation_block_p_values, autocorrelation_test
+from chi_ks import ChiSquareAccumulator, chi_square_block_p_values, chi_square_test
+from gaptest import gap_test
+from pokertest import poker_block_p_values, poker_test
+from stream import generate_chunks
+
+@pytest.fixture(scope="module")
+def blocks():
+    return np.round(np.random.default_rng(21).random((6, 5000)), 5)
+
+def test_block_p_values_match_the_tests_on_single_blocks(blocks):
+    chi = chi_square_block_p_values(blocks, 10)
+    poker = poker_block_p_values(blocks, 5)
+    autocorrelation = autocorrelation_block_p_values(blocks, 3)
+    for r, block in enumerate(blocks):
+        accumulator = ChiSquareAccumulator(10)
+        accumulator.update(block)
+        assert chi[r] == pytest.approx(accumulator.result(0.05)[2], rel=1e-10)
+        assert poker[r] == pytest.approx(poker_test(block, 0.05, 5)[2], rel=1e-10)
+        _, _, z0, _ = autocorrelation_test(block, 3, 0.05)
+        assert autocorrelation[r] == pytest.approx(math.erfc(abs(z0) / math.sqrt(2)), rel=1e-9)
+
+def test_second_level_over_a_stream():
+    numbers = np.concatenate(list(generate_chunks(200000, precision=5, seed=13, chunk_size=30000)))
+    for run in (lambda n, size: chi_square_test(n, 10, 0.05, 0.0, 1.0, block_size=size),
+                lambda n, size: poker_test(n, 0.05, 5, block_size=size),
+                lambda n, size: autocorrelation_test(n, 1, 0.05, block_size=size),
+                lambda n, size: gap_test(n, 0.05, 0.0, 0.5, block_size=size)):
+        d, p_value, result, p_values = run(numbers, 10000)
+        assert len(p_values) == 20
+        assert np.all((p_values >= 0) & (p_values <= 1))
+        assert 0 < d < 1 and 0 <= p_value <= 1
+        # A generator stream fed in chunks gives the same blocks as the array
+        chunked = run(generate_chunks(200000, precision=5, seed=13, chunk_size=30000), 10000)
+        np.testing.assert_allclose(chunked[3], p_values, rtol=1e-12)
+
+def test_stream_shorter_than_a_block():
+    with pytest.raises(ValueError):
+        chi_square_test(np.random.default_rng(1).random(100), 10, 0.05, 0.0, 1.0, block_size=1000)
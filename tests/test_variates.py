@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+from prng import create_generator
+from variates import (AliasTable, Exponential, Normal, PiecewiseLinear, Spread, Triangular, Weibull, empirical,
+                      from_spec, sampler)
+
+stats = pytest.importorskip("scipy.stats")
+N = 200000
+
+@pytest.mark.parametrize("distribution, reference", [
+    (Exponential(2.0), stats.expon(scale=2.0)),
+    (Spread(10.0, 2.0), stats.uniform(8.0, 4.0)),
+    (Weibull(1.5, 10.0), stats.weibull_min(1.5, scale=10.0)),
+    (Triangular(1.0, 2.0, 5.0), stats.triang(0.25, loc=1.0, scale=4.0)),
+    (PiecewiseLinear([(0.0, 0.0), (1.0, 0.5), (3.0, 1.0)]), None),
+    (Normal(3.0, 2.0), stats.norm(3.0, 2.0)),
+])
+def test_continuous_variates_follow_their_distribution(distribution, reference):
+    values = distribution.sample(create_generator("pcg64", 3), N)
+    assert len(values) == N
+    if reference is None:
+        # Half the mass below 1, uniform on each piece
+        assert np.mean(values < 1.0) == pytest.approx(0.5, abs=0.01)
+        return
+    assert stats.kstest(values, reference.cdf).pvalue > 1e-3
+
+def test_alias_table_frequencies():
+    table = AliasTable([0.1, 0.0, 0.6, 0.3], values=np.array([5, 6, 7, 8]))
+    values = table.sample(create_generator("pcg64", 4), N)
+    frequencies = [np.mean(values == value) for value in (5, 6, 7, 8)]
+    assert frequencies == pytest.approx([0.1, 0.0, 0.6, 0.3], abs=0.005)
+    assert set(np.unique(empirical([1, 1, 2]).sample(create_generator("pcg64", 4), 1000))) == {1, 2}
+
+def test_sampler_hands_out_the_bulk_stream_in_order():
+    draw = sampler(create_generator("pcg64", 5), from_spec((10.0, 2.0)), batch_size=100)
+    expected = Spread(10.0, 2.0).sample(create_generator("pcg64", 5), 250)
+    assert [draw() for _ in range(250)] == pytest.approx(expected.tolist())
+
+def test_from_spec():
+    assert isinstance(from_spec(4.5), Exponential)
+    assert isinstance(from_spec(("weibull", 1.5, 10.0)), Weibull)
+    with pytest.raises(ValueError):
+        from_spec(("nope", 1))
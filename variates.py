@@ -0,0 +1,245 @@
+import math
+import numpy as np
+
+DEFAULT_BATCH_SIZE = 4096
+
+def uniforms(source, size):
+    """Returns `size` uniforms in [0, 1) from a prng backend, a numpy Generator or a callable size -> array."""
+    if hasattr(source, "random"):
+        return np.asarray(source.random(size), dtype=float)
+    return np.asarray(source(size), dtype=float)
+
+class Distribution:
+    """A distribution sampled in bulk: sample(source, size) returns a NumPy array of variates."""
+
+    def sample(self, source, size):
+        raise NotImplementedError
+
+class InverseTransform(Distribution):
+    """A distribution sampled by inverse transform: one uniform per variate through ppf()."""
+
+    def ppf(self, u):
+        raise NotImplementedError
+
+    def sample(self, source, size):
+        return self.ppf(uniforms(source, size))
+
+class Constant(InverseTransform):
+    def __init__(self, value):
+        self.value = value
+
+    def ppf(self, u):
+        return np.full(np.shape(u), float(self.value))
+
+class Uniform(InverseTransform):
+    def __init__(self, low, high):
+        if not low <= high:
+            raise ValueError("low must not exceed high")
+        self.low = low
+        self.high = high
+
+    def ppf(self, u):
+        return self.low + (self.high - self.low) * u
+
+class Spread(Uniform):
+    """GPSS A +- B: uniform on [mean - half_width, mean + half_width], as in GENERATE 100,60."""
+
+    def __init__(self, mean, half_width):
+        super().__init__(mean - half_width, mean + half_width)
+
+class Exponential(InverseTransform):
+    def __init__(self, mean):
+        if mean <= 0:
+            raise ValueError("mean must be positive")
+        self.mean = mean
+
+    def ppf(self, u):
+        return -self.mean * np.log1p(-u)
+
+class Weibull(InverseTransform):
+    """Weibull with shape k and scale lambda: F(x) = 1 - exp(-(x / lambda)**k)."""
+
+    def __init__(self, shape, scale=1.0):
+        if shape <= 0 or scale <= 0:
+            raise ValueError("shape and scale must be positive")
+        self.shape = shape
+        self.scale = scale
+
+    def ppf(self, u):
+        return self.scale * (-np.log1p(-u)) ** (1.0 / self.shape)
+
+class Triangular(InverseTransform):
+    def __init__(self, low, mode, high):
+        if not low <= mode <= high or low == high:
+            raise ValueError("need low <= mode <= high and low < high")
+        self.low = low
+        self.mode = mode
+        self.high = high
+
+    def ppf(self, u):
+        low, mode, high = self.low, self.mode, self.high
+        split = (mode - low) / (high - low)
+        return np.where(u < split,
+                        low + np.sqrt(u * (high - low) * (mode - low)),
+                        high - np.sqrt((1 - u) * (high - low) * (high - mode)))
+
+class PiecewiseLinear(InverseTransform):
+    """Continuous empirical distribution given by points (x, F(x)) of its CDF (a GPSS C-type function)."""
+
+    def __init__(self, points):
+        x, cdf = np.asarray(points, dtype=float).T
+        if cdf[0] != 0 or cdf[-1] != 1 or np.any(np.diff(cdf) < 0) or np.any(np.diff(x) < 0):
+            raise ValueError("the CDF points must be increasing from 0 to 1")
+        self.x = x
+        self.cdf = cdf
+
+    def ppf(self, u):
+        return np.interp(u, self.cdf, self.x)
+
+class AliasTable(Distribution):
+    """Discrete distribution sampled in O(1) per variate with Vose's alias method.
+
+    One uniform per variate: its integer part (times n) picks a column and its
+    fractional part decides between the column's value and its alias.
+    """
+
+    def __init__(self, probabilities, values=None):
+        probabilities = np.asarray(probabilities, dtype=float)
+        if probabilities.ndim != 1 or len(probabilities) == 0 or np.any(probabilities < 0) or probabilities.sum() <= 0:
+            raise ValueError("probabilities must be a non-empty list of non-negative weights")
+        n = len(probabilities)
+        self.values = np.arange(n) if values is None else np.asarray(values)
+        if len(self.values) != n:
+            raise ValueError("values and probabilities must have the same length")
+        scaled = probabilities * (n / probabilities.sum())
+        self.threshold = np.ones(n)
+        self.alias = np.arange(n)
+        small = [i for i in range(n) if scaled[i] < 1.0]
+        large = [i for i in range(n) if scaled[i] >= 1.0]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self.threshold[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] -= 1.0 - scaled[less]
+            (small if scaled[more] < 1.0 else large).append(more)
+        # Whatever is left is 1 up to rounding and keeps threshold 1
+
+    def indices(self, u):
+        scaled = u * len(self.threshold)
+        column = scaled.astype(np.intp)
+        return np.where(scaled - column < self.threshold[column], column, self.alias[column])
+
+    def sample(self, source, size):
+        return self.values[self.indices(uniforms(source, size))]
+
+def empirical(data):
+    """Returns an AliasTable that resamples the observed values with their observed frequencies."""
+    values, counts = np.unique(np.asarray(data), return_counts=True)
+    return AliasTable(counts, values)
+
+def _ziggurat_tables(layers=256, r=3.6541528853610088, area=0.00492867323399):
+    """Layer widths x[0..layers] of Marsaglia and Tsang's ziggurat for the normal density exp(-x*x/2)."""
+    x = np.empty(layers + 1)
+    x[0] = area / math.exp(-0.5 * r * r)
+    x[1] = r
+    for i in range(1, layers - 1):
+        x[i + 1] = math.sqrt(-2.0 * math.log(area / x[i] + math.exp(-0.5 * x[i] * x[i])))
+    x[layers] = 0.0
+    return x, np.exp(-0.5 * x * x)
+
+class Normal(Distribution):
+    """Normal variates by a vectorized ziggurat (Marsaglia and Tsang, 256 layers).
+
+    Every candidate takes two uniforms: one picks the layer, the other the
+    signed position in it. About 99% land inside their layer's rectangle and
+    are accepted at once; the rest go through the wedge test or, for the base
+    layer, the exponential tail method, and rejected ones are drawn again.
+    """
+
+    LAYERS = 256
+    R = 3.6541528853610088
+    _x, _f = _ziggurat_tables(LAYERS, R)
+
+    def __init__(self, mean=0.0, std=1.0):
+        if std < 0:
+            raise ValueError("std must be non-negative")
+        self.mean = mean
+        self.std = std
+
+    def standard(self, source, size):
+        out = np.empty(size)
+        todo = np.arange(size)
+        x_table, f_table = self._x, self._f
+        while len(todo):
+            n = len(todo)
+            layer = (uniforms(source, n) * self.LAYERS).astype(np.intp)
+            x = (2.0 * uniforms(source, n) - 1.0) * x_table[layer]
+            inside = np.abs(x) < x_table[layer + 1]
+            accepted = inside.copy()
+
+            wedge = np.flatnonzero(~inside & (layer > 0))
+            if len(wedge):
+                i = layer[wedge]
+                y = f_table[i + 1] + uniforms(source, len(wedge)) * (f_table[i] - f_table[i + 1])
+                accepted[wedge] = y < np.exp(-0.5 * x[wedge] ** 2)
+
+            tail = np.flatnonzero(~inside & (layer == 0))
+            if len(tail):
+                # Marsaglia's tail method beyond R, keeping the candidate's sign
+                e1 = -np.log1p(-uniforms(source, len(tail))) / self.R
+                e2 = -np.log1p(-uniforms(source, len(tail)))
+                ok = 2.0 * e2 > e1 * e1
+                x[tail] = np.sign(x[tail]) * (self.R + e1)
+                accepted[tail] = ok
+
+            out[todo[accepted]] = x[accepted]
+            todo = todo[~accepted]
+        return out
+
+    def sample(self, source, size):
+        return self.mean + self.std * self.standard(source, size)
+
+def sampler(source, distribution, batch_size=DEFAULT_BATCH_SIZE):
+    """Returns a zero-argument function giving one variate per call.
+
+    The variates are generated batch_size at a time with distribution.sample
+    and handed out from a list, so a simulation pays for one list pop per
+    variate instead of a Python-level transform.
+    """
+    buffer = []
+
+    def draw():
+        if not buffer:
+            # Reversed so that pop() hands out the batch in stream order
+            buffer.extend(distribution.sample(source, batch_size)[::-1].tolist())
+        return buffer.pop()
+    return draw
+
+def from_spec(spec):
+    """Returns a Distribution for a model parameter.
+
+    A Distribution is returned as is, a number is an exponential mean, a pair
+    (A, B) is GPSS-style A +- B, and a tuple starting with a name selects a
+    distribution: ("exponential", mean), ("uniform", low, high),
+    ("spread", A, B), ("weibull", shape, scale), ("triangular", low, mode,
+    high), ("normal", mean, std), ("constant", value),
+    ("discrete", values, probabilities) or ("empirical", data).
+    """
+    if isinstance(spec, Distribution):
+        return spec
+    if isinstance(spec, (int, float)):
+        return Exponential(spec)
+    if isinstance(spec, (tuple, list)) and spec and isinstance(spec[0], str):
+        name, args = spec[0].lower(), spec[1:]
+        if name == "discrete":
+            return AliasTable(args[1], args[0])
+        if name == "empirical":
+            return empirical(args[0])
+        kinds = {"exponential": Exponential, "uniform": Uniform, "spread": Spread, "weibull": Weibull,
+                 "triangular": Triangular, "normal": Normal, "constant": Constant}
+        if name not in kinds:
+            raise ValueError(f"Unknown distribution '{spec[0]}'")
+        return kinds[name](*args)
+    if isinstance(spec, (tuple, list)) and len(spec) == 2:
+        return Spread(*spec)
+    raise ValueError(f"Cannot make a distribution from {spec!r}")